@@ -4,26 +4,50 @@ Flask application factory for Voice-Cloned Talking-Head Lecturer
 from flask import Flask, jsonify, request, make_response
 from flask_cors import CORS
 
-from .extensions import db, migrate, jwt, make_celery, init_redis
+from .extensions import db, migrate, jwt, make_celery, init_redis, build_engine_options
 from .config import Config
-from .auth import JWTBlocklist
+from .auth import JWTBlocklist, password_hasher
 
 
 def create_app(config_class=Config):
     """Application factory pattern"""
     app = Flask(__name__)
+    
+    # Uploaded files spool to disk above UPLOAD_SPOOL_THRESHOLD
+    from .utils.uploads import SpooledUploadRequest
+    app.request_class = SpooledUploadRequest
+    
     app.config.from_object(config_class)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
     
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     init_redis(app)
+    JWTBlocklist.init_app(app)
+    password_hasher.init_app(app)
     
     # Initialize storage service
     from .services.storage import storage_service
     storage_service.init_app(app)
     
+    # Keep analytics rollups current as jobs reach a terminal state
+    from .services.analytics import register_rollup_listeners
+    register_rollup_listeners()
+    
+    # Drop cached API responses when jobs or assets change
+    from .utils.cache import register_cache_invalidation
+    register_cache_invalidation()
+    
+    # Drop cached user identities/roles when users change
+    from .auth.identity import register_identity_invalidation
+    register_identity_invalidation()
+    
+    # Keep shared blob reference counts in step with assets
+    from .services.blobs import register_blob_refcounting
+    register_blob_refcounting()
+    
     # Configure CORS - Allow all for development
     CORS(app, 
          origins=['http://localhost:3000', 'http://localhost:3001', 'http://localhost:3002'],
@@ -38,15 +62,8 @@ def create_app(config_class=Config):
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
         """Check if JWT token is revoked"""
-        jti = jwt_payload['jti']
-        user_id = jwt_payload['sub']
-        
-        # Check if specific token is blocklisted
-        if JWTBlocklist.is_token_revoked(jti):
-            return True
-            
-        # Check if all user tokens are revoked
-        return JWTBlocklist.is_user_tokens_revoked(user_id)
+        # Token and user-wide revocation in one (near-cached) lookup
+        return JWTBlocklist.is_revoked(jwt_payload['jti'], jwt_payload['sub'])
     
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
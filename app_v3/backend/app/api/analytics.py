@@ -1,9 +1,15 @@
-from flask import Blueprint, jsonify, request
+import csv
+import io
+import json
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
-from app.models.job import Job
+from app.models.job import Job, JobStatus
+from app.models.analytics import JobDailyRollup, ModelUsageDailyRollup
 from app.extensions import db
+from app.services.analytics import stage_latency_summary
+from app.utils.cache import cached_response, SOURCE_JOBS
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -19,7 +25,6 @@ def serialize_metadata(metadata):
     # If it's a string, try to parse as JSON
     if isinstance(metadata, str):
         try:
-            import json
             return json.loads(metadata)
         except:
             return {'raw': metadata}
@@ -44,150 +49,203 @@ def get_job_duration(job):
         return (job.completed_at - job.created_at).total_seconds()
     return None
 
+def get_cutoff_date(time_range):
+    """Translate a dashboard time_range into a created_at cutoff (None for 'all')"""
+    if time_range == 'all':
+        return None
+    if time_range == '7d':
+        return datetime.utcnow() - timedelta(days=7)
+    elif time_range == '30d':
+        return datetime.utcnow() - timedelta(days=30)
+    elif time_range == '90d':
+        return datetime.utcnow() - timedelta(days=90)
+    return datetime.utcnow() - timedelta(days=7)  # default
+
+# Only the columns the performance table needs, so listings and exports never
+# hydrate full Job objects (or their relationships)
+PERFORMANCE_COLUMNS = (
+    Job.id,
+    Job.title,
+    Job.status,
+    Job.job_type,
+    Job.created_at,
+    Job.completed_at,
+    Job.actual_start_time,
+    Job.actual_end_time,
+    Job.service_metadata
+)
+
+EXPORT_FIELDS = ['id', 'title', 'status', 'job_type', 'created_at', 'completed_at',
+                 'duration', 'llm_model', 'tts_model', 'video_model']
+EXPORT_BATCH_SIZE = 500
+
+def build_performance_query(time_range, status=None):
+    """Column query for the job performance table, newest first"""
+    query = db.session.query(*PERFORMANCE_COLUMNS)
+    cutoff_date = get_cutoff_date(time_range)
+    if cutoff_date:
+        query = query.filter(Job.created_at >= cutoff_date)
+    if status:
+        query = query.filter(Job.status == JobStatus(status))
+    # Job.id breaks ties so pages are stable
+    return query.order_by(desc(Job.created_at), desc(Job.id))
+
+def build_job_performance_entry(job):
+    """Build one row of the job performance table"""
+    # Get job duration
+    duration = get_job_duration(job)
+    
+    # Process service_metadata for model information
+    service_metadata = serialize_metadata(job.service_metadata)
+    
+    # Create job performance entry for tabular display
+    job_entry = {
+        'id': job.id,  # Frontend expects 'id', not 'job_id'
+        'title': job.title,
+        'status': get_status_value(job.status),
+        'job_type': job.job_type.value if hasattr(job.job_type, 'value') else str(job.job_type),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        'duration': duration,  # Frontend expects 'duration', not 'duration_seconds'
+        'duration_formatted': f"{int(duration // 60)}m {int(duration % 60)}s" if duration else "N/A",
+        'llm_model': 'N/A',     # Frontend expects these specific keys
+        'tts_model': 'N/A',
+        'video_model': 'N/A',
+        'models_used': {},
+        'model_details': {}
+    }
+    
+    if isinstance(service_metadata, dict):
+        # Extract model information from service_metadata
+        for service_name, service_info in service_metadata.items():
+            if isinstance(service_info, dict):
+                model_name = service_info.get('model_name', 'unknown')
+                model_type = service_info.get('model_type', 'unknown')
+                
+                # Map service names to frontend model fields
+                if service_name.lower() == 'indextts':
+                    job_entry['tts_model'] = model_name
+                elif service_name.lower() == 'kdtalker':
+                    job_entry['video_model'] = model_name
+                elif 'llm' in service_name.lower() or 'language' in service_name.lower():
+                    job_entry['llm_model'] = model_name
+                
+                # Add to job entry
+                job_entry['models_used'][service_name] = model_name
+                job_entry['model_details'][service_name] = {
+                    'model_name': model_name,
+                    'model_type': model_type,
+                    'huggingface_url': service_info.get('huggingface_url'),
+                    'library_name': service_info.get('library_name'),
+                    'license': service_info.get('license'),
+                    'model_size': service_info.get('model_size'),
+                    'tags': service_info.get('tags', [])
+                }
+    
+    return job_entry
+
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
+@cached_response('analytics_dashboard', ttl=60, scope='global', invalidated_by=(SOURCE_JOBS,))
 def get_dashboard_analytics():
-    """Get analytics dashboard data for all jobs"""
+    """Get analytics dashboard data for all jobs
+    
+    Summary, status, model and daily figures are read from the pre-aggregated
+    rollup tables; only jobs that are still pending/processing are read live.
+    """
     try:
         # Get time range filter (default to 'all')
         time_range = request.args.get('time_range', 'all')
+        cutoff_date = get_cutoff_date(time_range)
+        start_day = cutoff_date.date() if cutoff_date else None
         
-        # Build base query
-        query = Job.query
-        
-        # Apply time filter
-        if time_range != 'all':
-            if time_range == '7d':
-                cutoff_date = datetime.utcnow() - timedelta(days=7)
-            elif time_range == '30d':
-                cutoff_date = datetime.utcnow() - timedelta(days=30)
-            elif time_range == '90d':
-                cutoff_date = datetime.utcnow() - timedelta(days=90)
-            else:
-                cutoff_date = datetime.utcnow() - timedelta(days=7)  # default
-            
-            query = query.filter(Job.created_at >= cutoff_date)
+        # Terminal job counts per day and status from the rollups
+        rollup_query = db.session.query(
+            JobDailyRollup.day,
+            JobDailyRollup.status,
+            func.sum(JobDailyRollup.job_count),
+            func.sum(JobDailyRollup.total_processing_seconds),
+            func.sum(JobDailyRollup.processing_samples)
+        ).group_by(JobDailyRollup.day, JobDailyRollup.status)
+        if start_day:
+            rollup_query = rollup_query.filter(JobDailyRollup.day >= start_day)
+        
+        status_breakdown = {'completed': 0, 'failed': 0, 'pending': 0, 'processing': 0, 'cancelled': 0}
+        daily_counts = {}
+        total_processing_seconds = 0.0
+        processing_samples = 0
         
-        # Get all jobs for analysis
-        jobs = query.all()
+        for day, status, job_count, seconds, samples in rollup_query.all():
+            job_count = int(job_count or 0)
+            status_breakdown[status] = status_breakdown.get(status, 0) + job_count
+            day_counts = daily_counts.setdefault(day, {})
+            day_counts[status] = day_counts.get(status, 0) + job_count
+            if status == 'completed':
+                total_processing_seconds += float(seconds or 0)
+                processing_samples += int(samples or 0)
+        
+        # In-flight jobs are not rolled up yet; this set is bounded by queue depth, not history
+        active_query = db.session.query(Job.created_at, Job.status).filter(
+            Job.status.in_([JobStatus.PENDING, JobStatus.PROCESSING])
+        )
+        if cutoff_date:
+            active_query = active_query.filter(Job.created_at >= cutoff_date)
+        
+        for created_at, status in active_query.all():
+            status = get_status_value(status)
+            status_breakdown[status] = status_breakdown.get(status, 0) + 1
+            if created_at:
+                day_counts = daily_counts.setdefault(created_at.date(), {})
+                day_counts[status] = day_counts.get(status, 0) + 1
         
         # Calculate summary statistics
-        total_jobs = len(jobs)
-        completed_jobs = len([j for j in jobs if get_status_value(j.status) == 'completed'])
-        failed_jobs = len([j for j in jobs if get_status_value(j.status) == 'failed'])
-        in_progress_jobs = len([j for j in jobs if get_status_value(j.status) in ['pending', 'processing']])
+        total_jobs = sum(status_breakdown.values())
+        completed_jobs = status_breakdown['completed']
+        failed_jobs = status_breakdown['failed']
+        in_progress_jobs = status_breakdown['pending'] + status_breakdown['processing']
         
         success_rate = (completed_jobs / total_jobs * 100) if total_jobs > 0 else 0
+        avg_processing_time = (total_processing_seconds / processing_samples) if processing_samples else 0
         
-        # Calculate average processing time for completed jobs
-        completed_with_times = [j for j in jobs if get_status_value(j.status) == 'completed' and j.completed_at and j.created_at]
-        avg_processing_time = 0
-        if completed_with_times:
-            total_time = sum([(j.completed_at - j.created_at).total_seconds() for j in completed_with_times])
-            avg_processing_time = total_time / len(completed_with_times)
-        
-        # Job breakdown by status
-        status_breakdown = {
-            'completed': completed_jobs,
-            'failed': failed_jobs,
-            'pending': len([j for j in jobs if get_status_value(j.status) == 'pending']),
-            'processing': len([j for j in jobs if get_status_value(j.status) == 'processing']),
-            'cancelled': len([j for j in jobs if get_status_value(j.status) == 'cancelled'])
-        }
+        # Model usage breakdown from the model rollups
+        model_query = db.session.query(
+            ModelUsageDailyRollup.model_type,
+            ModelUsageDailyRollup.model_name,
+            func.sum(ModelUsageDailyRollup.job_count)
+        ).group_by(ModelUsageDailyRollup.model_type, ModelUsageDailyRollup.model_name)
+        if start_day:
+            model_query = model_query.filter(ModelUsageDailyRollup.day >= start_day)
         
-        # Model usage breakdown from service_metadata
         model_usage = {}
-        job_performance_table = []
-        
-        for job in jobs:
-            # Get job duration
-            duration = get_job_duration(job)
-            
-            # Process service_metadata for model information
-            service_metadata = serialize_metadata(job.service_metadata)
-            
-            # Create job performance entry for tabular display
-            job_entry = {
-                'id': job.id,  # Frontend expects 'id', not 'job_id'
-                'title': job.title,
-                'status': get_status_value(job.status),
-                'job_type': job.job_type.value if hasattr(job.job_type, 'value') else str(job.job_type),
-                'created_at': job.created_at.isoformat() if job.created_at else None,
-                'completed_at': job.completed_at.isoformat() if job.completed_at else None,
-                'duration': duration,  # Frontend expects 'duration', not 'duration_seconds'
-                'duration_formatted': f"{int(duration // 60)}m {int(duration % 60)}s" if duration else "N/A",
-                'llm_model': 'N/A',     # Frontend expects these specific keys
-                'tts_model': 'N/A',
-                'video_model': 'N/A',
-                'models_used': {},
-                'model_details': {}
-            }
-            
-            if isinstance(service_metadata, dict):
-                # Extract model information from service_metadata
-                for service_name, service_info in service_metadata.items():
-                    if isinstance(service_info, dict):
-                        model_name = service_info.get('model_name', 'unknown')
-                        model_type = service_info.get('model_type', 'unknown')
-                        
-                        # Map service names to frontend model fields
-                        if service_name.lower() == 'indextts':
-                            job_entry['tts_model'] = model_name
-                        elif service_name.lower() == 'kdtalker':
-                            job_entry['video_model'] = model_name
-                        elif 'llm' in service_name.lower() or 'language' in service_name.lower():
-                            job_entry['llm_model'] = model_name
-                        
-                        # Add to job entry
-                        job_entry['models_used'][service_name] = model_name
-                        job_entry['model_details'][service_name] = {
-                            'model_name': model_name,
-                            'model_type': model_type,
-                            'huggingface_url': service_info.get('huggingface_url'),
-                            'library_name': service_info.get('library_name'),
-                            'license': service_info.get('license'),
-                            'model_size': service_info.get('model_size'),
-                            'tags': service_info.get('tags', [])
-                        }
-                        
-                        # Count for overall usage (organize by model type for frontend)
-                        if service_name.lower() == 'indextts':
-                            model_type_key = 'tts'
-                        elif service_name.lower() == 'kdtalker':
-                            model_type_key = 'video'
-                        else:
-                            model_type_key = service_name.lower()
-                            
-                        if model_type_key not in model_usage:
-                            model_usage[model_type_key] = {}
-                        if model_name not in model_usage[model_type_key]:
-                            model_usage[model_type_key][model_name] = 0
-                        model_usage[model_type_key][model_name] += 1
-            
-            job_performance_table.append(job_entry)
+        for model_type_key, model_name, job_count in model_query.all():
+            model_usage.setdefault(model_type_key, {})[model_name] = int(job_count or 0)
         
         # Daily performance (last 30 days)
         daily_performance = []
         for i in range(30):
             date = datetime.utcnow() - timedelta(days=i)
             date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            date_end = date_start + timedelta(days=1)
             
-            day_jobs = [j for j in jobs if date_start <= j.created_at < date_end]
-            day_completed = len([j for j in day_jobs if get_status_value(j.status) == 'completed'])
-            day_failed = len([j for j in day_jobs if get_status_value(j.status) == 'failed'])
+            day_counts = daily_counts.get(date_start.date(), {})
+            day_total = sum(day_counts.values())
+            day_completed = day_counts.get('completed', 0)
+            day_failed = day_counts.get('failed', 0)
             
             daily_performance.append({
                 'date': date_start.strftime('%Y-%m-%d'),
-                'total_jobs': len(day_jobs),
+                'total_jobs': day_total,
                 'completed': day_completed,
                 'failed': day_failed,
-                'success_rate': (day_completed / len(day_jobs) * 100) if len(day_jobs) > 0 else 0
+                'success_rate': (day_completed / day_total * 100) if day_total > 0 else 0
             })
         
-        # Recent jobs (last 10)
+        # Recent jobs (last 10); the full per-job table is served by /jobs
+        recent_query = db.session.query(*PERFORMANCE_COLUMNS)
+        if cutoff_date:
+            recent_query = recent_query.filter(Job.created_at >= cutoff_date)
+        
         recent_jobs = []
-        for job in sorted(jobs, key=lambda x: x.created_at, reverse=True)[:10]:
+        for job in recent_query.order_by(desc(Job.created_at)).limit(10).all():
             processing_time = get_job_duration(job)
             
             recent_jobs.append({
@@ -222,10 +280,10 @@ def get_dashboard_analytics():
             },
             'status_breakdown': status_breakdown,
             'model_usage': model_usage,
-            'job_performance_table': job_performance_table,
             'daily_performance': daily_performance,
             'recent_jobs': recent_jobs,
             'benchmark_data': benchmark_data,
+            'stage_latency': stage_latency_summary(start_day),
             'time_range': time_range
         })
         
@@ -234,3 +292,87 @@ def get_dashboard_analytics():
         print(f"Analytics endpoint error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@analytics_bp.route('/jobs', methods=['GET'])
+@jwt_required()
+@cached_response('analytics_jobs', ttl=60, scope='global', invalidated_by=(SOURCE_JOBS,))
+def get_job_performance():
+    """Paginated job performance table"""
+    time_range = request.args.get('time_range', 'all')
+    status = request.args.get('status')
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 25, type=int), 100)
+    
+    if status and status not in [s.value for s in JobStatus]:
+        return jsonify({'error': f'Invalid status: {status}'}), 400
+    
+    try:
+        pagination = build_performance_query(time_range, status).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        
+        return jsonify({
+            'jobs': [build_job_performance_entry(job) for job in pagination.items],
+            'pagination': {
+                'page': pagination.page,
+                'pages': pagination.pages,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            },
+            'time_range': time_range
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@analytics_bp.route('/jobs/export', methods=['GET'])
+@jwt_required()
+def export_job_performance():
+    """Stream the job performance table as CSV or NDJSON
+    
+    Rows are read through a server-side cursor in batches of EXPORT_BATCH_SIZE
+    and written as they arrive, so memory stays flat regardless of history size.
+    """
+    time_range = request.args.get('time_range', 'all')
+    status = request.args.get('status')
+    export_format = request.args.get('format', 'csv').lower()
+    
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Unsupported format. Use csv or ndjson'}), 400
+    if status and status not in [s.value for s in JobStatus]:
+        return jsonify({'error': f'Invalid status: {status}'}), 400
+    
+    query = build_performance_query(time_range, status).yield_per(EXPORT_BATCH_SIZE)
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for job in query:
+            writer.writerow(build_job_performance_entry(job))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+    
+    def generate_ndjson():
+        for job in query:
+            entry = build_job_performance_entry(job)
+            yield json.dumps({field: entry[field] for field in EXPORT_FIELDS}) + '\n'
+    
+    filename = f"job_performance_{time_range}_{datetime.utcnow().strftime('%Y-%m-%d')}.{export_format}"
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -2,10 +2,13 @@
 Asset management API endpoints
 """
 import os
+import math
 import uuid
 import mimetypes
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import timedelta
+from flask import Blueprint, request, jsonify, current_app, url_for, redirect, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from marshmallow import ValidationError
 from sqlalchemy import and_
 
@@ -14,10 +17,16 @@ from ..models.asset import Asset, AssetType, AssetStatus
 from ..models.user import User
 from ..schemas import (
     AssetUploadSchema, AssetResponseSchema, AssetListSchema,
-    PresignedUrlSchema, PresignedUrlResponseSchema
+    PresignedUrlSchema, PresignedUrlResponseSchema, ConfirmUploadSchema
 )
 from ..services.storage import storage_service
+from ..services.blobs import find_blob, claim_object, adopt_blob, is_blob_backed
+from ..services.export import (
+    HLS_MASTER, DASH_MANIFEST, is_playlist, playlist_references, rewrite_playlist, resolve_reference,
+    sign_references, delete_package
+)
 from ..utils import handle_errors
+from ..utils.cache import cached_response, SOURCE_ASSETS
 
 assets_bp = Blueprint('assets', __name__)
 
@@ -77,6 +86,7 @@ def generate_storage_path(user_id, asset_type, filename):
 
 @assets_bp.route('/', methods=['GET'])
 @jwt_required()
+@cached_response('assets_list', ttl=30, invalidated_by=(SOURCE_ASSETS,))
 @handle_errors
 def list_assets():
     """List user's assets with optional filtering"""
@@ -115,16 +125,20 @@ def list_assets():
     response_schema = AssetResponseSchema()
     assets_data = []
     
+    # Sign download URLs for the whole page in one batch
+    download_urls = storage_service.get_presigned_urls(
+        [(asset.storage_path, asset.storage_bucket)
+         for asset in paginated.items if asset.status == AssetStatus.READY],
+        method='GET'
+    )
+    default_bucket = current_app.config.get('MINIO_BUCKET_NAME')
+    
     for asset in paginated.items:
         asset_dict = asset.to_dict()
         
         # Add signed URLs for ready assets
         if asset.status == AssetStatus.READY:
-            download_url = storage_service.get_presigned_url(
-                asset.storage_path, 
-                bucket_name=asset.storage_bucket,
-                method='GET'
-            )
+            download_url = download_urls.get((asset.storage_bucket or default_bucket, asset.storage_path))
             asset_dict['download_url'] = download_url
             
             # For images, also provide a preview URL (same as download for now)
@@ -150,9 +164,16 @@ def list_assets():
 @jwt_required()
 @handle_errors
 def upload_asset():
-    """Upload new asset file"""
+    """Upload new asset file through the API (only when proxy uploads are enabled)"""
     user_id = get_jwt_identity()
     
+    # The file bytes would pass through this process; clients should upload
+    # directly to storage via /presigned-upload instead
+    if not current_app.config.get('ASSET_PROXY_UPLOADS_ENABLED', False):
+        return jsonify({
+            'error': 'Uploads through the API are disabled. Use /api/assets/presigned-upload.'
+        }), 410
+    
     # Check if file is present
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -185,12 +206,15 @@ def upload_asset():
     storage_path = generate_storage_path(user_id, asset_type, original_filename)
     bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
     
-    # Get file metadata
-    file_size = 0
+    # Get file metadata (the upload is spooled, so this does not read it)
     file.seek(0, 2)  # Seek to end
     file_size = file.tell()
     file.seek(0)     # Reset to beginning
     
+    max_size = MAX_FILE_SIZES.get(asset_type, 10 * 1024 * 1024)
+    if file_size > max_size:
+        return jsonify({'error': f"File too large. Maximum size: {max_size / (1024*1024):.1f}MB"}), 400
+    
     mime_type, _ = mimetypes.guess_type(original_filename)
     if not mime_type:
         mime_type = file.content_type or 'application/octet-stream'
@@ -216,30 +240,43 @@ def upload_asset():
         db.session.add(asset)
         db.session.commit()
         
-        # Upload file to storage
-        upload_result = storage_service.upload_file(
-            file_data=file,
+        # Stream file to storage in parts, hashing it on the way
+        upload_result = storage_service.upload_stream(
+            file.stream,
             object_name=storage_path,
             bucket_name=bucket_name,
             content_type=mime_type
         )
         
         if upload_result['success']:
+            # Share an identical stored object instead of keeping this copy
+            blob, created = claim_object(
+                upload_result['sha256'], bucket_name, storage_path,
+                upload_result['file_size'], mime_type
+            )
+            redundant = None if created else adopt_blob(asset, blob)
+            
             # Update asset status to ready
             asset.status = AssetStatus.READY
-            asset.asset_metadata = asset.asset_metadata or {}
-            asset.asset_metadata.update({
+            asset.file_size = upload_result['file_size']
+            asset.asset_metadata = {
+                **(asset.asset_metadata or {}),
+                **(blob.derived or {}),
                 'etag': upload_result.get('etag'),
-                'version_id': upload_result.get('version_id')
-            })
+                'version_id': upload_result.get('version_id'),
+                'sha256': upload_result['sha256']
+            }
             db.session.commit()
             
+            if redundant:
+                storage_service.delete_file(redundant[0], bucket_name=redundant[1])
+            
             current_app.logger.info(f"Asset uploaded successfully: {asset.id}")
             
             # Return asset data with download URL
             asset_dict = asset.to_dict()
             asset_dict['download_url'] = storage_service.get_presigned_url(
-                storage_path, bucket_name=bucket_name, method='GET'
+                asset.storage_path, bucket_name=asset.storage_bucket, method='GET'
             )
             
             return jsonify({
@@ -311,10 +348,59 @@ def get_presigned_upload_url():
             'error': f'Invalid script format. Allowed: {", ".join(ALLOWED_SCRIPT_EXTENSIONS)}'
         }), 400
     
+    # Skip the upload entirely when this user already stored identical content.
+    # Limited to the user's own ready assets: a bare hash is not proof of
+    # possession, so it must not grant access to anyone else's file.
+    if data.get('sha256'):
+        blob = find_blob(data['sha256'])
+        existing = blob and Asset.query.filter(
+            and_(
+                Asset.user_id == user_id,
+                Asset.storage_path == blob.object_name,
+                Asset.status == AssetStatus.READY
+            )
+        ).first()
+        if existing:
+            metadata = {**(blob.derived or {}), 'sha256': blob.sha256}
+            if data.get('description'):
+                metadata['description'] = data['description']
+            
+            asset = Asset(
+                filename=os.path.basename(blob.object_name),
+                original_filename=filename,
+                asset_type=asset_type_enum,
+                storage_path=blob.object_name,
+                storage_bucket=blob.bucket_name,
+                user_id=user_id,
+                file_size=blob.size,
+                mime_type=existing.mime_type,
+                file_extension=file_ext,
+                status=AssetStatus.READY,
+                asset_metadata=metadata
+            )
+            db.session.add(asset)
+            db.session.commit()
+            
+            return jsonify({
+                'asset_id': asset.id,
+                'duplicate': True,
+                'asset': asset.to_dict()
+            }), 200
+    
     # Generate storage path
     storage_path = generate_storage_path(user_id, asset_type, filename)
     bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
     
+    expires_in = current_app.config.get('UPLOAD_URL_EXPIRES', 3600)
+    multipart = file_size > current_app.config.get('MULTIPART_UPLOAD_THRESHOLD', 16 * 1024 * 1024)
+    
+    metadata = {}
+    if data.get('description'):
+        metadata['description'] = data['description']
+    if data.get('sha256'):
+        # Verified by the post-upload worker once the object is in storage
+        metadata['expected_sha256'] = data['sha256'].lower()
+    
     # Create asset record with UPLOADING status
     try:
         asset = Asset(
@@ -327,34 +413,71 @@ def get_presigned_upload_url():
             file_size=file_size,
             mime_type=content_type,
             file_extension=file_ext,
-            status=AssetStatus.UPLOADING
+            status=AssetStatus.UPLOADING,
+            asset_metadata=metadata or None
         )
         
         db.session.add(asset)
         db.session.commit()
         
-        # Generate presigned upload URL
-        upload_url = storage_service.get_presigned_url(
-            storage_path,
-            bucket_name=bucket_name,
-            method='PUT'
-        )
-        
-        if upload_url:
-            return jsonify({
-                'upload_url': upload_url,
-                'asset_id': asset.id,
-                'expires_in': 3600,  # 1 hour
-                'method': 'PUT',
-                'headers': {
-                    'Content-Type': content_type
+        if multipart:
+            # Large files are uploaded in parts, each with its own URL
+            part_size = current_app.config.get('MULTIPART_PART_SIZE', 8 * 1024 * 1024)
+            part_count = math.ceil(file_size / part_size)
+            upload_id = storage_service.create_multipart_upload(
+                storage_path, bucket_name=bucket_name, content_type=content_type
+            )
+            part_urls = upload_id and storage_service.get_presigned_part_urls(
+                storage_path, upload_id, part_count,
+                bucket_name=bucket_name, expires=timedelta(seconds=expires_in)
+            )
+            
+            if part_urls:
+                asset.asset_metadata = {
+                    **metadata,
+                    'multipart': {'upload_id': upload_id, 'part_size': part_size, 'part_count': part_count}
                 }
-            }), 200
+                db.session.commit()
+                
+                return jsonify({
+                    'asset_id': asset.id,
+                    'expires_in': expires_in,
+                    'method': 'PUT',
+                    'multipart': True,
+                    'part_size': part_size,
+                    'parts': [
+                        {'part_number': number, 'url': url}
+                        for number, url in enumerate(part_urls, start=1)
+                    ]
+                }), 200
+            
+            if upload_id:
+                storage_service.abort_multipart_upload(storage_path, upload_id, bucket_name=bucket_name)
         else:
-            # Cleanup asset record if URL generation failed
-            db.session.delete(asset)
-            db.session.commit()
-            return jsonify({'error': 'Failed to generate upload URL'}), 500
+            # Generate presigned upload URL
+            upload_url = storage_service.get_presigned_url(
+                storage_path,
+                bucket_name=bucket_name,
+                expires=timedelta(seconds=expires_in),
+                method='PUT'
+            )
+            
+            if upload_url:
+                return jsonify({
+                    'upload_url': upload_url,
+                    'asset_id': asset.id,
+                    'expires_in': expires_in,
+                    'method': 'PUT',
+                    'multipart': False,
+                    'headers': {
+                        'Content-Type': content_type
+                    }
+                }), 200
+        
+        # Cleanup asset record if URL generation failed
+        db.session.delete(asset)
+        db.session.commit()
+        return jsonify({'error': 'Failed to generate upload URL'}), 500
             
     except Exception as e:
         db.session.rollback()
@@ -366,9 +489,22 @@ def get_presigned_upload_url():
 @jwt_required()
 @handle_errors
 def confirm_upload(asset_id):
-    """Confirm that presigned upload completed successfully"""
+    """
+    Confirm that a presigned upload completed
+    
+    Multipart uploads are assembled from the part ETags the client reports.
+    The object's size must match what was declared; the checksum, media
+    probing and normalization run in a worker, which moves the asset from
+    PROCESSING to READY (or ERROR).
+    """
     user_id = get_jwt_identity()
     
+    schema = ConfirmUploadSchema()
+    try:
+        data = schema.load(request.get_json(silent=True) or {})
+    except ValidationError as e:
+        return jsonify({'error': 'Invalid request data', 'details': e.messages}), 400
+    
     # Get asset
     asset = Asset.query.filter(
         and_(Asset.id == asset_id, Asset.user_id == user_id)
@@ -380,42 +516,70 @@ def confirm_upload(asset_id):
     if asset.status != AssetStatus.UPLOADING:
         return jsonify({'error': 'Asset is not in uploading state'}), 400
     
-    # Verify file exists in storage
-    if storage_service.file_exists(asset.storage_path, asset.storage_bucket):
-        # Get file metadata from storage
-        file_info = storage_service.get_object_info(asset.storage_path, asset.storage_bucket)
-        
-        if file_info:
-            # Update asset with actual file information
-            asset.file_size = file_info['size']
-            asset.status = AssetStatus.READY
-            asset.asset_metadata = asset.asset_metadata or {}
-            asset.asset_metadata.update({
-                'etag': file_info['etag'],
-                'confirmed_at': str(file_info['last_modified'])
-            })
-            db.session.commit()
-            
-            # Return updated asset data
-            asset_dict = asset.to_dict()
-            asset_dict['download_url'] = storage_service.get_presigned_url(
-                asset.storage_path, bucket_name=asset.storage_bucket, method='GET'
-            )
-            
+    metadata = dict(asset.asset_metadata or {})
+    
+    # Assemble multipart uploads from the reported parts
+    multipart = metadata.get('multipart')
+    if multipart:
+        parts = data.get('parts') or []
+        if len(parts) != multipart['part_count']:
             return jsonify({
-                'message': 'Upload confirmed successfully',
-                'asset': asset_dict
-            }), 200
-        else:
-            asset.status = AssetStatus.ERROR
-            asset.processing_info = {'error': 'File verification failed'}
-            db.session.commit()
-            return jsonify({'error': 'File verification failed'}), 500
-    else:
+                'error': f"Expected {multipart['part_count']} uploaded parts, got {len(parts)}"
+            }), 400
+        
+        result = storage_service.complete_multipart_upload(
+            asset.storage_path, multipart['upload_id'],
+            [(part['part_number'], part['etag']) for part in parts],
+            bucket_name=asset.storage_bucket
+        )
+        if not result['success']:
+            # Parts stay in storage, so the client may retry with corrected ETags
+            return jsonify({'error': 'Failed to assemble upload', 'details': result.get('error')}), 400
+        
+        metadata.pop('multipart')
+        asset.asset_metadata = metadata
+        db.session.commit()
+    
+    # Verify file exists in storage with the declared size
+    file_info = storage_service.get_object_info(asset.storage_path, asset.storage_bucket)
+    if not file_info:
         asset.status = AssetStatus.ERROR
         asset.processing_info = {'error': 'File not found in storage'}
         db.session.commit()
         return jsonify({'error': 'Upload verification failed'}), 400
+    
+    if file_info['size'] != asset.file_size:
+        asset.status = AssetStatus.ERROR
+        asset.processing_info = {
+            'error': f"Size mismatch: declared {asset.file_size} bytes, stored {file_info['size']}"
+        }
+        db.session.commit()
+        storage_service.delete_file(asset.storage_path, bucket_name=asset.storage_bucket)
+        return jsonify({'error': 'Upload verification failed: size mismatch'}), 400
+    
+    asset.status = AssetStatus.PROCESSING
+    asset.asset_metadata = {
+        **metadata,
+        'etag': file_info['etag'],
+        'confirmed_at': str(file_info['last_modified'])
+    }
+    db.session.commit()
+    
+    # Checksum verification, probing and normalization happen in a worker
+    from ..tasks.asset_tasks import process_uploaded_asset
+    try:
+        process_uploaded_asset.delay(asset.id)
+    except Exception as e:
+        current_app.logger.error(f"Failed to queue post-upload processing for asset {asset.id}: {str(e)}")
+        # Leave the asset confirmable so the client can retry
+        asset.status = AssetStatus.UPLOADING
+        db.session.commit()
+        return jsonify({'error': 'Upload processing is unavailable, please retry'}), 503
+    
+    return jsonify({
+        'message': 'Upload confirmed, processing',
+        'asset': asset.to_dict()
+    }), 202
 
 
 @assets_bp.route('/<int:asset_id>', methods=['GET'])
@@ -448,6 +612,9 @@ def get_asset(asset_id):
         # For images, also provide a preview URL
         if asset.is_image:
             asset_dict['preview_url'] = download_url
+        
+        # Adaptive streaming playlists once the video has been packaged
+        asset_dict.update(stream_urls(asset))
     
     return jsonify({'asset': asset_dict}), 200
 
@@ -468,16 +635,36 @@ def delete_asset(asset_id):
         return jsonify({'error': 'Asset not found'}), 404
     
     try:
-        # Delete file from storage
-        storage_deleted = storage_service.delete_file(
-            asset.storage_path, 
-            bucket_name=asset.storage_bucket
-        )
+        # Discard parts of a multipart upload that was never confirmed
+        multipart = (asset.asset_metadata or {}).get('multipart')
+        if asset.status == AssetStatus.UPLOADING and multipart:
+            storage_service.abort_multipart_upload(
+                asset.storage_path, multipart['upload_id'], bucket_name=asset.storage_bucket
+            )
         
-        if storage_deleted:
-            current_app.logger.info(f"File deleted from storage: {asset.storage_path}")
+        if is_blob_backed(asset):
+            # Shared content; dropping the row releases its reference and
+            # blob garbage collection removes the object once unreferenced
+            current_app.logger.info(f"Released blob reference: {asset.storage_path}")
         else:
-            current_app.logger.warning(f"Failed to delete file from storage: {asset.storage_path}")
+            # Delete file from storage
+            storage_deleted = storage_service.delete_file(
+                asset.storage_path, 
+                bucket_name=asset.storage_bucket
+            )
+            
+            if storage_deleted:
+                current_app.logger.info(f"File deleted from storage: {asset.storage_path}")
+            else:
+                current_app.logger.warning(f"Failed to delete file from storage: {asset.storage_path}")
+            
+            # Derived files made by post-upload processing
+            normalized_path = (asset.asset_metadata or {}).get('normalized_path')
+            if normalized_path:
+                storage_service.delete_file(normalized_path, bucket_name=asset.storage_bucket)
+            stream_package = (asset.asset_metadata or {}).get('stream', {}).get('prefix')
+            if stream_package:
+                delete_package(stream_package, bucket_name=asset.storage_bucket)
         
         # Delete asset record from database
         db.session.delete(asset)
@@ -529,3 +716,161 @@ def download_asset(asset_id):
         }), 200
     else:
         return jsonify({'error': 'Failed to generate download URL'}), 500
+
+
+def _stream_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='asset-stream')
+
+
+def stream_urls(asset):
+    """
+    Playlist URLs of a packaged video
+    
+    The URLs carry a signed token instead of requiring an Authorization
+    header, so they work as a plain <video> source and in any HLS/DASH player.
+    """
+    stream = (asset.asset_metadata or {}).get('stream') or {}
+    if stream.get('status') != 'ready':
+        return {}
+    token = _stream_serializer().dumps({'asset_id': asset.id, 'prefix': stream['prefix']})
+    urls = {'hls_url': url_for('assets.stream_file', asset_id=asset.id, filename=HLS_MASTER, token=token)}
+    if stream.get('dash'):
+        urls['dash_url'] = url_for('assets.stream_file', asset_id=asset.id, filename=DASH_MANIFEST, token=token)
+    return urls
+
+
+def _get_generated_video(asset_id, user_id):
+    return Asset.query.filter(
+        and_(Asset.id == asset_id, Asset.user_id == user_id, Asset.asset_type == AssetType.GENERATED_VIDEO)
+    ).first()
+
+
+@assets_bp.route('/<int:asset_id>/stream', methods=['GET'])
+@jwt_required()
+@handle_errors
+def get_stream(asset_id):
+    """Streaming package status and playlist URLs for a generated video"""
+    user_id = get_jwt_identity()
+    
+    asset = _get_generated_video(asset_id, user_id)
+    if not asset:
+        return jsonify({'error': 'Video not found'}), 404
+    
+    stream = dict((asset.asset_metadata or {}).get('stream') or {'status': 'not_packaged'})
+    stream.pop('settings', None)
+    return jsonify({
+        'asset_id': asset.id,
+        'stream': stream,
+        **stream_urls(asset),
+        'expires_in': current_app.config.get('STREAM_URL_EXPIRES', 14400)
+    }), 200
+
+
+@assets_bp.route('/<int:asset_id>/stream', methods=['POST'])
+@jwt_required()
+@handle_errors
+def package_stream(asset_id):
+    """Package (or repackage with ?force=true) a generated video for streaming"""
+    from ..tasks.export_tasks import package_video_stream
+    
+    user_id = get_jwt_identity()
+    
+    asset = _get_generated_video(asset_id, user_id)
+    if not asset:
+        return jsonify({'error': 'Video not found'}), 404
+    if asset.status != AssetStatus.READY:
+        return jsonify({'error': 'Video is not ready'}), 400
+    
+    stream = (asset.asset_metadata or {}).get('stream') or {}
+    force = request.args.get('force', 'false').lower() == 'true'
+    if stream.get('status') == 'ready' and not force:
+        return jsonify({'asset_id': asset.id, 'stream': stream, **stream_urls(asset)}), 200
+    if stream.get('status') == 'processing' and stream.get('task_id'):
+        task_id = stream['task_id']
+    else:
+        task_id = package_video_stream.delay(asset.id, force=force).id
+    
+    return jsonify({
+        'message': 'Stream packaging started',
+        'asset_id': asset.id,
+        'task_id': task_id,
+        'status_url': f'/api/worker/task/{task_id}'
+    }), 202
+
+
+@assets_bp.route('/<int:asset_id>/stream/<path:filename>', methods=['GET'])
+@handle_errors
+def stream_file(asset_id, filename):
+    """
+    Serve a playlist of a video's streaming package
+    
+    Authorized by the signed token from ``stream_urls`` or a JWT. Segment
+    references are rewritten to presigned storage URLs and nested playlist
+    references to this endpoint (with the same token), so players fetch
+    segments straight from storage. Other package files redirect to storage.
+    """
+    token = request.args.get('token')
+    if token:
+        try:
+            claims = _stream_serializer().loads(token, max_age=current_app.config.get('STREAM_URL_EXPIRES', 14400))
+        except BadSignature:
+            return jsonify({'error': 'Invalid or expired stream token'}), 403
+        if claims.get('asset_id') != asset_id:
+            return jsonify({'error': 'Invalid or expired stream token'}), 403
+        asset = Asset.query.filter_by(id=asset_id, asset_type=AssetType.GENERATED_VIDEO).first()
+    else:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+        if not user_id:
+            return jsonify({'error': 'Authorization required'}), 401
+        asset = _get_generated_video(asset_id, user_id)
+    
+    stream = ((asset.asset_metadata or {}).get('stream') or {}) if asset else {}
+    if stream.get('status') != 'ready':
+        return jsonify({'error': 'Stream not found'}), 404
+    if token and claims.get('prefix') != stream['prefix']:
+        # The video was repackaged since the token was issued
+        return jsonify({'error': 'Invalid or expired stream token'}), 403
+    
+    name = resolve_reference('', filename)
+    if not name:
+        return jsonify({'error': 'Invalid file name'}), 400
+    
+    prefix = stream['prefix']
+    bucket_name = asset.storage_bucket
+    expires = timedelta(seconds=current_app.config.get('STREAM_URL_EXPIRES', 14400))
+    
+    if not is_playlist(name):
+        url = storage_service.get_presigned_url(f"{prefix}/{name}", bucket_name=bucket_name, expires=expires)
+        if not url:
+            return jsonify({'error': 'Failed to generate download URL'}), 500
+        return redirect(url)
+    
+    content = storage_service.read_if_exists(f"{prefix}/{name}", bucket_name=bucket_name)
+    if content is None:
+        return jsonify({'error': 'Playlist not found'}), 404
+    text = content.decode('utf-8')
+    
+    references = {reference: resolve_reference(name, reference) for reference in playlist_references(text, name)}
+    signed = sign_references(
+        prefix,
+        (target for target in references.values() if target and not is_playlist(target)),
+        bucket_name=bucket_name, expires=expires
+    )
+    
+    def resolve(reference):
+        target = references.get(reference)
+        if not target:
+            return None
+        if is_playlist(target):
+            query = {'token': token} if token else {}
+            return url_for('assets.stream_file', asset_id=asset_id, filename=target, **query)
+        return signed.get(target)
+    
+    response = Response(
+        rewrite_playlist(text, name, resolve),
+        mimetype='application/dash+xml' if name.endswith('.mpd') else 'application/vnd.apple.mpegurl'
+    )
+    # Shorter than the presigned URLs inside it
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    return response
@@ -17,7 +17,9 @@ from ..schemas import (
     LoginResponseSchema, MessageResponseSchema, ErrorResponseSchema,
     UserProfileUpdateSchema, ChangePasswordSchema
 )
-from ..auth import JWTBlocklist
+from ..auth import (
+    JWTBlocklist, password_hasher, PasswordHashingBusy, verify_and_upgrade, get_user_identity
+)
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -32,6 +34,15 @@ profile_update_schema = UserProfileUpdateSchema()
 change_password_schema = ChangePasswordSchema()
 
 
+def busy_response():
+    """503 returned when the password hashing pool is saturated"""
+    response = jsonify(error_schema.dump({
+        'message': 'Authentication service is busy. Please try again shortly.'
+    }))
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """User registration endpoint"""
@@ -48,8 +59,9 @@ def register():
         # Remove confirm_password from data before creating user
         data.pop('confirm_password', None)
         
-        # Create new user
-        user = User(
+        # Create new user (the password is hashed on the bcrypt pool)
+        user = password_hasher.run(
+            User,
             email=data['email'],
             username=data['username'],
             password=data['password'],
@@ -80,6 +92,9 @@ def register():
         
         return jsonify(login_response_schema.dump(response_data)), 201
         
+    except PasswordHashingBusy:
+        return busy_response()
+    
     except IntegrityError as e:
         db.session.rollback()
         
@@ -122,7 +137,12 @@ def login():
     # Find user by email
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not user.check_password(data['password']):
+    try:
+        password_ok = user is not None and verify_and_upgrade(user, data['password'])
+    except PasswordHashingBusy:
+        return busy_response()
+    
+    if not password_ok:
         return jsonify(error_schema.dump({
             'message': 'Invalid email or password'
         })), 401
@@ -167,7 +187,7 @@ def refresh():
     current_user_id = get_jwt_identity()
     
     # Verify user still exists and is active
-    user = User.query.get(current_user_id)
+    user = get_user_identity(current_user_id)
     if not user or not user.is_active:
         return jsonify(error_schema.dump({
             'message': 'User not found or inactive'
@@ -204,15 +224,14 @@ def logout():
 @jwt_required()
 def profile():
     """Get user profile"""
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = get_user_identity()
     
     if not user:
         return jsonify(error_schema.dump({
             'message': 'User not found'
         })), 404
     
-    return jsonify(user_response_schema.dump(user.to_dict(include_sensitive=True))), 200
+    return jsonify(user_response_schema.dump(user.profile)), 200
 
 
 @auth_bp.route('/profile', methods=['PUT'])
@@ -272,14 +291,17 @@ def change_password():
             'errors': err.messages
         })), 400
     
-    # Verify current password
-    if not user.check_password(data['current_password']):
-        return jsonify(error_schema.dump({
-            'message': 'Current password is incorrect'
-        })), 400
-    
-    # Set new password
-    user.set_password(data['new_password'])
+    try:
+        # Verify current password
+        if not password_hasher.run(user.check_password, data['current_password']):
+            return jsonify(error_schema.dump({
+                'message': 'Current password is incorrect'
+            })), 400
+        
+        # Set new password
+        password_hasher.run(user.set_password, data['new_password'])
+    except PasswordHashingBusy:
+        return busy_response()
     
     try:
         db.session.commit()
@@ -301,8 +323,7 @@ def change_password():
 @jwt_required()
 def verify_token():
     """Verify if current token is valid"""
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = get_user_identity()
     
     if not user or not user.is_active:
         return jsonify(error_schema.dump({
@@ -311,5 +332,5 @@ def verify_token():
     
     return jsonify({
         'valid': True,
-        'user': user_response_schema.dump(user.to_dict())
+        'user': user_response_schema.dump(user.public_profile)
     }), 200
@@ -1,23 +1,307 @@
 """
 Export API endpoints
 """
-from flask import Blueprint, request, jsonify
+import uuid
+
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from marshmallow import Schema, fields, ValidationError, validate
+
+from ..extensions import db
+from ..models import Job
+from ..models.asset import Asset, AssetType, AssetStatus
+from ..models.job import JobType, JobStatus, JobPriority
+from ..services.storage import storage_service
+from ..services.export import (
+    FORMATS, PACKAGE_KINDS, parse_ladder, source_key, manifest_object_name, package_manifest_name, load_manifest,
+    claim_in_progress, normalize_package_config
+)
 
 export_bp = Blueprint('export', __name__)
 
 
+class CourseExportSchema(Schema):
+    """Schema for batch course export requests."""
+    video_ids = fields.List(fields.Int(), required=True, validate=validate.Length(min=1),
+                            error_messages={'required': 'video_ids is required'})
+    titles = fields.List(fields.Str(validate=validate.Length(max=200)), load_default=None)
+    title = fields.Str(load_default=None, validate=validate.Length(max=200))
+    formats = fields.List(fields.Str(validate=validate.OneOf(list(FORMATS))), load_default=list)
+    package = fields.Str(load_default=None, allow_none=True, validate=validate.OneOf(PACKAGE_KINDS))
+    scorm_version = fields.Str(load_default='1.2')
+    renditions = fields.List(fields.Str(), load_default=None)
+    completion_threshold = fields.Float(load_default=0.9)
+    priority = fields.Str(load_default='normal', validate=lambda x: x in ['low', 'normal', 'high', 'urgent'])
+
+
+def _with_download_urls(manifest):
+    """Copy of a manifest with a fresh download URL on each rendition"""
+    urls = storage_service.get_presigned_urls(
+        (r['object_name'], r.get('bucket_name')) for r in manifest['renditions']
+    )
+    bucket_default = current_app.config.get('MINIO_BUCKET_NAME')
+    return {
+        **manifest,
+        'renditions': [
+            {**r, 'download_url': urls.get((r.get('bucket_name') or bucket_default, r['object_name']))}
+            for r in manifest['renditions']
+        ]
+    }
+
+
 @export_bp.route('/video/<int:video_id>/<format>', methods=['GET'])
 @jwt_required()
 def export_video(video_id, format):
-    """Export video in specified format"""
-    # TODO: Implement video export
-    return jsonify({'message': f'Export video {video_id} as {format} - coming soon'}), 501
+    """
+    Export video in specified format
+    
+    Query parameters:
+        renditions: Comma-separated ladder rungs, e.g. "1080p,720p,480p"
+    
+    Returns the renditions with download URLs if this export was produced
+    before; otherwise starts (or joins) the export task and returns 202 with
+    its task ID. Repeat the request once the task completes for fresh URLs.
+    """
+    user_id = get_jwt_identity()
+    if format not in FORMATS:
+        return jsonify({'error': f"Unsupported format '{format}'", 'formats': list(FORMATS)}), 400
+    
+    ladder = request.args.get('renditions')
+    try:
+        requested = parse_ladder(ladder, current_app.config.get('EXPORT_DEFAULT_RENDITIONS', '720p,480p,360p'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    video = Asset.query.filter_by(id=video_id, user_id=user_id, asset_type=AssetType.GENERATED_VIDEO).first()
+    if not video:
+        return jsonify({'error': 'Video not found'}), 404
+    if video.status != AssetStatus.READY:
+        return jsonify({'error': 'Video is not ready'}), 400
+    
+    # A repeat export is a storage lookup
+    manifest_name = manifest_object_name(source_key(video), 'video', format, requested)
+    manifest = load_manifest(manifest_name)
+    if manifest:
+        return jsonify({'status': 'completed', 'cached': True, 'export': _with_download_urls(manifest)}), 200
+    
+    from ..tasks.export_tasks import export_video_format
+    task_id = str(uuid.uuid4())
+    running = claim_in_progress(manifest_name, task_id, current_app.config.get('EXPORT_TIMEOUT', 3600) + 600)
+    if not running:
+        export_video_format.apply_async(
+            args=[video_id, format, user_id],
+            kwargs={'renditions': ','.join(r.name for r in requested)},
+            task_id=task_id
+        )
+    task_id = running or task_id
+    
+    return jsonify({
+        'status': 'processing',
+        'task_id': task_id,
+        'status_url': f'/api/worker/task/{task_id}',
+        'renditions': [r.name for r in requested]
+    }), 202
+
+
+def _package_export(kind, video_id):
+    """
+    Return a cached SCORM/HTML5 package or start (or join) the task building it
+    
+    The JSON body is the package configuration; identical configurations of
+    the same video share one package.
+    """
+    user_id = get_jwt_identity()
+    try:
+        config = normalize_package_config(
+            kind, request.get_json(silent=True) or {},
+            current_app.config.get('PACKAGE_DEFAULT_RENDITIONS', '720p,360p')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    video = Asset.query.filter_by(id=video_id, user_id=user_id, asset_type=AssetType.GENERATED_VIDEO).first()
+    if not video:
+        return jsonify({'error': 'Video not found'}), 404
+    if video.status != AssetStatus.READY:
+        return jsonify({'error': 'Video is not ready'}), 400
+    
+    manifest_name = package_manifest_name(source_key(video), kind, config)
+    manifest = load_manifest(manifest_name)
+    if manifest:
+        download_url = storage_service.get_presigned_url(manifest['object_name'], manifest.get('bucket_name'))
+        return jsonify({
+            'status': 'completed',
+            'cached': True,
+            'package': {**manifest, 'download_url': download_url}
+        }), 200
+    
+    from ..tasks.export_tasks import create_scorm_package, create_html5_package
+    task_id = str(uuid.uuid4())
+    running = claim_in_progress(manifest_name, task_id, current_app.config.get('EXPORT_TIMEOUT', 3600) + 600)
+    if not running:
+        if kind == 'scorm':
+            create_scorm_package.apply_async(args=[video_id, config, user_id], task_id=task_id)
+        else:
+            create_html5_package.apply_async(args=[video_id, user_id, config], task_id=task_id)
+    task_id = running or task_id
+    
+    return jsonify({
+        'status': 'processing',
+        'task_id': task_id,
+        'status_url': f'/api/worker/task/{task_id}',
+        'config': config
+    }), 202
 
 
 @export_bp.route('/scorm/<int:video_id>', methods=['POST'])
 @jwt_required()
 def export_scorm(video_id):
-    """Export video as SCORM package"""
-    # TODO: Implement SCORM export
-    return jsonify({'message': f'Export video {video_id} as SCORM - coming soon'}), 501
+    """
+    Export video as SCORM package
+    
+    JSON body (all optional):
+        scorm_version: "1.2" (default) or "2004"
+        title: Course title shown in the LMS
+        renditions: Ladder rungs to include, e.g. ["720p", "360p"]
+        completion_threshold: Fraction watched that marks it completed (0.9)
+    """
+    return _package_export('scorm', video_id)
+
+
+@export_bp.route('/html5/<int:video_id>', methods=['POST'])
+@jwt_required()
+def export_html5(video_id):
+    """Export video as standalone HTML5 package (same body as SCORM, without scorm_version)"""
+    return _package_export('html5', video_id)
+
+
+@export_bp.route('/course', methods=['POST'])
+@jwt_required()
+def export_course():
+    """
+    Export a whole course: many videos in one background job
+    
+    JSON body:
+        video_ids: Generated videos in course order
+        titles: Optional lecture titles, one per video (default: file names)
+        title: Course title
+        formats: Renditions to export per video, e.g. ["mp4", "webm"]
+        package: "scorm" or "html5" for a single course package with one
+            lecture per video sharing one copy of the player
+        scorm_version, renditions, completion_threshold: As for /scorm
+    
+    Lectures are exported a few at a time across workers; follow the
+    aggregated progress on /api/jobs/<id>/stream or /api/export/course/<id>.
+    """
+    try:
+        data = CourseExportSchema().load(request.get_json() or {})
+    except ValidationError as e:
+        return jsonify({'error': 'Validation failed', 'details': e.messages}), 400
+    
+    user_id = get_jwt_identity()
+    video_ids = data['video_ids']
+    if len(set(video_ids)) != len(video_ids):
+        return jsonify({'error': 'video_ids must not repeat a video'}), 400
+    max_videos = current_app.config.get('COURSE_EXPORT_MAX_VIDEOS', 100)
+    if len(video_ids) > max_videos:
+        return jsonify({'error': f'A course export is limited to {max_videos} videos'}), 400
+    if data['titles'] is not None and len(data['titles']) != len(video_ids):
+        return jsonify({'error': 'titles must have one entry per video'}), 400
+    formats = list(dict.fromkeys(data['formats']))
+    if not formats and not data['package']:
+        return jsonify({'error': 'Request at least one format or a package'}), 400
+    
+    # One ladder for the whole course, shared by the exports and the package
+    default_renditions = current_app.config.get(
+        'PACKAGE_DEFAULT_RENDITIONS' if data['package'] else 'EXPORT_DEFAULT_RENDITIONS', '720p,360p'
+    )
+    try:
+        ladder = parse_ladder(','.join(data['renditions'] or []), default_renditions)
+        package_config = normalize_package_config(data['package'], {
+            'renditions': [r.name for r in ladder],
+            'title': data['title'],
+            'completion_threshold': data['completion_threshold'],
+            'scorm_version': data['scorm_version']
+        }, default_renditions) if data['package'] else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    videos = {
+        video.id: video for video in Asset.query.filter(
+            Asset.id.in_(video_ids), Asset.user_id == user_id, Asset.asset_type == AssetType.GENERATED_VIDEO
+        )
+    }
+    missing = [video_id for video_id in video_ids if video_id not in videos]
+    if missing:
+        return jsonify({'error': 'Videos not found', 'video_ids': missing}), 404
+    not_ready = [video_id for video_id in video_ids if videos[video_id].status != AssetStatus.READY]
+    if not_ready:
+        return jsonify({'error': 'Videos are not ready', 'video_ids': not_ready}), 400
+    
+    title = data['title'] or f"Course export ({len(video_ids)} videos)"
+    job = Job(
+        title=title[:100],
+        job_type=JobType.FULL_PIPELINE,
+        user_id=user_id,
+        status=JobStatus.PENDING,
+        priority=JobPriority[data['priority'].upper()],
+        description=f"Export of {len(video_ids)} videos"
+                    + (f" as a {data['package']} package" if data['package'] else ''),
+        parameters={
+            'pipeline_type': 'course_export',
+            'video_ids': video_ids,
+            'titles': data['titles'],
+            'formats': formats,
+            'renditions': [r.name for r in ladder],
+            'package': data['package'],
+            'package_config': package_config
+        }
+    )
+    for video_id in video_ids:
+        job.add_asset(videos[video_id])
+    db.session.add(job)
+    db.session.commit()
+    
+    from ..tasks.export_tasks import export_course as export_course_task
+    task_result = export_course_task.delay(job.id)
+    job.celery_task_id = task_result.id
+    db.session.commit()
+    
+    return jsonify({
+        'job_id': job.id,
+        'task_id': task_result.id,
+        'status': job.status.value,
+        'status_url': f'/api/export/course/{job.id}',
+        'parameters': job.parameters
+    }), 202
+
+
+@export_bp.route('/course/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_course_export(job_id):
+    """Progress of a course export per lecture, with download URLs once completed"""
+    user_id = get_jwt_identity()
+    job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job or (job.parameters or {}).get('pipeline_type') != 'course_export':
+        return jsonify({'error': 'Course export not found'}), 404
+    
+    # Also checked by beat; doing it here means a client polling never waits for the next run
+    from ..tasks.export_tasks import course_export_overdue, expire_course_export
+    if course_export_overdue(job) and expire_course_export(job.id):
+        db.session.refresh(job)
+    
+    results = job.results or {}
+    response = {
+        'job_id': job.id,
+        'status': job.status.value,
+        'progress_percentage': job.progress_percentage,
+        'lectures': results.get('lectures'),
+        'package': None
+    }
+    package = results.get('package')
+    if job.status == JobStatus.COMPLETED and package:
+        response['package'] = {
+            **package,
+            'download_url': storage_service.get_presigned_url(package['object_name'], package.get('bucket_name'))
+        }
+    return jsonify(response), 200
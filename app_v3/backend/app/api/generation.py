@@ -6,14 +6,21 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError, validate
 
 from ..extensions import db
-from ..models import Job, Asset, User
+from ..models import Job, Asset
 from ..models.asset import AssetType, AssetStatus
 from ..models.job import JobType, JobStatus, JobPriority
+from ..utils.cache import cached_response
+from ..auth import get_user_identity
 from ..tasks import generate_speech, validate_tts_service, generate_video, validate_video_service, generate_script, validate_llm_service
 
 generation_bp = Blueprint('generation', __name__)
 
 
+def _service_healthy(body):
+    """Only healthy status checks are cached, so an outage or recovery shows at once"""
+    return body.get('status') in ('success', 'healthy')
+
+
 class TTSRequestSchema(Schema):
     """Schema for text-to-speech requests."""
     text = fields.Str(required=True, validate=lambda x: len(x.strip()) > 0, 
@@ -67,6 +74,16 @@ class ScriptRequestSchema(Schema):
                       error_messages={'invalid': 'Title must be 100 characters or less'})
     description = fields.Str(load_default='', validate=lambda x: len(x) <= 500,
                             error_messages={'invalid': 'Description must be 500 characters or less'})
+    regenerate = fields.Bool(load_default=False)  # skip the prompt cache for a fresh variation
+
+
+class PipelineRequestSchema(ScriptRequestSchema):
+    """Schema for pipelined script-to-speech (and video) requests."""
+    voice_asset_id = fields.Int(required=True,
+                               error_messages={'required': 'Voice asset ID is required'})
+    portrait_asset_id = fields.Int(load_default=None, allow_none=True)  # also render video when given
+    title = fields.Str(load_default='Script to Speech', validate=lambda x: len(x.strip()) <= 100,
+                      error_messages={'invalid': 'Title must be 100 characters or less'})
 
 
 @generation_bp.route('/script', methods=['POST'])
@@ -86,7 +103,7 @@ def generate_script_endpoint():
         
         # Get current user
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_user_identity(current_user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -104,7 +121,8 @@ def generate_script_endpoint():
                 'target_audience': data.get('target_audience', 'general'),
                 'duration_minutes': data.get('duration_minutes', 5),
                 'style': data.get('style', 'conversational'),
-                'additional_context': data.get('additional_context', '')
+                'additional_context': data.get('additional_context', ''),
+                'regenerate': data.get('regenerate', False)
             }
         )
         
@@ -119,7 +137,8 @@ def generate_script_endpoint():
             target_audience=data.get('target_audience', 'general'),
             duration_minutes=data.get('duration_minutes', 5),
             style=data.get('style', 'conversational'),
-            additional_context=data.get('additional_context', '')
+            additional_context=data.get('additional_context', ''),
+            regenerate=data.get('regenerate', False)
         )
         
         # Update job with task ID
@@ -178,7 +197,7 @@ def text_to_speech():
         data = schema.load(request.get_json() or {})
         
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_user_identity(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -244,6 +263,7 @@ def text_to_speech():
 
 @generation_bp.route('/tts/status', methods=['GET'])
 @jwt_required()
+@cached_response('tts_service_status', ttl=60, scope='global', cache_if=_service_healthy)
 def tts_service_status():
     """
     Check the status of the TTS service (IndexTTS).
@@ -291,6 +311,7 @@ def tts_service_status():
 
 @generation_bp.route('/llm/status', methods=['GET'])
 @jwt_required()
+@cached_response('llm_service_status', ttl=60, scope='global', cache_if=_service_healthy)
 def llm_service_status():
     """
     Check the status of the LLM service (Llama-4).
@@ -363,7 +384,7 @@ def generate_video_endpoint():
         data = schema.load(request.get_json() or {})
         
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_user_identity(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -458,6 +479,7 @@ def generate_video_endpoint():
 
 @generation_bp.route('/video/status', methods=['GET'])
 @jwt_required()
+@cached_response('video_service_status', ttl=60, scope='global', cache_if=_service_healthy)
 def video_service_status():
     """
     Check the status of the video generation service (KDTalker).
@@ -493,6 +515,86 @@ def video_service_status():
 @generation_bp.route('/full-pipeline', methods=['POST'])
 @jwt_required()
 def full_pipeline():
-    """Run complete generation pipeline"""
-    # TODO: Implement full pipeline
-    return jsonify({'message': 'Full pipeline endpoint - coming soon'}), 501
+    """
+    Generate a script and speak it while it is being written
+    
+    Paragraphs go to TTS (and video rendering, with a portrait) as soon as
+    the LLM completes them; follow progress on /api/jobs/<id>/stream.
+    """
+    try:
+        data = PipelineRequestSchema().load(request.get_json() or {})
+        
+        current_user_id = get_jwt_identity()
+        user = get_user_identity(current_user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        voice_asset = Asset.query.filter_by(
+            id=data['voice_asset_id'], user_id=current_user_id, asset_type=AssetType.VOICE_SAMPLE
+        ).first()
+        if not voice_asset:
+            return jsonify({'error': 'Voice asset not found'}), 404
+        if voice_asset.status != AssetStatus.READY:
+            return jsonify({'error': 'Voice asset is not ready'}), 400
+        
+        if data.get('portrait_asset_id'):
+            portrait_asset = Asset.query.filter_by(
+                id=data['portrait_asset_id'], user_id=current_user_id, asset_type=AssetType.PORTRAIT
+            ).first()
+            if not portrait_asset:
+                return jsonify({'error': 'Portrait asset not found'}), 404
+            if portrait_asset.status != AssetStatus.READY:
+                return jsonify({'error': 'Portrait asset is not ready'}), 400
+        
+        script_params = {
+            'topic': data.get('topic', ''),
+            'target_audience': data.get('target_audience', 'general'),
+            'duration_minutes': data.get('duration_minutes', 5),
+            'style': data.get('style', 'conversational'),
+            'additional_context': data.get('additional_context', ''),
+            'regenerate': data.get('regenerate', False)
+        }
+        job = Job(
+            title=data['title'],
+            job_type=JobType.FULL_PIPELINE,
+            user_id=current_user_id,
+            status=JobStatus.PENDING,
+            priority=JobPriority[data['priority'].upper()],
+            description=data.get('description') or f"Script to speech for: {data['prompt'][:100]}",
+            parameters={
+                'prompt': data['prompt'],
+                'voice_asset_id': data['voice_asset_id'],
+                'portrait_asset_id': data.get('portrait_asset_id'),
+                'pipelined': True,
+                **script_params
+            }
+        )
+        
+        db.session.add(job)
+        db.session.commit()
+        
+        from ..tasks.pipeline_tasks import scripted_speech_pipeline
+        task_result = scripted_speech_pipeline.delay(
+            job.id,
+            data['prompt'],
+            data['voice_asset_id'],
+            data.get('portrait_asset_id'),
+            **script_params
+        )
+        
+        job.celery_task_id = task_result.id
+        db.session.commit()
+        
+        return jsonify({
+            'job_id': job.id,
+            'task_id': task_result.id,
+            'status': job.status.value,
+            'message': 'Pipelined generation started',
+            'parameters': job.parameters
+        }), 202
+        
+    except ValidationError as e:
+        return jsonify({'error': 'Validation failed', 'details': e.messages}), 400
+    except Exception as e:
+        current_app.logger.error(f"Pipelined generation error: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
@@ -1,8 +1,9 @@
 """
 Job management API endpoints
 """
+import json
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 from sqlalchemy import and_, or_, desc
@@ -14,6 +15,7 @@ from ..schemas import (
     JobProgressUpdateSchema, JobStepCreateSchema, JobStepSchema,
     MessageResponseSchema, ErrorResponseSchema, PaginationSchema
 )
+from ..services.progress import iter_progress_events, EVENT_DONE, EVENT_ERROR
 from ..utils import handle_errors
 
 # Initialize logger
@@ -276,7 +278,8 @@ def create_job():
             target_audience=job.parameters.get('target_audience', 'general'),
             duration_minutes=job.parameters.get('duration_minutes', 5),
             style=job.parameters.get('style', 'conversational'),
-            additional_context=job.parameters.get('additional_context', '')
+            additional_context=job.parameters.get('additional_context', ''),
+            regenerate=job.parameters.get('regenerate', False)
         )
         logger.info(f"✅ Dispatched script generation task: {task_result.id}")
     elif job.job_type == JobType.FULL_PIPELINE:
@@ -286,6 +289,7 @@ def create_job():
         portrait_asset_id = job.parameters.get('portrait_asset_id')
         voice_asset_id = job.parameters.get('voice_asset_id')
         script = job.parameters.get('script')
+        prompt = job.parameters.get('prompt')
         
         logger.info(f"📋 Full pipeline parameters:")
         logger.info(f"  - Portrait Asset ID: {portrait_asset_id}")
@@ -294,7 +298,24 @@ def create_job():
         logger.info(f"  - Script preview: {script[:100] + '...' if script and len(script) > 100 else script}")
         logger.info(f"  - All parameters: {job.parameters}")
         
-        if not portrait_asset_id or not voice_asset_id or not script:
+        if prompt and not script and voice_asset_id:
+            # No script yet: write it and speak it paragraph by paragraph
+            # (video too when a portrait is given)
+            from ..tasks.pipeline_tasks import scripted_speech_pipeline
+            task_result = scripted_speech_pipeline.delay(
+                job.id,
+                prompt,
+                voice_asset_id,
+                portrait_asset_id,
+                topic=job.parameters.get('topic', ''),
+                target_audience=job.parameters.get('target_audience', 'general'),
+                duration_minutes=job.parameters.get('duration_minutes', 5),
+                style=job.parameters.get('style', 'conversational'),
+                additional_context=job.parameters.get('additional_context', ''),
+                regenerate=job.parameters.get('regenerate', False)
+            )
+            logger.info(f"✅ Dispatched pipelined script-to-speech task: {task_result.id}")
+        elif not portrait_asset_id or not voice_asset_id or not script:
             logger.error(f"❌ Full pipeline validation failed:")
             logger.error(f"  - Portrait Asset ID: {'✓' if portrait_asset_id else '✗'}")
             logger.error(f"  - Voice Asset ID: {'✓' if voice_asset_id else '✗'}")
@@ -553,6 +574,64 @@ def get_job_status(job_id):
     }), 200
 
 
+@jobs_bp.route('/<int:job_id>/stream', methods=['GET'])
+@jwt_required()
+@handle_errors
+def stream_job_progress(job_id):
+    """
+    Stream partial job output as server-sent events
+    
+    A stream holds an API worker, so it ends after
+    JOB_PROGRESS_STREAM_MAX_SECONDS; if the job is still running, the last
+    event is a 'status' event with ``reconnect: true`` and the client opens a
+    new stream (which replays the text so far).
+    """
+    user_id = get_jwt_identity()
+    
+    job = get_fresh_job(job_id, user_id)
+    
+    if not job:
+        return jsonify(error_schema.dump({
+            'message': 'Job not found'
+        })), 404
+    
+    from .. import extensions
+    if extensions.redis_client is None:
+        return jsonify({'error': 'Progress streaming unavailable'}), 503
+    
+    status = job.status
+    # Finished jobs only replay what is still stored for them
+    follow = status not in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+    # Don't hold a database connection for the lifetime of the stream
+    db.session.close()
+    
+    def format_event(event):
+        return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    def generate():
+        try:
+            for event in iter_progress_events(job_id, follow=follow):
+                if event is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(event)
+                if event['type'] in (EVENT_DONE, EVENT_ERROR):
+                    return
+        except Exception as e:
+            logger.error(f"Progress stream for job {job_id} failed: {e}")
+            yield format_event({'type': 'status', 'status': status.value})
+            return
+        # No outcome was published: the job finished before it could be
+        # (clients fall back to the stored status), or, while following, the
+        # stream reached its time limit and the client should reconnect
+        yield format_event({'type': 'status', 'status': status.value, 'reconnect': follow})
+    
+    return Response(
+        stream_with_context(generate()), mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @jobs_bp.route('/<int:job_id>', methods=['DELETE'])
 @jwt_required()
 @handle_errors
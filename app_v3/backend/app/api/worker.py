@@ -3,7 +3,7 @@ Worker management API endpoints
 """
 from flask import Blueprint, jsonify, current_app, request
 from flask_jwt_extended import jwt_required
-from ..extensions import redis_client
+from .. import extensions
 
 worker_bp = Blueprint('worker', __name__)
 
@@ -16,6 +16,7 @@ def ping_worker():
     """
     try:
         # Test Redis connection
+        redis_client = extensions.redis_client
         if redis_client:
             try:
                 redis_info = redis_client.ping()
@@ -77,6 +78,39 @@ def worker_status():
         }), 500
 
 
+@worker_bp.route('/password-hashing', methods=['GET'])
+@jwt_required()
+def password_hashing_status():
+    """
+    Queue depth and timings of this process's bcrypt hashing pool
+    """
+    from ..auth import password_hasher
+    
+    return jsonify(password_hasher.metrics()), 200
+
+
+@worker_bp.route('/llm-cache', methods=['GET'])
+@jwt_required()
+def llm_cache_status():
+    """
+    Hit rate and savings of the LLM prompt cache
+    """
+    from ..services.llm import prompt_cache
+    
+    return jsonify(prompt_cache.stats()), 200
+
+
+@worker_bp.route('/llm-scheduler', methods=['GET'])
+@jwt_required()
+def llm_scheduler_status():
+    """
+    Queue length, waits and provider backoffs of the LLM rate-limit scheduler
+    """
+    from ..services.llm.scheduler import scheduler
+    
+    return jsonify(scheduler.stats()), 200
+
+
 @worker_bp.route('/test-echo', methods=['POST'])
 @jwt_required()
 def test_echo():
@@ -2,5 +2,10 @@
 Authentication module for the Voice-Cloned Talking-Head Lecturer application
 """
 from .jwt_manager import JWTBlocklist
+from .passwords import password_hasher, PasswordHashingBusy, verify_and_upgrade
+from .identity import UserIdentity, get_user_identity, invalidate_user_identity
 
-__all__ = ['JWTBlocklist']
+__all__ = [
+    'JWTBlocklist', 'password_hasher', 'PasswordHashingBusy', 'verify_and_upgrade',
+    'UserIdentity', 'get_user_identity', 'invalidate_user_identity'
+]
@@ -0,0 +1,141 @@
+"""
+Cached user identity and role resolution.
+
+Authorization checks only need a user's id, role and active flag (plus the
+serialized profile for /profile and /verify-token), so those are resolved
+once per request and cached in Redis for a short TTL instead of loading the
+User row on every authorized request. Any committed change to a User evicts
+its entry, so role changes and deactivations take effect immediately.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from flask import current_app, g, has_app_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .. import extensions
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'user_identity_pending'
+
+
+@dataclass
+class UserIdentity:
+    """What authorization decisions need to know about a user"""
+    id: int
+    role: object  # UserRole
+    is_active: bool
+    profile: Dict = field(default_factory=dict)         # to_dict(include_sensitive=True)
+    public_profile: Dict = field(default_factory=dict)  # to_dict()
+
+
+def _cache_key(user_id) -> str:
+    return f"user_identity:{user_id}"
+
+
+def _from_user(user) -> UserIdentity:
+    return UserIdentity(
+        id=user.id,
+        role=user.role,
+        is_active=bool(user.is_active),
+        profile=user.to_dict(include_sensitive=True),
+        public_profile=user.to_dict()
+    )
+
+
+def _load(user_id) -> Optional[UserIdentity]:
+    """Resolve from Redis, falling back to the database"""
+    from ..models import UserRole, User
+
+    redis_client = extensions.redis_client
+    if redis_client:
+        try:
+            cached = redis_client.get(_cache_key(user_id))
+            if cached is not None:
+                data = json.loads(cached)
+                data['role'] = UserRole(data['role'])
+                return UserIdentity(**data)
+        except Exception as e:
+            logger.warning(f"User identity cache unavailable: {e}")
+
+    user = User.query.get(user_id)
+    if not user:
+        return None
+
+    identity = _from_user(user)
+    if redis_client:
+        try:
+            redis_client.setex(
+                _cache_key(user_id),
+                current_app.config.get('USER_IDENTITY_CACHE_TTL', 60),
+                json.dumps({**identity.__dict__, 'role': identity.role.value}, default=str)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache user identity {user_id}: {e}")
+    return identity
+
+
+def get_user_identity(user_id=None) -> Optional[UserIdentity]:
+    """
+    Identity of ``user_id`` (default: the JWT subject), or None if the user
+    does not exist. Memoized for the rest of the request.
+    """
+    if user_id is None:
+        user_id = get_jwt_identity()
+    if user_id is None:
+        return None
+
+    user_id = str(user_id)
+    memo = g.setdefault('_user_identities', {})
+    if user_id not in memo:
+        memo[user_id] = _load(user_id)
+    return memo[user_id]
+
+
+def invalidate_user_identity(*user_ids):
+    """Evict cached identities (e.g. after a role change)"""
+    if has_app_context():
+        memo = g.get('_user_identities')
+        if memo:
+            for user_id in user_ids:
+                memo.pop(str(user_id), None)
+
+    redis_client = extensions.redis_client
+    if redis_client and user_ids:
+        try:
+            redis_client.delete(*[_cache_key(user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.warning(f"Failed to invalidate user identity cache: {e}")
+
+
+def _after_flush(session, flush_context):
+    from ..models import User
+
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.__dict__.get('id') is not None:
+            pending.add(obj.__dict__['id'])
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        invalidate_user_identity(*pending)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_identity_invalidation():
+    """Evict cached identities when users are updated or deleted (idempotent)"""
+    for name, listener in (('after_flush', _after_flush),
+                           ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
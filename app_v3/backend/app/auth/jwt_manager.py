@@ -1,43 +1,135 @@
 """
 JWT token management and blocklist functionality
 """
+import os
+import time
+import heapq
+import logging
 from datetime import datetime, timezone, timedelta
-from ..extensions import redis_client
+from .. import extensions
 import threading
 
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel used to evict near-cache entries in every process
+REVOCATION_CHANNEL = 'jwt_revocations'
+
 
 class JWTBlocklist:
     """Manage JWT token blocklist using Redis or in-memory fallback"""
     
-    # In-memory fallback storage (for development without Redis)
+    # In-memory fallback storage (for development without Redis):
+    # key -> expiry timestamp, plus a min-heap of (expiry, key) for cleanup
     _memory_store = {}
+    _expiry_heap = []
     _lock = threading.Lock()
     
+    # Process-local near-cache of Redis answers: key -> (revoked, expires_monotonic)
+    _near_cache = {}
+    _near_cache_ttl = 5.0
+    _near_cache_max_entries = 50000
+    _subscriber_pid = None
+    _subscriber_lock = threading.Lock()
+    
+    @classmethod
+    def init_app(cls, app):
+        """Read near-cache settings from the app config"""
+        cls._near_cache_ttl = float(app.config.get('JWT_REVOCATION_CACHE_TTL', 5))
+        cls._near_cache_max_entries = int(app.config.get('JWT_REVOCATION_CACHE_SIZE', 50000))
+    
+    @classmethod
+    def _ensure_subscriber(cls, redis_client):
+        """Start the invalidation listener once per process (after any fork)"""
+        pid = os.getpid()
+        if cls._subscriber_pid == pid:
+            return
+        with cls._subscriber_lock:
+            if cls._subscriber_pid == pid:
+                return
+            cls._near_cache = {}
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{REVOCATION_CHANNEL: cls._handle_invalidation})
+                pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+                cls._subscriber_pid = pid
+            except Exception as e:
+                logger.warning(f"JWT revocation listener unavailable, relying on near-cache TTL: {e}")
+    
+    @classmethod
+    def _handle_invalidation(cls, message):
+        """Evict a near-cache entry named in a revocation message"""
+        key = message.get('data')
+        if isinstance(key, bytes):
+            key = key.decode()
+        if key == '*':
+            cls._near_cache = {}
+        else:
+            cls._near_cache.pop(key, None)
+    
+    @classmethod
+    def _publish_invalidation(cls, redis_client, key):
+        cls._near_cache.pop(key, None)
+        try:
+            redis_client.publish(REVOCATION_CHANNEL, key)
+        except Exception as e:
+            logger.warning(f"Failed to publish JWT revocation for {key}: {e}")
+    
+    @classmethod
+    def _near_cache_get(cls, key, now):
+        entry = cls._near_cache.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        return None
+    
+    @classmethod
+    def _near_cache_set(cls, key, revoked, now):
+        if len(cls._near_cache) >= cls._near_cache_max_entries:
+            cls._near_cache = {}
+        cls._near_cache[key] = (revoked, now + cls._near_cache_ttl)
+    
     @classmethod
     def _get_store_key(cls, key_type, identifier):
         """Generate consistent store keys"""
         return f"{key_type}:{identifier}"
     
     @classmethod
-    def _is_expired(cls, expires_at):
-        """Check if a timestamp has expired"""
-        if isinstance(expires_at, datetime):
-            return datetime.now(timezone.utc) > expires_at
-        return False
-    
-    @classmethod
-    def _clean_expired_tokens(cls):
-        """Clean expired tokens from memory store"""
-        current_time = datetime.now(timezone.utc)
-        expired_keys = []
+    def _clean_expired_tokens(cls, now=None):
+        """Pop expired entries off the expiry heap (caller holds the lock)
         
-        for key, data in cls._memory_store.items():
-            if isinstance(data, dict) and 'expires_at' in data:
-                if current_time > data['expires_at']:
-                    expired_keys.append(key)
+        Each entry is pushed and popped once, so cleanup is amortized O(log n).
+        Heap entries whose key was deleted or re-added with another expiry are
+        skipped; the heap is rebuilt if such stale entries pile up.
+        """
+        now = now if now is not None else time.time()
+        heap = cls._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            if cls._memory_store.get(key) == expires_at:
+                del cls._memory_store[key]
         
-        for key in expired_keys:
-            del cls._memory_store[key]
+        if len(heap) > 2 * len(cls._memory_store) + 1024:
+            cls._expiry_heap = [(expires_at, key) for key, expires_at in cls._memory_store.items()]
+            heapq.heapify(cls._expiry_heap)
+    
+    @classmethod
+    def _memory_add(cls, key, expires_at):
+        """Store a key until ``expires_at`` (datetime)"""
+        expires_ts = expires_at.timestamp()
+        with cls._lock:
+            cls._memory_store[key] = expires_ts
+            heapq.heappush(cls._expiry_heap, (expires_ts, key))
+            cls._clean_expired_tokens()
+    
+    @classmethod
+    def _memory_contains(cls, key):
+        """O(1) lookup; expired entries not yet popped read as absent"""
+        expires_ts = cls._memory_store.get(key)
+        return expires_ts is not None and expires_ts > time.time()
+    
+    @classmethod
+    def _memory_remove(cls, key):
+        with cls._lock:
+            cls._memory_store.pop(key, None)
     
     @staticmethod
     def add_token_to_blocklist(jti, expires_at):
@@ -51,25 +143,25 @@ class JWTBlocklist:
         
         # Only store if TTL is positive (token hasn't expired yet)
         if ttl > 0:
+            redis_client = extensions.redis_client
             if redis_client:
                 try:
                     redis_client.setex(f"blocked_token:{jti}", ttl, "1")
+                    JWTBlocklist._publish_invalidation(redis_client, f"blocked_token:{jti}")
                     return
                 except Exception:
                     pass
             
             # Fallback to memory store
-            with JWTBlocklist._lock:
-                JWTBlocklist._clean_expired_tokens()
-                key = JWTBlocklist._get_store_key("blocked_token", jti)
-                JWTBlocklist._memory_store[key] = {
-                    'value': "1",
-                    'expires_at': expires_at if isinstance(expires_at, datetime) else datetime.fromtimestamp(expires_at, timezone.utc)
-                }
+            JWTBlocklist._memory_add(
+                JWTBlocklist._get_store_key("blocked_token", jti),
+                expires_at if isinstance(expires_at, datetime) else datetime.fromtimestamp(expires_at, timezone.utc)
+            )
     
     @staticmethod
     def is_token_revoked(jti):
         """Check if a JWT token is in the blocklist"""
+        redis_client = extensions.redis_client
         if redis_client:
             try:
                 return redis_client.exists(f"blocked_token:{jti}") > 0
@@ -77,35 +169,29 @@ class JWTBlocklist:
                 pass
         
         # Fallback to memory store
-        with JWTBlocklist._lock:
-            JWTBlocklist._clean_expired_tokens()
-            key = JWTBlocklist._get_store_key("blocked_token", jti)
-            data = JWTBlocklist._memory_store.get(key)
-            return data is not None and not JWTBlocklist._is_expired(data.get('expires_at'))
+        return JWTBlocklist._memory_contains(JWTBlocklist._get_store_key("blocked_token", jti))
     
     @staticmethod
     def revoke_all_user_tokens(user_id):
         """Revoke all tokens for a specific user (for security purposes)"""
         expires_at = datetime.now(timezone.utc) + timedelta(days=30)
         
+        redis_client = extensions.redis_client
         if redis_client:
             try:
                 redis_client.setex(f"user_revoked:{user_id}", 86400 * 30, "1")  # 30 days
+                JWTBlocklist._publish_invalidation(redis_client, f"user_revoked:{user_id}")
                 return
             except Exception:
                 pass
         
         # Fallback to memory store
-        with JWTBlocklist._lock:
-            key = JWTBlocklist._get_store_key("user_revoked", user_id)
-            JWTBlocklist._memory_store[key] = {
-                'value': "1",
-                'expires_at': expires_at
-            }
+        JWTBlocklist._memory_add(JWTBlocklist._get_store_key("user_revoked", user_id), expires_at)
     
     @staticmethod
     def is_user_tokens_revoked(user_id):
         """Check if all tokens for a user have been revoked"""
+        redis_client = extensions.redis_client
         if redis_client:
             try:
                 return redis_client.exists(f"user_revoked:{user_id}") > 0
@@ -113,24 +199,58 @@ class JWTBlocklist:
                 pass
         
         # Fallback to memory store
-        with JWTBlocklist._lock:
-            JWTBlocklist._clean_expired_tokens()
-            key = JWTBlocklist._get_store_key("user_revoked", user_id)
-            data = JWTBlocklist._memory_store.get(key)
-            return data is not None and not JWTBlocklist._is_expired(data.get('expires_at'))
+        return JWTBlocklist._memory_contains(JWTBlocklist._get_store_key("user_revoked", user_id))
     
     @staticmethod
     def clear_user_token_revocation(user_id):
         """Clear the user token revocation flag"""
+        redis_client = extensions.redis_client
         if redis_client:
             try:
                 redis_client.delete(f"user_revoked:{user_id}")
+                JWTBlocklist._publish_invalidation(redis_client, f"user_revoked:{user_id}")
                 return
             except Exception:
                 pass
         
         # Fallback to memory store
-        with JWTBlocklist._lock:
-            key = JWTBlocklist._get_store_key("user_revoked", user_id)
-            if key in JWTBlocklist._memory_store:
-                del JWTBlocklist._memory_store[key]
+        JWTBlocklist._memory_remove(JWTBlocklist._get_store_key("user_revoked", user_id))
+    
+    @staticmethod
+    def is_revoked(jti, user_id):
+        """
+        Check token and user revocation together
+        
+        Answers come from the process near-cache when fresh; otherwise both keys
+        are checked in a single pipelined Redis round trip. Revocations publish
+        an eviction so other processes see them before the TTL runs out.
+        """
+        redis_client = extensions.redis_client
+        if not redis_client:
+            return JWTBlocklist.is_token_revoked(jti) or JWTBlocklist.is_user_tokens_revoked(user_id)
+        
+        JWTBlocklist._ensure_subscriber(redis_client)
+        token_key = f"blocked_token:{jti}"
+        user_key = f"user_revoked:{user_id}"
+        now = time.monotonic()
+        
+        token_revoked = JWTBlocklist._near_cache_get(token_key, now)
+        if token_revoked:
+            return True
+        user_revoked = JWTBlocklist._near_cache_get(user_key, now)
+        if user_revoked:
+            return True
+        if token_revoked is False and user_revoked is False:
+            return False
+        
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.exists(token_key)
+            pipe.exists(user_key)
+            token_exists, user_exists = pipe.execute()
+        except Exception:
+            return JWTBlocklist.is_token_revoked(jti) or JWTBlocklist.is_user_tokens_revoked(user_id)
+        
+        JWTBlocklist._near_cache_set(token_key, token_exists > 0, now)
+        JWTBlocklist._near_cache_set(user_key, user_exists > 0, now)
+        return token_exists > 0 or user_exists > 0
@@ -0,0 +1,184 @@
+"""
+Bounded executor for bcrypt password hashing and verification.
+
+Hashes run on a small dedicated thread pool that caps how many run at once
+per process, behind a bounded queue. The calling request still waits for its
+result (up to PASSWORD_HASH_TIMEOUT), so this does not free request workers;
+what it adds is a limit: work beyond the pool plus the queue is rejected
+immediately with PasswordHashingBusy instead of piling up on CPU, e.g. when
+a whole class logs in at the same time.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+import bcrypt
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_BCRYPT_COST = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing queue is full or the operation did not finish in time"""
+
+
+class PasswordHasher:
+    """Process-wide bounded bcrypt executor with queue-depth metrics"""
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._init_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.workers = 2
+        self.max_queue = 32
+        self.timeout = 30.0
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.rehashed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def init_app(self, app):
+        """Read pool settings from the app config"""
+        self.workers = int(app.config.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+        self.max_queue = int(app.config.get('PASSWORD_HASH_MAX_QUEUE', 32))
+        self.timeout = float(app.config.get('PASSWORD_HASH_TIMEOUT', 30))
+
+    def _ensure_executor(self):
+        """Create the pool lazily, and again in forked children"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._init_lock:
+            if self._pid == pid:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+            self._reset_metrics()
+            self._pid = pid
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run ``fn`` on the hashing pool and wait (blocking) for the result.
+
+        The Flask app context is carried over so model methods that read the
+        config (e.g. BCRYPT_LOG_ROUNDS) behave as they would inline.
+
+        Raises:
+            PasswordHashingBusy: If the queue is full or the call times out
+        """
+        self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            with self._metrics_lock:
+                self.rejected += 1
+            raise PasswordHashingBusy('Password hashing queue is full')
+
+        app = current_app._get_current_object()
+        submitted = time.perf_counter()
+        with self._metrics_lock:
+            self.queued += 1
+
+        def task():
+            started = time.perf_counter()
+            with self._metrics_lock:
+                self.queued -= 1
+                self.in_flight += 1
+                self.total_wait_seconds += started - submitted
+            try:
+                with app.app_context():
+                    return fn(*args, **kwargs)
+            finally:
+                with self._metrics_lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+                    self.total_run_seconds += time.perf_counter() - started
+                self._slots.release()
+
+        future = self._executor.submit(task)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._metrics_lock:
+                self.timed_out += 1
+            raise PasswordHashingBusy('Password hashing timed out')
+
+    def hash_password(self, password: str, rounds: Optional[int] = None) -> str:
+        """Hash a password with the configured bcrypt cost"""
+        rounds = rounds or current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        return self.run(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+        )
+
+    def record_rehash(self):
+        with self._metrics_lock:
+            self.rehashed += 1
+
+    def metrics(self):
+        """Snapshot of pool configuration, queue depth and timings"""
+        with self._metrics_lock:
+            completed = self.completed
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self.queued,
+                'in_flight': self.in_flight,
+                'completed': completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'rehashed': self.rehashed,
+                'avg_wait_ms': round(self.total_wait_seconds / completed * 1000, 2) if completed else 0,
+                'avg_run_ms': round(self.total_run_seconds / completed * 1000, 2) if completed else 0
+            }
+
+
+def bcrypt_cost(password_hash) -> Optional[int]:
+    """Work factor of a bcrypt hash, or None if it is not a bcrypt hash"""
+    if isinstance(password_hash, bytes):
+        password_hash = password_hash.decode('utf-8', 'ignore')
+    match = _BCRYPT_COST.match(password_hash or '')
+    return int(match.group(1)) if match else None
+
+
+def needs_rehash(password_hash) -> bool:
+    """True if a bcrypt hash was made with a different cost than configured"""
+    cost = bcrypt_cost(password_hash)
+    return cost is not None and cost != current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+
+def verify_and_upgrade(user, password: str) -> bool:
+    """
+    Check a user's password on the hashing pool.
+
+    When it matches and the stored hash uses a different cost than
+    BCRYPT_LOG_ROUNDS, the hash is transparently replaced (caller commits),
+    so the cost can be retuned without a migration.
+    """
+    if not password_hasher.run(user.check_password, password):
+        return False
+
+    if needs_rehash(getattr(user, 'password_hash', None)):
+        try:
+            user.password_hash = password_hasher.hash_password(password)
+            password_hasher.record_rehash()
+        except PasswordHashingBusy:
+            # Not worth failing a valid login; try again next time
+            logger.info(f"Skipped password rehash for user {user.id}: hashing pool busy")
+    return True
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
@@ -21,10 +21,24 @@ class Config:
         'pool_recycle': 300,
     }
     
+    # Connection pooling (see extensions.build_engine_options). 'local' keeps a
+    # SQLAlchemy pool per process; 'pgbouncer' hands pooling to PgBouncer in
+    # transaction mode. Celery children (APP_PROCESS_ROLE=worker) run one task
+    # at a time, so they get a much smaller pool than API processes.
+    PROCESS_ROLE = os.environ.get('APP_PROCESS_ROLE', 'api')
+    DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'local')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '30'))  # seconds
+    WORKER_DB_POOL_SIZE = int(os.environ.get('WORKER_DB_POOL_SIZE', '1'))
+    WORKER_DB_MAX_OVERFLOW = int(os.environ.get('WORKER_DB_MAX_OVERFLOW', '1'))
+    
     # JWT settings
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    JWT_REVOCATION_CACHE_TTL = float(os.environ.get('JWT_REVOCATION_CACHE_TTL', '5'))  # seconds, per process
+    USER_IDENTITY_CACHE_TTL = int(os.environ.get('USER_IDENTITY_CACHE_TTL', '60'))  # seconds, in Redis
     
     # CORS settings
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:3001,http://localhost:3002').split(',')
@@ -44,6 +58,25 @@ class Config:
     MINIO_SECURE = os.environ.get('MINIO_SECURE', 'false').lower() == 'true'
     MINIO_BUCKET_NAME = os.environ.get('MINIO_BUCKET_NAME', 'voice-clone-assets')
     
+    # Presigned URLs are reused until this many seconds before they expire
+    PRESIGNED_URL_REFRESH_MARGIN = int(os.environ.get('PRESIGNED_URL_REFRESH_MARGIN', '300'))
+    PRESIGNED_URL_CACHE_SIZE = int(os.environ.get('PRESIGNED_URL_CACHE_SIZE', '10000'))
+    
+    # Uploads go straight from the browser to MinIO via presigned URLs. Files
+    # above the threshold are uploaded in parts; /api/assets/upload (bytes
+    # through the API process) is only served when proxy uploads are enabled.
+    ASSET_PROXY_UPLOADS_ENABLED = os.environ.get('ASSET_PROXY_UPLOADS_ENABLED', 'false').lower() == 'true'
+    UPLOAD_URL_EXPIRES = int(os.environ.get('UPLOAD_URL_EXPIRES', '3600'))  # seconds
+    MULTIPART_UPLOAD_THRESHOLD = int(os.environ.get('MULTIPART_UPLOAD_THRESHOLD', str(16 * 1024 * 1024)))
+    MULTIPART_PART_SIZE = int(os.environ.get('MULTIPART_PART_SIZE', str(8 * 1024 * 1024)))  # S3 minimum is 5MB
+    VOICE_SAMPLE_SAMPLE_RATE = int(os.environ.get('VOICE_SAMPLE_SAMPLE_RATE', '24000'))  # normalized voice samples
+    
+    # Files posted to the API are spooled to disk above this size and streamed
+    # to MinIO in UPLOAD_PART_SIZE chunks (S3 minimum 5MB)
+    UPLOAD_SPOOL_THRESHOLD = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD', str(1024 * 1024)))
+    UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR')  # None uses the system temp dir
+    UPLOAD_PART_SIZE = int(os.environ.get('UPLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+    
     # Redis/Celery settings (using new configuration format)
     broker_url = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     result_backend = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
@@ -56,6 +89,7 @@ class Config:
     # Legacy support for deprecated settings
     CELERY_BROKER_URL = broker_url
     CELERY_RESULT_BACKEND = result_backend
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', '2'))  # seconds
     
     # AI Service API Keys
     ZYPHRA_API_KEY = os.environ.get('ZYPHRA_API_KEY')
@@ -66,12 +100,85 @@ class Config:
     INDEXTTS_SPACE_NAME = os.environ.get('INDEXTTS_SPACE_NAME', 'hants/IndexTTS')
     OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', 'http://localhost:11434')
     
+    # Stream LLM output to the job progress channel as it is generated
+    LLM_STREAMING_ENABLED = os.environ.get('LLM_STREAMING_ENABLED', 'true').lower() == 'true'
+    
+    # How long a known LLM health status is shared across workers before re-probing
+    LLM_HEALTH_TTL = int(os.environ.get('LLM_HEALTH_TTL', '300'))  # seconds
+    
+    # Cache of LLM completions keyed on the built prompt, model and sampling settings
+    LLM_PROMPT_CACHE_ENABLED = os.environ.get('LLM_PROMPT_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_PROMPT_CACHE_NORMALIZED = os.environ.get('LLM_PROMPT_CACHE_NORMALIZED', 'true').lower() == 'true'  # also match ignoring case/punctuation/whitespace
+    LLM_PROMPT_CACHE_TTL = int(os.environ.get('LLM_PROMPT_CACHE_TTL', str(7 * 24 * 3600)))  # seconds
+    
+    # Long scripts are outlined first and drafted as sections in parallel
+    LLM_LONG_FORM_MIN_MINUTES = int(os.environ.get('LLM_LONG_FORM_MIN_MINUTES', '10'))
+    LLM_SECTION_WORDS = int(os.environ.get('LLM_SECTION_WORDS', '900'))
+    LLM_SECTION_CONCURRENCY = int(os.environ.get('LLM_SECTION_CONCURRENCY', '4'))  # section calls in flight per job
+    
+    # Provider rate limits enforced client-side across all workers (0 = unlimited)
+    LLM_RATE_LIMIT_RPM = int(os.environ.get('LLM_RATE_LIMIT_RPM', '60'))  # requests per minute
+    LLM_RATE_LIMIT_TPM = int(os.environ.get('LLM_RATE_LIMIT_TPM', '100000'))  # tokens per minute
+    LLM_QUEUE_TIMEOUT = int(os.environ.get('LLM_QUEUE_TIMEOUT', '600'))  # seconds a request may wait for capacity
+    LLM_RATE_LIMIT_RETRIES = int(os.environ.get('LLM_RATE_LIMIT_RETRIES', '5'))  # retries after 429/503 responses
+    
+    # Pipelined script-to-speech: paragraphs are synthesized while the script streams
+    PIPELINE_TTS_CONCURRENCY = int(os.environ.get('PIPELINE_TTS_CONCURRENCY', '2'))  # TTS calls in flight per job
+    PIPELINE_RENDER_CONCURRENCY = int(os.environ.get('PIPELINE_RENDER_CONCURRENCY', '1'))  # video segment renders in flight per job
+    PIPELINE_SEGMENT_MIN_CHARS = int(os.environ.get('PIPELINE_SEGMENT_MIN_CHARS', '200'))  # shorter paragraphs are merged
+    PIPELINE_SEGMENT_MAX_CHARS = int(os.environ.get('PIPELINE_SEGMENT_MAX_CHARS', '1200'))  # longer ones split at sentences
+    PIPELINE_PARAGRAPH_PAUSE = float(os.environ.get('PIPELINE_PARAGRAPH_PAUSE', '0.4'))  # seconds of silence between paragraphs
+    
+    # Job progress channel (Redis pub/sub + snapshot of partial output)
+    JOB_PROGRESS_FLUSH_INTERVAL = float(os.environ.get('JOB_PROGRESS_FLUSH_INTERVAL', '0.2'))  # seconds
+    JOB_PROGRESS_TTL = int(os.environ.get('JOB_PROGRESS_TTL', '3600'))  # seconds
+    # Each open stream occupies a (sync) gunicorn worker, so streams end after this
+    # and clients reconnect; raise it only when running gevent or gthread workers
+    JOB_PROGRESS_STREAM_MAX_SECONDS = int(os.environ.get('JOB_PROGRESS_STREAM_MAX_SECONDS', '25'))
+    
+    # Analytics rollup settings
+    ANALYTICS_ROLLUP_RECONCILE_INTERVAL = int(os.environ.get('ANALYTICS_ROLLUP_RECONCILE_INTERVAL', '3600'))  # seconds
+    ANALYTICS_ROLLUP_RECONCILE_DAYS = int(os.environ.get('ANALYTICS_ROLLUP_RECONCILE_DAYS', '2'))
+    
+    # Content-addressed blob storage; unreferenced blobs are kept for the grace
+    # period so an in-flight upload or generation can still claim them
+    BLOB_GC_INTERVAL = int(os.environ.get('BLOB_GC_INTERVAL', '3600'))  # seconds, 0 disables
+    BLOB_GC_GRACE_SECONDS = int(os.environ.get('BLOB_GC_GRACE_SECONDS', '86400'))
+    
+    # Video export: renditions are transcoded in one ffmpeg pass and cached in storage
+    EXPORT_DEFAULT_RENDITIONS = os.environ.get('EXPORT_DEFAULT_RENDITIONS', '720p,480p,360p')
+    EXPORT_TIMEOUT = int(os.environ.get('EXPORT_TIMEOUT', '3600'))  # seconds per transcode
+    PACKAGE_DEFAULT_RENDITIONS = os.environ.get('PACKAGE_DEFAULT_RENDITIONS', '720p,360p')  # SCORM/HTML5 packages
+    # Course exports: lectures exported at once per course, and videos per course
+    COURSE_EXPORT_CONCURRENCY = int(os.environ.get('COURSE_EXPORT_CONCURRENCY', '3'))
+    COURSE_EXPORT_MAX_VIDEOS = int(os.environ.get('COURSE_EXPORT_MAX_VIDEOS', '100'))
+    # A course export still unfinished this long after creation is failed (a lost
+    # lecture task would otherwise leave it processing forever); checked by beat
+    # every COURSE_EXPORT_CHECK_INTERVAL seconds (0 disables) and on status reads
+    COURSE_EXPORT_TIMEOUT = int(os.environ.get('COURSE_EXPORT_TIMEOUT', '21600'))  # seconds
+    COURSE_EXPORT_CHECK_INTERVAL = int(os.environ.get('COURSE_EXPORT_CHECK_INTERVAL', '600'))  # seconds
+    
+    # Adaptive streaming: generated videos are packaged as HLS (and optionally
+    # DASH) under their own storage prefix once generation completes
+    STREAM_PACKAGING_ENABLED = os.environ.get('STREAM_PACKAGING_ENABLED', 'true').lower() == 'true'
+    STREAM_RENDITIONS = os.environ.get('STREAM_RENDITIONS', '720p,480p,360p')
+    STREAM_SEGMENT_SECONDS = int(os.environ.get('STREAM_SEGMENT_SECONDS', '4'))
+    STREAM_DASH_ENABLED = os.environ.get('STREAM_DASH_ENABLED', 'false').lower() == 'true'
+    STREAM_URL_EXPIRES = int(os.environ.get('STREAM_URL_EXPIRES', '14400'))  # seconds playlist and segment URLs stay valid
+    
+    # Response cache (Redis); per-namespace TTL overrides in seconds
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_TTLS = {}
+    
     # GPU/Processing settings
     GPU_WORKERS = int(os.environ.get('GPU_WORKERS', '1'))
     MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', '3'))
     
     # Security settings
-    BCRYPT_LOG_ROUNDS = 12
+    BCRYPT_LOG_ROUNDS = 12  # existing hashes are upgraded on next login when this changes
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '32'))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '30'))  # seconds
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -106,6 +213,9 @@ class TestingConfig(Config):
     
     # Faster bcrypt for tests
     BCRYPT_LOG_ROUNDS = 4
+    
+    # Always hit the database in tests
+    RESPONSE_CACHE_ENABLED = False
 
 
 # Configuration dictionary
@@ -5,6 +5,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy.pool import NullPool
+import logging
+import threading
 import redis
 
 
@@ -19,6 +23,74 @@ redis_client = None
 # Initialize Celery
 celery = Celery('voice_clone_tasks')
 
+logger = logging.getLogger(__name__)
+
+
+def build_engine_options(config):
+    """
+    SQLAlchemy engine options for this process's role and pool mode
+    
+    - local/api: a regular QueuePool sized by DB_POOL_SIZE/DB_MAX_OVERFLOW
+    - local/worker: each Celery child runs one task at a time, so it keeps at
+      most WORKER_DB_POOL_SIZE + WORKER_DB_MAX_OVERFLOW connections
+    - pgbouncer: no client-side pool (NullPool) and no server-side prepared
+      statements, as required by PgBouncer transaction pooling
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if uri.startswith('sqlite'):
+        # SQLite picks its own pool class; sizing options do not apply
+        return options
+    
+    if config.get('DB_POOL_MODE', 'local') == 'pgbouncer':
+        for key in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping'):
+            options.pop(key, None)
+        options['poolclass'] = NullPool
+        connect_args = dict(options.get('connect_args') or {})
+        if uri.startswith('postgresql+psycopg:'):
+            # psycopg 3 prepares repeated statements server-side by default
+            connect_args.setdefault('prepare_threshold', None)
+        options['connect_args'] = connect_args
+        return options
+    
+    if config.get('PROCESS_ROLE') == 'worker':
+        options['pool_size'] = config.get('WORKER_DB_POOL_SIZE', 1)
+        options['max_overflow'] = config.get('WORKER_DB_MAX_OVERFLOW', 1)
+    else:
+        options['pool_size'] = config.get('DB_POOL_SIZE', 5)
+        options['max_overflow'] = config.get('DB_MAX_OVERFLOW', 10)
+    options['pool_timeout'] = config.get('DB_POOL_TIMEOUT', 30)
+    return options
+
+
+def _dispose_db_pools(close, **kwargs):
+    """Drop pooled connections of the configured Flask app's engines"""
+    app = getattr(celery, 'flask_app', None)
+    if app is None:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+@worker_process_init.connect(dispatch_uid='dispose_db_pools_after_fork')
+def _reset_db_pools_after_fork(**kwargs):
+    """
+    Forked Celery children must not reuse the parent's pooled connections.
+    close=False leaves the parent's sockets alone and gives the child an
+    empty pool of its own.
+    """
+    _dispose_db_pools(close=False)
+
+
+@worker_process_shutdown.connect(dispatch_uid='close_db_pools_on_shutdown')
+def _close_db_pools_on_shutdown(**kwargs):
+    """Return connections to Postgres/PgBouncer when a child exits"""
+    try:
+        _dispose_db_pools(close=True)
+    except Exception as e:
+        logger.warning(f"Failed to close database connections on worker shutdown: {e}")
+
 
 def make_celery(app):
     """Create Celery instance with Flask app context"""
@@ -33,6 +105,37 @@ def make_celery(app):
         enable_utc=app.config.get('enable_utc', True),
     )
     
+    # Periodic reconciliation of analytics rollups (run with `celery beat`)
+    reconcile_interval = app.config.get('ANALYTICS_ROLLUP_RECONCILE_INTERVAL')
+    if reconcile_interval:
+        celery.conf.beat_schedule = {
+            **(celery.conf.beat_schedule or {}),
+            'reconcile-analytics-rollups': {
+                'task': 'reconcile_analytics_rollups',
+                'schedule': float(reconcile_interval),
+            },
+        }
+    
+    gc_interval = app.config.get('BLOB_GC_INTERVAL')
+    if gc_interval:
+        celery.conf.beat_schedule = {
+            **(celery.conf.beat_schedule or {}),
+            'collect-blob-garbage': {
+                'task': 'collect_blob_garbage',
+                'schedule': float(gc_interval),
+            },
+        }
+    
+    course_check_interval = app.config.get('COURSE_EXPORT_CHECK_INTERVAL')
+    if course_check_interval:
+        celery.conf.beat_schedule = {
+            **(celery.conf.beat_schedule or {}),
+            'expire-course-exports': {
+                'task': 'expire_course_exports',
+                'schedule': float(course_check_interval),
+            },
+        }
+    
     # Store the Flask app instance
     celery.flask_app = app
     
@@ -53,15 +156,34 @@ def make_celery(app):
 
 
 def init_redis(app):
-    """Initialize Redis client"""
+    """Initialize Redis client
+    
+    The client connects on first use; connectivity is verified in the
+    background so app startup never waits on the network.
+    """
     global redis_client
     redis_url = app.config.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     
     try:
-        redis_client = redis.from_url(redis_url)
-        # Test the connection
-        redis_client.ping()
+        redis_client = redis.from_url(
+            redis_url,
+            socket_connect_timeout=app.config.get('REDIS_CONNECT_TIMEOUT', 2)
+        )
+    except Exception as e:
+        app.logger.warning(f"Redis configuration failed: {e}. Using in-memory fallback for JWT blocklist.")
+        redis_client = None
+        return
+    
+    threading.Thread(target=_verify_redis, args=(app, redis_client), daemon=True).start()
+
+
+def _verify_redis(app, client):
+    """Fall back to in-memory stores if Redis turns out to be unreachable"""
+    global redis_client
+    try:
+        client.ping()
         app.logger.info("Redis connected successfully")
     except Exception as e:
         app.logger.warning(f"Redis connection failed: {e}. Using in-memory fallback for JWT blocklist.")
-        redis_client = None
+        if redis_client is client:
+            redis_client = None
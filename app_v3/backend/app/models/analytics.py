@@ -0,0 +1,88 @@
+"""
+Pre-aggregated analytics rollup models
+"""
+from datetime import datetime
+from ..extensions import db
+
+
+class JobDailyRollup(db.Model):
+    """Terminal job counts and processing time per day x job_type x status"""
+    __tablename__ = 'job_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'job_type', 'status', name='uq_job_daily_rollup'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+
+    job_count = db.Column(db.Integer, nullable=False, default=0)
+    # Sum of (completed_at - created_at) over jobs that have both timestamps
+    total_processing_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    processing_samples = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert rollup to dictionary"""
+        return {
+            'day': self.day.isoformat(),
+            'job_type': self.job_type,
+            'status': self.status,
+            'job_count': self.job_count,
+            'total_processing_seconds': self.total_processing_seconds,
+            'processing_samples': self.processing_samples
+        }
+
+
+class ModelUsageDailyRollup(db.Model):
+    """Terminal job counts per day x job_type x status x model"""
+    __tablename__ = 'model_usage_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'job_type', 'status', 'model_type', 'model_name',
+                            name='uq_model_usage_daily_rollup'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    model_type = db.Column(db.String(50), nullable=False)   # tts, video, llm, ...
+    model_name = db.Column(db.String(255), nullable=False)
+
+    job_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert rollup to dictionary"""
+        return {
+            'day': self.day.isoformat(),
+            'job_type': self.job_type,
+            'status': self.status,
+            'model_type': self.model_type,
+            'model_name': self.model_name,
+            'job_count': self.job_count
+        }
+
+
+class StageLatencyBucket(db.Model):
+    """One bucket of a log-scaled latency histogram per day x stage x backend x hardware tier"""
+    __tablename__ = 'stage_latency_buckets'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'stage', 'backend', 'hardware_tier', 'bucket',
+                            name='uq_stage_latency_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    stage = db.Column(db.String(50), nullable=False)           # queue_wait, asset_download, tts, ...
+    backend = db.Column(db.String(50), nullable=False)         # celery, minio, indextts, kdtalker, llm
+    hardware_tier = db.Column(db.String(50), nullable=False)   # Space hardware (t4-small, ...) or 'n/a'
+    bucket = db.Column(db.Integer, nullable=False)
+
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    total_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
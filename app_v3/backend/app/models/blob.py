@@ -0,0 +1,46 @@
+"""
+Content-addressed storage blob model
+"""
+from datetime import datetime
+from ..extensions import db
+
+
+class StorageBlob(db.Model):
+    """
+    A stored object identified by the SHA-256 of its content
+
+    Assets whose storage_path equals a blob's object_name share that object;
+    ref_count tracks how many assets do. Blobs left unreferenced are removed
+    by garbage collection after a grace period.
+    """
+    __tablename__ = 'storage_blobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    bucket_name = db.Column(db.String(100), nullable=False)
+    object_name = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(100))
+
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    # Set when ref_count drops to zero; garbage collection waits out a grace period
+    unreferenced_at = db.Column(db.DateTime, index=True)
+
+    # Results of post-upload processing shared by every referencing asset
+    # (probe info, normalized derivative object names)
+    derived = db.Column(db.JSON)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert blob to dictionary"""
+        return {
+            'sha256': self.sha256,
+            'bucket_name': self.bucket_name,
+            'object_name': self.object_name,
+            'size': self.size,
+            'content_type': self.content_type,
+            'ref_count': self.ref_count,
+            'unreferenced_at': self.unreferenced_at.isoformat() if self.unreferenced_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -183,6 +183,19 @@ class PresignedUrlSchema(Schema):
     ]))
     file_size = fields.Int(required=True, validate=validate.Range(min=1))
     content_type = fields.Str(required=True, validate=validate.Length(max=100))
+    description = fields.Str(allow_none=True, validate=validate.Length(max=1000))
+    sha256 = fields.Str(allow_none=True, validate=validate.Regexp(r'^[0-9a-fA-F]{64}$'))
+
+
+class UploadPartSchema(Schema):
+    """Schema for a part of a multipart upload"""
+    part_number = fields.Int(required=True, validate=validate.Range(min=1, max=10000))
+    etag = fields.Str(required=True, validate=validate.Length(min=1, max=100))
+
+
+class ConfirmUploadSchema(Schema):
+    """Schema for confirming a presigned upload"""
+    parts = fields.List(fields.Nested(UploadPartSchema), load_default=None)
 
 
 class PresignedUrlResponseSchema(Schema):
@@ -0,0 +1,14 @@
+"""
+Analytics services package for pre-aggregated dashboard data.
+"""
+from .rollups import register_rollup_listeners, reconcile_rollups, record_terminal_job, TERMINAL_STATUSES
+from .histograms import (
+    StageTimings, stage_latency_summary,
+    STAGE_QUEUE_WAIT, STAGE_ASSET_DOWNLOAD, STAGE_SCRIPT, STAGE_TTS, STAGE_VIDEO_RENDER, STAGE_UPLOAD
+)
+
+__all__ = [
+    'register_rollup_listeners', 'reconcile_rollups', 'record_terminal_job', 'TERMINAL_STATUSES',
+    'StageTimings', 'stage_latency_summary',
+    'STAGE_QUEUE_WAIT', 'STAGE_ASSET_DOWNLOAD', 'STAGE_SCRIPT', 'STAGE_TTS', 'STAGE_VIDEO_RENDER', 'STAGE_UPLOAD'
+]
@@ -0,0 +1,198 @@
+"""
+Per-stage latency histograms for the generation pipeline.
+
+Latencies are stored as log-scaled bucket counts (HDR-style, ~2.5% relative
+error) keyed by day, stage, backend and Space hardware tier. Each bucket is
+its own row that is incremented atomically, so histograms from any number of
+workers merge by summing counts and percentiles can be read back for any
+combination of days, backends or tiers.
+"""
+import math
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...extensions import db
+from ...models.analytics import StageLatencyBucket
+from .rollups import upsert_increment
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages recorded by the tasks
+STAGE_QUEUE_WAIT = 'queue_wait'
+STAGE_ASSET_DOWNLOAD = 'asset_download'
+STAGE_SCRIPT = 'script_generation'
+STAGE_TTS = 'tts'
+STAGE_VIDEO_RENDER = 'video_render'
+STAGE_UPLOAD = 'upload'
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+NO_HARDWARE = 'n/a'
+
+# Bucket i covers [MIN_SECONDS * GROWTH**i, MIN_SECONDS * GROWTH**(i + 1))
+MIN_SECONDS = 0.001
+GROWTH = 1.05
+MAX_BUCKET = 400  # ~3.5 days; anything slower is clamped into the last bucket
+
+
+def bucket_for(seconds: float) -> int:
+    """Map a latency to its histogram bucket"""
+    if seconds <= MIN_SECONDS:
+        return 0
+    return min(int(math.log(seconds / MIN_SECONDS) / math.log(GROWTH)), MAX_BUCKET)
+
+
+def bucket_value(bucket: int) -> float:
+    """Representative latency of a bucket (geometric midpoint)"""
+    return MIN_SECONDS * GROWTH ** (bucket + 0.5)
+
+
+def percentiles_from_buckets(counts: Dict[int, int],
+                             percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Optional[float]]:
+    """Compute percentiles from merged {bucket: count} histogram data"""
+    total = sum(counts.values())
+    result = {}
+    if total == 0:
+        return {f'p{p:g}': None for p in percentiles}
+
+    ordered = sorted(counts.items())
+    for p in percentiles:
+        rank = max(1, math.ceil(total * p / 100.0))
+        seen = 0
+        for bucket, count in ordered:
+            seen += count
+            if seen >= rank:
+                result[f'p{p:g}'] = round(bucket_value(bucket), 3)
+                break
+    return result
+
+
+def hardware_tier(space_metadata: Optional[Dict]) -> str:
+    """Extract the Space hardware tier from captured HF space metadata"""
+    if isinstance(space_metadata, dict):
+        runtime = space_metadata.get('runtime')
+        if isinstance(runtime, dict) and runtime.get('hardware') not in (None, 'unknown'):
+            return str(runtime['hardware'])[:50]
+    return NO_HARDWARE
+
+
+class StageTimings:
+    """
+    Collect per-stage timings during a task and write them to the histograms.
+
+    Timings are buffered so the hardware tier (only known once the Space
+    metadata has been captured) can be attached before anything is written.
+    """
+
+    def __init__(self):
+        self.samples: List[Tuple[str, str, float]] = []
+        self.hardware: Dict[str, str] = {}
+
+    def add(self, stage: str, backend: str, seconds: float):
+        """Record an already measured stage duration"""
+        if seconds is not None and seconds >= 0:
+            self.samples.append((stage, backend, float(seconds)))
+
+    def add_queue_wait(self, created_at: Optional[datetime]):
+        """Record time between job creation and the worker picking it up"""
+        if isinstance(created_at, datetime):
+            self.add(STAGE_QUEUE_WAIT, 'celery', (datetime.utcnow() - created_at).total_seconds())
+
+    @contextmanager
+    def measure(self, stage: str, backend: str):
+        """Time a block; only successful blocks are recorded"""
+        start = time.perf_counter()
+        yield
+        self.add(stage, backend, time.perf_counter() - start)
+
+    def set_hardware(self, backend: str, space_metadata: Optional[Dict]):
+        """Attach the Space hardware tier to all samples of a backend"""
+        self.hardware[backend] = hardware_tier(space_metadata)
+
+    def record(self, day: Optional[date] = None):
+        """
+        Add the buffered samples to the histograms in the current transaction.
+
+        The increments run in a savepoint, so a failure rolls back only them
+        and the job update committed with them still goes through.
+        """
+        if not self.samples:
+            return
+        day = day or datetime.utcnow().date()
+        try:
+            with db.session.begin_nested():
+                connection = db.session.connection()
+                for stage, backend, seconds in self.samples:
+                    upsert_increment(
+                        connection,
+                        StageLatencyBucket.__table__,
+                        {
+                            'day': day,
+                            'stage': stage,
+                            'backend': backend,
+                            'hardware_tier': self.hardware.get(backend, NO_HARDWARE),
+                            'bucket': bucket_for(seconds)
+                        },
+                        {'sample_count': 1, 'total_seconds': seconds}
+                    )
+            self.samples = []
+        except Exception as e:
+            logger.warning(f"Failed to record stage latency histograms: {e}")
+
+
+def stage_latency_summary(start_day: Optional[date] = None,
+                          percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict]:
+    """
+    Merge histograms since ``start_day`` into per-stage percentile summaries.
+
+    Returns:
+        Dict keyed by stage with overall percentiles plus breakdowns by backend
+        and by hardware tier
+    """
+    query = db.session.query(
+        StageLatencyBucket.stage,
+        StageLatencyBucket.backend,
+        StageLatencyBucket.hardware_tier,
+        StageLatencyBucket.bucket,
+        db.func.sum(StageLatencyBucket.sample_count),
+        db.func.sum(StageLatencyBucket.total_seconds)
+    ).group_by(
+        StageLatencyBucket.stage,
+        StageLatencyBucket.backend,
+        StageLatencyBucket.hardware_tier,
+        StageLatencyBucket.bucket
+    )
+    if start_day:
+        query = query.filter(StageLatencyBucket.day >= start_day)
+
+    # {stage: {'all': hist, 'by_backend': {name: hist}, 'by_hardware': {tier: hist}}}
+    merged: Dict[str, Dict] = {}
+    for stage, backend, tier, bucket, count, seconds in query.all():
+        count = int(count or 0)
+        seconds = float(seconds or 0)
+        stage_data = merged.setdefault(stage, {'all': {}, 'by_backend': {}, 'by_hardware': {}})
+        for hist in (stage_data['all'],
+                     stage_data['by_backend'].setdefault(backend, {}),
+                     stage_data['by_hardware'].setdefault(tier, {})):
+            hist.setdefault('buckets', {})
+            hist['buckets'][bucket] = hist['buckets'].get(bucket, 0) + count
+            hist['count'] = hist.get('count', 0) + count
+            hist['total_seconds'] = hist.get('total_seconds', 0.0) + seconds
+
+    def summarize(hist):
+        count = hist.get('count', 0)
+        summary = percentiles_from_buckets(hist.get('buckets', {}), percentiles)
+        summary['count'] = count
+        summary['mean'] = round(hist['total_seconds'] / count, 3) if count else None
+        return summary
+
+    return {
+        stage: {
+            **summarize(data['all']),
+            'by_backend': {name: summarize(hist) for name, hist in data['by_backend'].items()},
+            'by_hardware': {tier: summarize(hist) for tier, hist in data['by_hardware'].items()}
+        }
+        for stage, data in merged.items()
+    }
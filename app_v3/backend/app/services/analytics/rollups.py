@@ -0,0 +1,258 @@
+"""
+Incremental analytics rollups for the dashboard.
+
+Jobs are folded into the rollup tables when they reach a terminal state, via a
+session ``after_flush`` listener, so the dashboard never has to scan ``jobs``.
+A periodic reconciliation task rebuilds recent days from the raw table to
+correct anything the listener could not see (bulk updates, deleted jobs).
+"""
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, update, and_
+from sqlalchemy.orm import Session
+
+from ...extensions import db
+from ...models.analytics import JobDailyRollup, ModelUsageDailyRollup
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Jobs stored under another job type that would skew its counts and durations:
+# course exports are FULL_PIPELINE jobs tagged by their parameters
+EXCLUDED_PIPELINE_TYPES = ('course_export',)
+
+
+def enum_value(value) -> str:
+    """Safely get the string value from an enum column"""
+    if hasattr(value, 'value'):
+        return value.value
+    return str(value)
+
+
+def model_type_key(service_name: str) -> str:
+    """Map a service_metadata key to the dashboard model type"""
+    service_name = service_name.lower()
+    if service_name == 'indextts':
+        return 'tts'
+    if service_name == 'kdtalker':
+        return 'video'
+    return service_name
+
+
+def extract_models(service_metadata) -> List[Tuple[str, str]]:
+    """Return (model_type, model_name) pairs recorded in a job's service_metadata"""
+    if isinstance(service_metadata, str):
+        try:
+            service_metadata = json.loads(service_metadata)
+        except ValueError:
+            return []
+    if not isinstance(service_metadata, dict):
+        return []
+
+    models = []
+    for service_name, service_info in service_metadata.items():
+        if isinstance(service_info, dict):
+            model_name = str(service_info.get('model_name', 'unknown'))[:255]
+            models.append((model_type_key(service_name), model_name))
+    return models
+
+
+def excluded_from_rollups(parameters) -> bool:
+    """Whether a job with these parameters is left out of the rollups"""
+    if isinstance(parameters, str):
+        try:
+            parameters = json.loads(parameters)
+        except ValueError:
+            return False
+    return isinstance(parameters, dict) and parameters.get('pipeline_type') in EXCLUDED_PIPELINE_TYPES
+
+
+def _processing_seconds(created_at, completed_at) -> Optional[float]:
+    if isinstance(created_at, datetime) and isinstance(completed_at, datetime):
+        return (completed_at - created_at).total_seconds()
+    return None
+
+
+def upsert_increment(connection, table, keys: Dict, increments: Dict):
+    """Atomically add ``increments`` to the row identified by ``keys``"""
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table).values(**keys, **increments, updated_at=now)
+        set_ = {col: table.c[col] + stmt.excluded[col] for col in increments}
+        set_['updated_at'] = now
+        connection.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=set_))
+        return
+
+    # Generic fallback: update first, insert if the bucket does not exist yet
+    result = connection.execute(
+        update(table)
+        .where(and_(*[table.c[k] == v for k, v in keys.items()]))
+        .values({col: table.c[col] + val for col, val in increments.items()}, updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**keys, **increments, updated_at=now))
+
+
+def record_terminal_job(connection, day: date, job_type: str, status: str,
+                        processing_seconds: Optional[float] = None,
+                        models: Iterable[Tuple[str, str]] = ()):
+    """Fold one job that just reached a terminal state into the rollups"""
+    has_sample = status == 'completed' and processing_seconds is not None
+    upsert_increment(
+        connection,
+        JobDailyRollup.__table__,
+        {'day': day, 'job_type': job_type, 'status': status},
+        {
+            'job_count': 1,
+            'total_processing_seconds': processing_seconds if has_sample else 0.0,
+            'processing_samples': 1 if has_sample else 0
+        }
+    )
+    for model_type, model_name in set(models):
+        upsert_increment(
+            connection,
+            ModelUsageDailyRollup.__table__,
+            {'day': day, 'job_type': job_type, 'status': status,
+             'model_type': model_type, 'model_name': model_name},
+            {'job_count': 1}
+        )
+
+
+def _after_flush(session, flush_context):
+    """Record jobs whose status moved into a terminal state during this flush"""
+    from ...models.job import Job
+
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Job):
+            continue
+
+        history = inspect(obj).attrs.status.history
+        if not history.added:
+            continue
+
+        new_status = enum_value(history.added[0])
+        old_status = enum_value(history.deleted[0]) if history.deleted else None
+        if new_status not in TERMINAL_STATUSES or old_status in TERMINAL_STATUSES:
+            continue
+        if excluded_from_rollups(obj.__dict__.get('parameters')):
+            continue
+
+        # Read loaded state only; completed_at may still be an unfetched SQL expression
+        created_at = obj.__dict__.get('created_at')
+        completed_at = obj.__dict__.get('completed_at')
+        if not isinstance(created_at, datetime):
+            created_at = datetime.utcnow()
+        if not isinstance(completed_at, datetime):
+            completed_at = datetime.utcnow()
+
+        try:
+            # A savepoint, so a failed upsert rolls back alone instead of aborting
+            # the job update's transaction (Postgres refuses further statements).
+            # Session.begin_nested() would flush, which is not allowed inside a flush.
+            with session.connection().begin_nested():
+                record_terminal_job(
+                    session.connection(),
+                    day=created_at.date(),
+                    job_type=enum_value(obj.job_type),
+                    status=new_status,
+                    processing_seconds=_processing_seconds(created_at, completed_at),
+                    models=extract_models(obj.__dict__.get('service_metadata'))
+                )
+        except Exception as e:
+            # Never fail the job update because of analytics; reconciliation will catch up
+            logger.warning(f"Failed to update analytics rollup for job {obj.id}: {e}")
+
+
+def register_rollup_listeners():
+    """Attach the rollup listener to all ORM sessions (idempotent)"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+def reconcile_rollups(days: Optional[int] = 2) -> Dict[str, int]:
+    """
+    Rebuild rollups from the raw jobs table.
+
+    Args:
+        days: Number of most recent days to rebuild; None rebuilds all history
+
+    Returns:
+        Dict with the number of days, jobs and rollup rows written
+    """
+    from ...models.job import Job
+
+    start_day = (datetime.utcnow() - timedelta(days=days - 1)).date() if days else None
+
+    query = db.session.query(
+        Job.created_at, Job.completed_at, Job.job_type, Job.status, Job.service_metadata, Job.parameters
+    )
+    if start_day:
+        query = query.filter(Job.created_at >= datetime.combine(start_day, datetime.min.time()))
+
+    job_buckets = defaultdict(lambda: {'job_count': 0, 'total_processing_seconds': 0.0, 'processing_samples': 0})
+    model_buckets = defaultdict(int)
+    job_total = 0
+
+    for created_at, completed_at, job_type, status, service_metadata, parameters in query.yield_per(1000):
+        status = enum_value(status)
+        if status not in TERMINAL_STATUSES or not created_at or excluded_from_rollups(parameters):
+            continue
+
+        job_total += 1
+        key = (created_at.date(), enum_value(job_type), status)
+        bucket = job_buckets[key]
+        bucket['job_count'] += 1
+
+        seconds = _processing_seconds(created_at, completed_at)
+        if status == 'completed' and seconds is not None:
+            bucket['total_processing_seconds'] += seconds
+            bucket['processing_samples'] += 1
+
+        for model in set(extract_models(service_metadata)):
+            model_buckets[key + model] += 1
+
+    now = datetime.utcnow()
+    try:
+        for model in (JobDailyRollup, ModelUsageDailyRollup):
+            delete_query = model.query
+            if start_day:
+                delete_query = delete_query.filter(model.day >= start_day)
+            delete_query.delete(synchronize_session=False)
+
+        if job_buckets:
+            db.session.execute(JobDailyRollup.__table__.insert(), [
+                {'day': day, 'job_type': job_type, 'status': status, 'updated_at': now, **values}
+                for (day, job_type, status), values in job_buckets.items()
+            ])
+        if model_buckets:
+            db.session.execute(ModelUsageDailyRollup.__table__.insert(), [
+                {'day': day, 'job_type': job_type, 'status': status, 'model_type': model_type,
+                 'model_name': model_name, 'job_count': count, 'updated_at': now}
+                for (day, job_type, status, model_type, model_name), count in model_buckets.items()
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"Reconciled analytics rollups from {start_day or 'beginning'}: "
+                f"{job_total} jobs, {len(job_buckets)} job rows, {len(model_buckets)} model rows")
+
+    return {
+        'start_day': start_day.isoformat() if start_day else None,
+        'jobs': job_total,
+        'job_rollup_rows': len(job_buckets),
+        'model_rollup_rows': len(model_buckets)
+    }
@@ -0,0 +1,263 @@
+"""
+Content-addressed blob storage with reference counting.
+
+Stored content is identified by its SHA-256. The first asset with a given
+content keeps its object as the shared blob; later uploads or generated files
+with the same hash drop their copy and point their ``storage_path`` at the
+blob's object instead. A session ``after_flush`` listener keeps
+``StorageBlob.ref_count`` equal to the number of assets referencing each
+blob, and a periodic garbage collection removes blobs that have stayed
+unreferenced for a grace period (reconciling their counts against the assets
+table first).
+"""
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, inspect, update, case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models.blob import StorageBlob
+from .storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_object_name(sha256: str) -> str:
+    """Object name for content stored directly under its hash"""
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}"
+
+
+def find_blob(sha256: str) -> Optional[StorageBlob]:
+    return StorageBlob.query.filter_by(sha256=sha256.lower()).first()
+
+
+def reserve_blob(sha256: str) -> Optional[StorageBlob]:
+    """
+    Existing blob for some content, kept away from garbage collection
+
+    The row stays locked until the caller's transaction ends, and an
+    unreferenced blob gets a fresh grace period. Collection skips locked rows
+    and re-checks the grace period, so the blob cannot be deleted between
+    this reuse and the commit of the asset that references it, even if that
+    commit is a long way off or earlier commits release the lock.
+    """
+    blob = StorageBlob.query.filter_by(sha256=sha256.lower()).with_for_update().first()
+    if blob and blob.ref_count <= 0:
+        blob.unreferenced_at = datetime.utcnow()
+    return blob
+
+
+def is_blob_backed(asset) -> bool:
+    """True if the asset's object is a shared blob (owned by GC, not the asset)"""
+    return StorageBlob.query.filter_by(object_name=asset.storage_path).first() is not None
+
+
+def claim_object(sha256: str, bucket_name: str, object_name: str, size: int,
+                 content_type: Optional[str] = None, ref_count: int = 1) -> Tuple[StorageBlob, bool]:
+    """
+    Register an object already in storage as the blob for its content
+
+    Args:
+        sha256: Hex digest of the object's content
+        object_name: Object holding the content
+        ref_count: Assets already pointing at ``object_name`` (0 when the
+            asset row is created afterwards; its insert is counted then)
+
+    Returns:
+        (blob, created): ``created`` is False if the content was already
+        stored, in which case the caller's object is redundant and the caller
+        should repoint its asset at ``blob.object_name`` and delete its copy
+    """
+    sha256 = sha256.lower()
+    blob = reserve_blob(sha256)
+    if blob:
+        return blob, False
+
+    blob = StorageBlob(
+        sha256=sha256,
+        bucket_name=bucket_name,
+        object_name=object_name,
+        size=size,
+        content_type=content_type,
+        ref_count=ref_count,
+        unreferenced_at=None if ref_count else datetime.utcnow()
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        # Another worker registered the same content first
+        return reserve_blob(sha256), False
+    return blob, True
+
+
+def adopt_blob(asset, blob: StorageBlob) -> Optional[Tuple[str, str]]:
+    """
+    Point an asset at an existing blob instead of its own copy
+
+    The storage_path change moves the asset's reference to the blob on flush.
+
+    Returns:
+        (object_name, bucket_name) of the now redundant copy, for the caller to
+        delete once the change is committed, or None if there is none
+    """
+    redundant = (asset.storage_path, asset.storage_bucket)
+    asset.storage_path = blob.object_name
+    asset.storage_bucket = blob.bucket_name
+    return redundant if redundant[0] != blob.object_name else None
+
+
+def store_bytes(data: bytes, content_type: Optional[str] = None,
+                bucket_name: Optional[str] = None) -> StorageBlob:
+    """
+    Store generated content once per unique SHA-256
+
+    Identical content (e.g. the same text spoken with the same voice) is not
+    uploaded again. The returned blob is unreferenced until an asset with its
+    object_name as storage_path is flushed.
+
+    Raises:
+        RuntimeError: If the upload fails
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    blob = reserve_blob(sha256)
+    if blob:
+        return blob
+
+    bucket_name = bucket_name or current_app.config.get('MINIO_BUCKET_NAME')
+    object_name = blob_object_name(sha256)
+    result = storage_service.upload_file(
+        file_data=BytesIO(data),
+        object_name=object_name,
+        bucket_name=bucket_name,
+        content_type=content_type
+    )
+    if not result.get('success'):
+        raise RuntimeError(f"Failed to store blob {sha256}: {result.get('error')}")
+
+    blob, _ = claim_object(sha256, bucket_name, object_name, len(data), content_type, ref_count=0)
+    return blob
+
+
+def _apply_ref_deltas(connection, deltas: Dict[str, int]):
+    """Atomically adjust ref counts of the blobs stored at the given paths"""
+    table = StorageBlob.__table__
+    now = datetime.utcnow()
+    for object_name, delta in deltas.items():
+        if not delta:
+            continue
+        connection.execute(
+            update(table)
+            .where(table.c.object_name == object_name)
+            .values(
+                ref_count=table.c.ref_count + delta,
+                unreferenced_at=case((table.c.ref_count + delta <= 0, now), else_=None)
+            )
+        )
+
+
+def _after_flush(session, flush_context):
+    """Count assets gaining or losing a storage_path in this flush"""
+    from ..models.asset import Asset
+
+    deltas = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, Asset) and obj.storage_path:
+            deltas[obj.storage_path] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Asset):
+            history = inspect(obj).attrs.storage_path.history
+            path = history.deleted[0] if history.deleted else obj.__dict__.get('storage_path')
+            if path:
+                deltas[path] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Asset) and obj not in session.deleted:
+            history = inspect(obj).attrs.storage_path.history
+            if history.has_changes():
+                for path in history.deleted:
+                    deltas[path] -= 1
+                for path in history.added:
+                    deltas[path] += 1
+
+    if any(deltas.values()):
+        # Unlike analytics, a lost update here could delete live content, so
+        # errors propagate and fail the flush
+        _apply_ref_deltas(session.connection(), deltas)
+
+
+def register_blob_refcounting():
+    """Keep blob ref counts in step with asset inserts, deletes and repoints (idempotent)"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+def collect_garbage(grace_seconds: Optional[int] = None, limit: int = 500) -> Dict[str, int]:
+    """
+    Delete blobs that have been unreferenced for longer than the grace period
+
+    Each candidate's ref count is first recomputed from the assets table, so
+    counts that drifted (bulk deletes bypass the listener) are corrected
+    rather than trusted. Candidates are locked, skipping blobs a task is
+    reusing right now (see ``reserve_blob``), and their state is checked
+    again under the lock before any object is deleted.
+
+    Returns:
+        Dict with the number of candidates, blobs deleted and counts corrected
+    """
+    from ..models.asset import Asset
+
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get('BLOB_GC_GRACE_SECONDS', 86400)
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+
+    candidates = (
+        StorageBlob.query
+        .filter(StorageBlob.ref_count <= 0, StorageBlob.unreferenced_at <= cutoff)
+        .order_by(StorageBlob.unreferenced_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .populate_existing()
+        .all()
+    )
+    if not candidates:
+        return {'candidates': 0, 'deleted': 0, 'corrected': 0}
+
+    actual = dict(
+        db.session.query(Asset.storage_path, func.count(Asset.id))
+        .filter(Asset.storage_path.in_([blob.object_name for blob in candidates]))
+        .group_by(Asset.storage_path)
+        .all()
+    )
+
+    deleted = corrected = 0
+    for blob in candidates:
+        if blob.ref_count > 0 or blob.unreferenced_at is None or blob.unreferenced_at > cutoff:
+            continue
+        refs = actual.get(blob.object_name, 0)
+        if refs:
+            blob.ref_count = refs
+            blob.unreferenced_at = None
+            corrected += 1
+            continue
+
+        objects = [blob.object_name] + [
+            path for key, path in (blob.derived or {}).items() if key.endswith('_path') and path
+        ]
+        if all(storage_service.delete_file(path, bucket_name=blob.bucket_name) for path in objects):
+            db.session.delete(blob)
+            deleted += 1
+        else:
+            logger.warning(f"Keeping blob {blob.sha256}: failed to delete its objects")
+
+    db.session.commit()
+    logger.info(f"Blob GC: {deleted} deleted, {corrected} counts corrected of {len(candidates)} candidates")
+    return {'candidates': len(candidates), 'deleted': deleted, 'corrected': corrected}
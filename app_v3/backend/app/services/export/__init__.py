@@ -0,0 +1,35 @@
+"""
+Export services package: transcoded renditions, their storage cache,
+adaptive streaming packages and SCORM/HTML5 packages.
+"""
+from .renditions import (
+    Rendition, LADDER, FORMATS, ENGINE_VERSION, TranscodeError,
+    parse_ladder, fit_to_source, build_command, transcode_to_storage
+)
+from .cache import (
+    source_key, course_key, rendition_object_name, manifest_object_name,
+    package_object_name, package_manifest_name, load_manifest, save_manifest,
+    claim_in_progress, release_in_progress
+)
+from .streaming import (
+    HLS_MASTER, DASH_MANIFEST, stream_prefix, is_playlist, inspect_source, build_package_command,
+    package_to_storage, delete_package, playlist_references, rewrite_playlist, resolve_reference,
+    sign_references
+)
+from .packages import (
+    PACKAGE_KINDS, PackageEntry, PackageError, normalize_package_config, lecture_entries,
+    build_package_entries, write_zip, stream_zip_to_storage, package_filename
+)
+
+__all__ = [
+    'Rendition', 'LADDER', 'FORMATS', 'ENGINE_VERSION', 'TranscodeError',
+    'parse_ladder', 'fit_to_source', 'build_command', 'transcode_to_storage',
+    'source_key', 'course_key', 'rendition_object_name', 'manifest_object_name',
+    'package_object_name', 'package_manifest_name', 'load_manifest', 'save_manifest',
+    'claim_in_progress', 'release_in_progress',
+    'HLS_MASTER', 'DASH_MANIFEST', 'stream_prefix', 'is_playlist', 'inspect_source', 'build_package_command',
+    'package_to_storage', 'delete_package', 'playlist_references', 'rewrite_playlist', 'resolve_reference',
+    'sign_references',
+    'PACKAGE_KINDS', 'PackageEntry', 'PackageError', 'normalize_package_config', 'lecture_entries',
+    'build_package_entries', 'write_zip', 'stream_zip_to_storage', 'package_filename'
+]
@@ -0,0 +1,130 @@
+"""
+Storage-backed cache of exported renditions and packages.
+
+Renditions and packages are stored under names derived from the source content and the
+exact encoding settings, and each completed export writes a small manifest
+listing its outputs. A repeat request for the same source, format and
+ladder is answered by reading that manifest; nothing is transcoded again.
+While an export is running its task ID is kept in Redis, so concurrent
+identical requests share one task instead of each starting their own.
+"""
+import json
+import time
+import hashlib
+import logging
+from io import BytesIO
+from typing import Dict, Optional, Sequence
+
+from ... import extensions
+from ..storage import storage_service
+from .renditions import Rendition, FORMATS, ENGINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PREFIX = 'exports'
+IN_PROGRESS_PREFIX = 'export_task'
+
+
+def source_key(asset) -> str:
+    """
+    Identity of an asset's content
+
+    The content hash when known (identical uploads share renditions),
+    otherwise the storage location, which generated objects never reuse.
+    """
+    sha256 = (asset.asset_metadata or {}).get('sha256')
+    if sha256:
+        return sha256.lower()
+    return hashlib.sha256(f"{asset.storage_bucket}/{asset.storage_path}".encode()).hexdigest()
+
+
+def course_key(keys: Sequence[str]) -> str:
+    """Identity of an ordered set of sources (e.g. the lectures of a course)"""
+    return hashlib.sha256('\n'.join(keys).encode()).hexdigest()
+
+
+def _settings_digest(*parts) -> str:
+    return hashlib.sha256(json.dumps([ENGINE_VERSION, *parts], sort_keys=True).encode()).hexdigest()[:16]
+
+
+def rendition_object_name(key: str, fmt: str, rendition: Rendition) -> str:
+    digest = _settings_digest(fmt, rendition.to_dict())
+    return f"{EXPORT_PREFIX}/renditions/{key[:2]}/{key}/{rendition.name}-{digest}.{FORMATS[fmt]['extension']}"
+
+
+def manifest_object_name(key: str, kind: str, fmt: str, renditions: Sequence[Rendition]) -> str:
+    """Manifest for one export request (kind e.g. 'video'), keyed on what was asked for"""
+    digest = _settings_digest(kind, fmt, [r.to_dict() for r in renditions])
+    return f"{EXPORT_PREFIX}/manifests/{key[:2]}/{key}/{kind}-{fmt}-{digest}.json"
+
+
+def package_object_name(key: str, kind: str, config: Dict) -> str:
+    """Zip of a SCORM/HTML5 package, keyed on the source and normalized package config"""
+    digest = _settings_digest('package', kind, config)
+    return f"{EXPORT_PREFIX}/packages/{key[:2]}/{key}/{kind}-{digest}.zip"
+
+
+def package_manifest_name(key: str, kind: str, config: Dict) -> str:
+    digest = _settings_digest('package', kind, config)
+    return f"{EXPORT_PREFIX}/manifests/{key[:2]}/{key}/package-{kind}-{digest}.json"
+
+
+def load_manifest(object_name: str, bucket_name: Optional[str] = None) -> Optional[Dict]:
+    data = storage_service.read_if_exists(object_name, bucket_name)
+    if not data:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        logger.warning(f"Ignoring unreadable export manifest {object_name}")
+        return None
+
+
+def save_manifest(object_name: str, manifest: Dict, bucket_name: Optional[str] = None):
+    """
+    Raises:
+        RuntimeError: If the manifest cannot be stored
+    """
+    manifest = {**manifest, 'engine_version': ENGINE_VERSION, 'created_at': time.time()}
+    result = storage_service.upload_file(
+        file_data=BytesIO(json.dumps(manifest, default=str).encode()),
+        object_name=object_name,
+        bucket_name=bucket_name,
+        content_type='application/json'
+    )
+    if not result.get('success'):
+        raise RuntimeError(f"Failed to store export manifest: {result.get('error')}")
+    return manifest
+
+
+def claim_in_progress(manifest_name: str, task_id: str, ttl: int) -> Optional[str]:
+    """
+    Register ``task_id`` as the producer of a manifest
+
+    Returns:
+        The task ID already producing it, or None if the claim succeeded (or
+        Redis is unavailable, in which case duplicate work is possible but
+        harmless: outputs have deterministic names)
+    """
+    redis_client = extensions.redis_client
+    if redis_client is None:
+        return None
+    key = f"{IN_PROGRESS_PREFIX}:{manifest_name}"
+    try:
+        if redis_client.set(key, task_id, nx=True, ex=ttl):
+            return None
+        existing = redis_client.get(key)
+        return existing.decode() if isinstance(existing, bytes) else existing
+    except Exception as e:
+        logger.warning(f"Failed to check for a running export: {e}")
+        return None
+
+
+def release_in_progress(manifest_name: str):
+    redis_client = extensions.redis_client
+    if redis_client is None:
+        return
+    try:
+        redis_client.delete(f"{IN_PROGRESS_PREFIX}:{manifest_name}")
+    except Exception as e:
+        logger.warning(f"Failed to clear running export marker: {e}")
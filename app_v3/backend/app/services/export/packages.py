@@ -0,0 +1,260 @@
+"""
+SCORM and HTML5 packages, zipped as a stream straight into storage.
+
+A package is described as a list of entries (generated text, or an object
+already in storage such as a video rendition). ``stream_zip_to_storage``
+writes the zip into a pipe from one thread while the other end is uploaded
+as a multipart upload, so a package of any size is built without holding a
+video in memory or writing a temporary zip to disk. Zip entries of unknown
+size are written with data descriptors, which every unzip tool and LMS
+importer reads; videos are stored uncompressed since they do not deflate.
+"""
+import os
+import re
+import zipfile
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from ..storage import storage_service
+from .renditions import FORMATS, parse_ladder
+from .player import SCORM_VERSIONS, shared_assets, render_lecture_page, render_course_index, render_scorm_manifest
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_KINDS = ('scorm', 'html5')
+
+# Fixed entry timestamp, so a package's bytes depend only on its content
+ZIP_DATE_TIME = (2020, 1, 1, 0, 0, 0)
+ZIP64_THRESHOLD = (1 << 31) - 1
+
+
+class PackageError(RuntimeError):
+    """Building or uploading a package failed"""
+
+
+@dataclass
+class PackageEntry:
+    """One file of a package: inline ``data`` or a storage ``object_name``"""
+    name: str
+    data: Optional[bytes] = None
+    object_name: Optional[str] = None
+    bucket_name: Optional[str] = None
+    size: Optional[int] = None
+    compress: bool = True
+
+    def chunks(self) -> Iterable[bytes]:
+        if self.data is not None:
+            yield self.data
+        else:
+            yield from storage_service.iter_file(self.object_name, self.bucket_name)
+
+
+def normalize_package_config(kind: str, config: Optional[Dict], default_renditions: str) -> Dict:
+    """
+    Validated package configuration with defaults filled in
+
+    The result is what the package cache is keyed on, so equivalent requests
+    (e.g. renditions listed in another order) share one package.
+
+    Raises:
+        ValueError: If a setting is invalid
+    """
+    if kind not in PACKAGE_KINDS:
+        raise ValueError(f"Unknown package type: {kind}")
+    config = config or {}
+    renditions = config.get('renditions')
+    if isinstance(renditions, (list, tuple)):
+        renditions = ','.join(renditions)
+    ladder = parse_ladder(renditions, default_renditions)
+
+    threshold = config.get('completion_threshold', 0.9)
+    try:
+        threshold = float(threshold)
+    except (TypeError, ValueError):
+        raise ValueError('completion_threshold must be a number')
+    if not 0 < threshold <= 1:
+        raise ValueError('completion_threshold must be between 0 and 1')
+
+    normalized = {
+        'renditions': [r.name for r in ladder],
+        'completion_threshold': round(threshold, 2),
+        'title': (config.get('title') or '').strip()[:200] or None,
+    }
+    if kind == 'scorm':
+        version = str(config.get('scorm_version', '1.2'))
+        if version not in SCORM_VERSIONS:
+            raise ValueError(f"Unsupported SCORM version '{version}' (supported: {', '.join(SCORM_VERSIONS)})")
+        normalized['scorm_version'] = version
+    return normalized
+
+
+def lecture_entries(title: str, renditions: Sequence[Dict], directory: str, scorm: bool,
+                    completion_threshold: float, root: str = '') -> List[PackageEntry]:
+    """
+    Page and media entries of one lecture
+
+    Args:
+        renditions: Rendition records of an export manifest (best first),
+            each with ``name``, ``object_name``, ``bucket_name`` and ``file_size``
+        directory: Package directory of the lecture ('' for the root)
+        root: Relative path from that directory to the package root
+    """
+    prefix = f"{directory}/" if directory else ''
+    extension = FORMATS['mp4']['extension']
+    media = [
+        PackageEntry(
+            name=f"{prefix}media/{rendition['name']}.{extension}",
+            object_name=rendition['object_name'],
+            bucket_name=rendition.get('bucket_name'),
+            size=rendition.get('file_size'),
+            compress=False
+        )
+        for rendition in renditions
+    ]
+    sources = [
+        {'label': rendition['name'], 'href': f"media/{rendition['name']}.{extension}",
+         'type': FORMATS['mp4']['content_type']}
+        for rendition in renditions
+    ]
+    page = render_lecture_page(title, sources, scorm, completion_threshold, root)
+    return [PackageEntry(name=f"{prefix}index.html", data=page.encode())] + media
+
+
+def build_package_entries(kind: str, config: Dict, identifier: str, lectures: Sequence[Dict]) -> List[PackageEntry]:
+    """
+    Every entry of a package: shared player assets, then each lecture, then
+    (for SCORM) imsmanifest.xml
+
+    A single lecture is placed at the package root; several go in
+    ``lectures/<n>/``, each its own SCO, all sharing one copy of the player.
+    A standalone HTML5 course also gets a root ``index.html`` listing them.
+
+    Args:
+        config: Normalized package configuration
+        identifier: Stable package identifier used in the SCORM manifest
+        lectures: ``{'title', 'renditions'}`` per lecture, in course order
+    """
+    scorm = kind == 'scorm'
+    entries = [PackageEntry(name=name, data=content.encode()) for name, content in shared_assets(scorm).items()]
+    items = []
+    for number, lecture in enumerate(lectures, start=1):
+        directory, root = ('', '') if len(lectures) == 1 else (f"lectures/{number:03d}", '../../')
+        files = lecture_entries(
+            lecture['title'], lecture['renditions'], directory, scorm, config['completion_threshold'], root
+        )
+        entries.extend(files)
+        items.append({
+            'identifier': f"lecture_{number:03d}",
+            'title': lecture['title'],
+            'href': files[0].name,
+            'files': [entry.name for entry in files[1:]]
+        })
+    title = config.get('title') or lectures[0]['title']
+    if not scorm and len(lectures) > 1:
+        index = render_course_index(title, [{'title': item['title'], 'href': item['href']} for item in items])
+        entries.append(PackageEntry(name='index.html', data=index.encode()))
+    if scorm:
+        manifest = render_scorm_manifest(
+            config['scorm_version'], identifier, title, items,
+            [name for name in shared_assets(scorm)]
+        )
+        entries.append(PackageEntry(name='imsmanifest.xml', data=manifest.encode()))
+    return entries
+
+
+def write_zip(stream, entries: Sequence[PackageEntry], on_entry: Optional[Callable[[PackageEntry, int], None]] = None):
+    """
+    Write entries as a zip to a (possibly unseekable) binary stream
+
+    Args:
+        on_entry: Called after each entry with it and the bytes written so far
+    """
+    written = 0
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(entry.name, ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED if entry.compress else zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            size = entry.size if entry.size is not None else (len(entry.data) if entry.data is not None else None)
+            info.file_size = size or 0
+            # Entries of unknown size might exceed 4GB; zip64 headers must be chosen up front
+            with archive.open(info, 'w', force_zip64=size is None or size > ZIP64_THRESHOLD) as target:
+                for chunk in entry.chunks():
+                    target.write(chunk)
+                    written += len(chunk)
+            if on_entry:
+                on_entry(entry, written)
+
+
+class _ProducerStream:
+    """
+    Read end of the zip pipe; at EOF waits for the producer and raises its
+    error, so a failed package aborts the multipart upload instead of
+    completing it truncated
+    """
+
+    def __init__(self, stream, producer: threading.Thread, errors: List[BaseException]):
+        self._stream = stream
+        self._producer = producer
+        self._errors = errors
+
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        if not chunk:
+            self._producer.join()
+            if self._errors:
+                raise PackageError(f"Package build failed: {self._errors[0]}")
+        return chunk
+
+
+def stream_zip_to_storage(app, entries: Sequence[PackageEntry], object_name: str,
+                          bucket_name: Optional[str] = None,
+                          on_entry: Optional[Callable[[PackageEntry, int], None]] = None) -> Dict:
+    """
+    Zip entries straight into a multipart upload
+
+    Args:
+        app: Flask app, pushed in the zip writer thread
+
+    Returns:
+        dict: Upload result (file_size, sha256, ...)
+
+    Raises:
+        PackageError: If building or uploading the package fails
+    """
+    read_fd, write_fd = os.pipe()
+    errors: List[BaseException] = []
+
+    def produce():
+        with app.app_context():
+            try:
+                with os.fdopen(write_fd, 'wb') as pipe:
+                    write_zip(pipe, entries, on_entry)
+            except BrokenPipeError:
+                # The upload stopped reading; its own error is reported
+                errors.append(PackageError('upload stopped'))
+            except Exception as e:
+                errors.append(e)
+
+    producer = threading.Thread(target=produce, name='package-zip', daemon=True)
+    producer.start()
+    with os.fdopen(read_fd, 'rb') as pipe:
+        result = storage_service.upload_stream(
+            _ProducerStream(pipe, producer, errors), object_name, bucket_name, 'application/zip'
+        )
+    # Closing the read end unblocks a writer the upload abandoned
+    producer.join()
+
+    if not result.get('success'):
+        raise PackageError(f"Package upload failed: {result.get('error')}")
+    if errors:
+        raise PackageError(f"Package build failed: {errors[0]}")
+    return result
+
+
+def package_filename(title: str, kind: str) -> str:
+    """Download file name for a package"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', title).strip('-').lower()[:60] or 'lecture'
+    return f"{slug}-{kind}.zip"
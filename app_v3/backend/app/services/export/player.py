@@ -0,0 +1,334 @@
+"""
+Player assets and manifests for packaged lectures.
+
+The stylesheet and scripts are shared by every lecture page of a package and
+are written to it once under ``player/``. ``scorm.js`` talks to the LMS (the
+SCORM 1.2 ``API`` or SCORM 2004 ``API_1484_11`` object of a parent frame);
+``player.js`` reports viewing progress through it when present, so the same
+page works in an LMS and as a standalone HTML5 package.
+"""
+from html import escape
+from typing import Dict, Sequence
+from xml.etree import ElementTree
+
+PLAYER_DIR = 'player'
+
+PLAYER_CSS = """\
+html, body { margin: 0; height: 100%; background: #111; color: #eee; font-family: system-ui, sans-serif; }
+.lecture { max-width: 1280px; margin: 0 auto; padding: 16px; box-sizing: border-box; }
+.lecture h1 { font-size: 1.25rem; font-weight: 600; margin: 0 0 12px; }
+.lecture video { width: 100%; max-height: calc(100vh - 120px); background: #000; border-radius: 6px; }
+.lecture .controls { display: flex; gap: 12px; align-items: center; margin-top: 8px; font-size: 0.875rem; }
+.lecture select { background: #222; color: #eee; border: 1px solid #444; border-radius: 4px; padding: 2px 6px; }
+.lecture .status { margin-left: auto; color: #9ca3af; }
+.course { max-width: 960px; margin: 0 auto; padding: 24px 16px; }
+.course ol { padding-left: 1.5rem; line-height: 2; }
+.course a { color: #93c5fd; }
+"""
+
+SCORM_JS = """\
+/* LMS communication for SCORM 1.2 and 2004; exposes window.LectureTracking */
+(function () {
+  function find(win, name) {
+    for (var depth = 0; win && depth < 10; depth++) {
+      try {
+        if (win[name]) return win[name];
+      } catch (e) {
+        return null;
+      }
+      if (win.parent === win) break;
+      win = win.parent;
+    }
+    return null;
+  }
+  function locate(name) {
+    return find(window, name) || (window.opener ? find(window.opener, name) : null);
+  }
+
+  var api2004 = locate('API_1484_11');
+  var api12 = api2004 ? null : locate('API');
+  if (!api2004 && !api12) return;
+
+  var started = false;
+  var finished = false;
+  var completed = false;
+
+  function call(method12, method2004, args) {
+    var api = api2004 || api12;
+    var method = api2004 ? method2004 : method12;
+    return api[method].apply(api, args || ['']);
+  }
+  function get(key12, key2004) {
+    return call('LMSGetValue', 'GetValue', [api2004 ? key2004 : key12]);
+  }
+  function set(key12, key2004, value) {
+    return call('LMSSetValue', 'SetValue', [api2004 ? key2004 : key12, String(value)]);
+  }
+  function commit() {
+    call('LMSCommit', 'Commit');
+  }
+
+  window.LectureTracking = {
+    start: function () {
+      if (started) return;
+      started = true;
+      call('LMSInitialize', 'Initialize');
+      var status = api2004 ? get('', 'cmi.completion_status') : get('cmi.core.lesson_status', '');
+      completed = status === 'completed' || status === 'passed';
+      if (!completed) {
+        if (api2004) set('', 'cmi.completion_status', 'incomplete');
+        else set('cmi.core.lesson_status', '', 'incomplete');
+      }
+    },
+    bookmark: function () {
+      var location = parseFloat(get('cmi.core.lesson_location', 'cmi.location'));
+      return isNaN(location) ? 0 : location;
+    },
+    progress: function (fraction, position) {
+      if (!started || finished) return;
+      set('cmi.core.lesson_location', 'cmi.location', Math.floor(position));
+      if (api2004) set('', 'cmi.progress_measure', Math.min(1, fraction).toFixed(2));
+      commit();
+    },
+    complete: function () {
+      if (!started || finished || completed) return;
+      completed = true;
+      if (api2004) set('', 'cmi.completion_status', 'completed');
+      else set('cmi.core.lesson_status', '', 'completed');
+      commit();
+    },
+    finish: function () {
+      if (!started || finished) return;
+      finished = true;
+      if (!completed) set('cmi.core.exit', 'cmi.exit', 'suspend');
+      commit();
+      call('LMSFinish', 'Terminate');
+    }
+  };
+})();
+"""
+
+PLAYER_JS = """\
+/* Lecture player: rendition switching, resume and completion tracking */
+(function () {
+  var video = document.getElementById('lecture-video');
+  if (!video) return;
+  var select = document.getElementById('lecture-quality');
+  var status = document.getElementById('lecture-status');
+  var tracking = window.LectureTracking || null;
+  var threshold = parseFloat(video.getAttribute('data-threshold')) || 0.9;
+  var furthest = 0;
+  var lastReport = 0;
+  var done = false;
+
+  if (tracking) tracking.start();
+
+  function report(force) {
+    if (!video.duration) return;
+    furthest = Math.max(furthest, video.currentTime);
+    var fraction = furthest / video.duration;
+    if (status) status.textContent = Math.round(Math.min(1, fraction) * 100) + '% watched';
+    if (tracking && (force || Date.now() - lastReport > 10000)) {
+      lastReport = Date.now();
+      tracking.progress(fraction, video.currentTime);
+    }
+    if (!done && fraction >= threshold) {
+      done = true;
+      if (tracking) tracking.complete();
+    }
+  }
+
+  video.addEventListener('loadedmetadata', function () {
+    var resume = tracking ? tracking.bookmark() : 0;
+    if (resume > 0 && resume < video.duration - 5) video.currentTime = resume;
+  });
+  video.addEventListener('timeupdate', function () { report(false); });
+  video.addEventListener('pause', function () { report(true); });
+  video.addEventListener('ended', function () { furthest = video.duration; report(true); });
+
+  if (select) {
+    select.addEventListener('change', function () {
+      var position = video.currentTime;
+      var playing = !video.paused;
+      video.src = select.value;
+      video.addEventListener('loadedmetadata', function restore() {
+        video.removeEventListener('loadedmetadata', restore);
+        video.currentTime = position;
+        if (playing) video.play();
+      });
+    });
+  }
+
+  window.addEventListener('pagehide', function () {
+    report(true);
+    if (tracking) tracking.finish();
+  });
+})();
+"""
+
+# SCORM content packaging namespaces per version
+SCORM_VERSIONS = {
+    '1.2': {
+        'imscp': 'http://www.imsproject.org/xsd/imscp_rootv1p1p2',
+        'adlcp': 'http://www.adlnet.org/xsd/adlcp_rootv1p2',
+        'schema_location': (
+            'http://www.imsproject.org/xsd/imscp_rootv1p1p2 imscp_rootv1p1p2.xsd '
+            'http://www.adlnet.org/xsd/adlcp_rootv1p2 adlcp_rootv1p2.xsd'
+        ),
+        'schemaversion': '1.2',
+        'scorm_type': 'scormtype',
+    },
+    '2004': {
+        'imscp': 'http://www.imsglobal.org/xsd/imscp_v1p1',
+        'adlcp': 'http://www.adlnet.org/xsd/adlcp_v1p3',
+        'schema_location': (
+            'http://www.imsglobal.org/xsd/imscp_v1p1 imscp_v1p1.xsd '
+            'http://www.adlnet.org/xsd/adlcp_v1p3 adlcp_v1p3.xsd'
+        ),
+        'schemaversion': '2004 4th Edition',
+        'scorm_type': 'scormType',
+    },
+}
+
+XSI = 'http://www.w3.org/2001/XMLSchema-instance'
+
+
+def shared_assets(scorm: bool) -> Dict[str, str]:
+    """Files written once per package under ``player/``"""
+    assets = {
+        f'{PLAYER_DIR}/player.css': PLAYER_CSS,
+        f'{PLAYER_DIR}/player.js': PLAYER_JS,
+    }
+    if scorm:
+        assets[f'{PLAYER_DIR}/scorm.js'] = SCORM_JS
+    return assets
+
+
+def render_lecture_page(title: str, sources: Sequence[Dict], scorm: bool,
+                        completion_threshold: float = 0.9, root: str = '') -> str:
+    """
+    HTML page playing one lecture
+
+    Args:
+        sources: ``{'label', 'href', 'type'}`` per rendition, best first;
+            hrefs relative to the page
+        root: Relative path from the page to the package root (e.g. ``../../``)
+    """
+    scripts = [f'{root}{PLAYER_DIR}/scorm.js'] if scorm else []
+    scripts.append(f'{root}{PLAYER_DIR}/player.js')
+    options = ''.join(
+        f'<option value="{escape(source["href"])}">{escape(source["label"])}</option>'
+        for source in sources
+    )
+    quality = (
+        f'<label>Quality <select id="lecture-quality">{options}</select></label>'
+        if len(sources) > 1 else ''
+    )
+    script_tags = ''.join(f'\n  <script src="{escape(src)}"></script>' for src in scripts)
+    first = sources[0]
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>{escape(title)}</title>
+  <link rel="stylesheet" href="{escape(root)}{PLAYER_DIR}/player.css">
+</head>
+<body>
+  <main class="lecture">
+    <h1>{escape(title)}</h1>
+    <video id="lecture-video" controls preload="metadata" playsinline data-threshold="{completion_threshold}">
+      <source src="{escape(first['href'])}" type="{escape(first['type'])}">
+    </video>
+    <div class="controls">{quality}<span id="lecture-status" class="status"></span></div>
+  </main>{script_tags}
+</body>
+</html>
+"""
+
+
+def render_course_index(title: str, lectures: Sequence[Dict]) -> str:
+    """Landing page of a standalone course, linking each lecture (``{'title', 'href'}``)"""
+    items = ''.join(
+        f'\n      <li><a href="{escape(lecture["href"])}">{escape(lecture["title"])}</a></li>'
+        for lecture in lectures
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>{escape(title)}</title>
+  <link rel="stylesheet" href="{PLAYER_DIR}/player.css">
+</head>
+<body>
+  <main class="course">
+    <h1>{escape(title)}</h1>
+    <ol>{items}
+    </ol>
+  </main>
+</body>
+</html>
+"""
+
+
+def render_scorm_manifest(version: str, identifier: str, title: str, items: Sequence[Dict],
+                          shared_files: Sequence[str]) -> str:
+    """
+    imsmanifest.xml for a package of one SCO per lecture
+
+    Args:
+        items: ``{'identifier', 'title', 'href', 'files'}`` per lecture; files
+            lists every package path the SCO uses besides shared assets
+        shared_files: Player assets, declared once and referenced by every SCO
+    """
+    spec = SCORM_VERSIONS[version]
+    imscp, adlcp = spec['imscp'], spec['adlcp']
+    ElementTree.register_namespace('', imscp)
+    ElementTree.register_namespace('adlcp', adlcp)
+    ElementTree.register_namespace('xsi', XSI)
+
+    def element(parent, tag, text=None, **attributes):
+        node = ElementTree.SubElement(parent, f'{{{imscp}}}{tag}', attributes)
+        if text is not None:
+            node.text = text
+        return node
+
+    manifest = ElementTree.Element(f'{{{imscp}}}manifest', {
+        'identifier': identifier,
+        'version': '1.0',
+        f'{{{XSI}}}schemaLocation': spec['schema_location'],
+    })
+    metadata = element(manifest, 'metadata')
+    element(metadata, 'schema', 'ADL SCORM')
+    element(metadata, 'schemaversion', spec['schemaversion'])
+
+    organizations = element(manifest, 'organizations', default='course')
+    organization = element(organizations, 'organization', identifier='course')
+    element(organization, 'title', title)
+    for item in items:
+        node = element(organization, 'item', identifier=item['identifier'], identifierref=f"res_{item['identifier']}")
+        element(node, 'title', item['title'])
+
+    resources = element(manifest, 'resources')
+    for item in items:
+        resource = element(resources, 'resource', **{
+            'identifier': f"res_{item['identifier']}",
+            'type': 'webcontent',
+            'href': item['href'],
+            f"{{{adlcp}}}{spec['scorm_type']}": 'sco',
+        })
+        for path in [item['href'], *item['files']]:
+            element(resource, 'file', href=path)
+        element(resource, 'dependency', identifierref='shared_player')
+    shared = element(resources, 'resource', **{
+        'identifier': 'shared_player',
+        'type': 'webcontent',
+        f"{{{adlcp}}}{spec['scorm_type']}": 'asset',
+    })
+    for path in shared_files:
+        element(shared, 'file', href=path)
+
+    ElementTree.indent(manifest, space='  ')
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + ElementTree.tostring(manifest, encoding='unicode') + '\n'
+
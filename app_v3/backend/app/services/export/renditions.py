@@ -0,0 +1,211 @@
+"""
+Video renditions: output formats, the bitrate ladder and the transcode.
+
+All renditions of an export come from one ffmpeg process: the source is
+decoded once, the decoded video is split and scaled per rung, and each rung
+is encoded and muxed to its own pipe. A thread per pipe streams that output
+to storage in parts as it is produced, so neither the source nor any output
+is ever held in memory or written to local disk.
+"""
+import os
+import shutil
+import logging
+import threading
+import subprocess
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence
+
+from ..storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+# Bump when encoder settings change so cached renditions are rebuilt
+ENGINE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """One rung of the ladder"""
+    name: str
+    height: int
+    video_bitrate: int  # kbit/s
+    audio_bitrate: int  # kbit/s
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+LADDER = {
+    '1080p': Rendition('1080p', 1080, 5000, 192),
+    '720p': Rendition('720p', 720, 2800, 128),
+    '480p': Rendition('480p', 480, 1400, 128),
+    '360p': Rendition('360p', 360, 800, 96),
+}
+
+# Fragmented MP4 and WebM can be written to a pipe (no seek back to finish
+# the header), which is what lets outputs stream straight to storage
+FORMATS = {
+    'mp4': {
+        'extension': 'mp4',
+        'content_type': 'video/mp4',
+        'video': ['-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'high', '-pix_fmt', 'yuv420p'],
+        'audio': ['-c:a', 'aac'],
+        'muxer': ['-f', 'mp4', '-movflags', 'frag_keyframe+empty_moov+default_base_moof'],
+    },
+    'webm': {
+        'extension': 'webm',
+        'content_type': 'video/webm',
+        'video': ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '5', '-row-mt', '1'],
+        'audio': ['-c:a', 'libopus'],
+        'muxer': ['-f', 'webm'],
+    },
+}
+
+
+class TranscodeError(RuntimeError):
+    """ffmpeg or an output upload failed"""
+
+
+def parse_ladder(value: Optional[str], default: str = '720p,480p,360p') -> List[Rendition]:
+    """
+    Renditions named in a comma-separated list, highest first
+
+    Raises:
+        ValueError: If a name is not on the ladder
+    """
+    names = [name.strip() for name in (value or default).split(',') if name.strip()]
+    unknown = [name for name in names if name not in LADDER]
+    if unknown:
+        raise ValueError(f"Unknown renditions: {', '.join(unknown)} (available: {', '.join(LADDER)})")
+    return sorted({LADDER[name] for name in names}, key=lambda r: r.height, reverse=True)
+
+
+def fit_to_source(renditions: Sequence[Rendition], source_height: Optional[int]) -> List[Rendition]:
+    """
+    Drop upscaling: rungs taller than the source are replaced by a single
+    rung at the source height, its bitrate scaled down by pixel count from
+    the smallest of them
+    """
+    if not source_height:
+        return list(renditions)
+    height = source_height - source_height % 2
+    kept = [r for r in renditions if r.height <= height]
+    taller = [r for r in renditions if r.height > height]
+    if taller and all(r.height != height for r in kept):
+        nearest = min(taller, key=lambda r: r.height)
+        bitrate = max(100, round(nearest.video_bitrate * (height / nearest.height) ** 2))
+        kept.insert(0, Rendition(f"{height}p", height, bitrate, nearest.audio_bitrate))
+    return kept
+
+
+def build_command(source: str, renditions: Sequence[Rendition], fmt: str, outputs: Sequence[str]) -> List[str]:
+    """
+    ffmpeg arguments that decode ``source`` once and write one output per rendition
+
+    Args:
+        outputs: Output URL per rendition (e.g. ``pipe:5``)
+    """
+    profile = FORMATS[fmt]
+    count = len(renditions)
+    split = f"[0:v]split={count}" + ''.join(f"[s{i}]" for i in range(count))
+    # min() keeps a rung at the source height if the source was not probed
+    scales = [f"[s{i}]scale=-2:'min({r.height},ih)'[v{i}]" for i, r in enumerate(renditions)]
+
+    command = ['ffmpeg', '-v', 'error', '-nostdin', '-y']
+    if source.startswith(('http://', 'https://')):
+        # Read straight from storage, resuming after dropped connections
+        command += ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+    command += ['-i', source, '-filter_complex', ';'.join([split] + scales)]
+    for i, (rendition, output) in enumerate(zip(renditions, outputs)):
+        command += [
+            '-map', f'[v{i}]', '-map', '0:a?',
+            *profile['video'],
+            '-b:v', f'{rendition.video_bitrate}k',
+            '-maxrate', f'{int(rendition.video_bitrate * 1.07)}k',
+            '-bufsize', f'{rendition.video_bitrate * 2}k',
+            *profile['audio'],
+            '-b:a', f'{rendition.audio_bitrate}k',
+            *profile['muxer'],
+            output
+        ]
+    return command
+
+
+def transcode_to_storage(app, source_url: str, renditions: Sequence[Rendition], fmt: str,
+                         object_names: Sequence[str], bucket_name: Optional[str] = None,
+                         timeout: Optional[int] = None) -> List[Dict]:
+    """
+    Transcode a source into every rendition and upload each as it is encoded
+
+    Args:
+        app: Flask app, pushed in the upload threads
+        source_url: URL ffmpeg reads the source from (e.g. a presigned GET)
+        object_names: Destination object per rendition
+
+    Returns:
+        List of upload results (file_size, sha256, ...) per rendition
+
+    Raises:
+        TranscodeError: If ffmpeg fails or any upload fails
+    """
+    if not shutil.which('ffmpeg'):
+        raise TranscodeError('ffmpeg is required for video export')
+    profile = FORMATS[fmt]
+
+    pipes = [os.pipe() for _ in renditions]
+    results: List[Optional[Dict]] = [None] * len(renditions)
+
+    def upload(index, read_fd):
+        with app.app_context():
+            try:
+                with os.fdopen(read_fd, 'rb') as stream:
+                    results[index] = storage_service.upload_stream(
+                        stream, object_names[index], bucket_name, profile['content_type']
+                    )
+            except Exception as e:
+                results[index] = {'success': False, 'error': str(e)}
+
+    command = build_command(source_url, renditions, fmt, [f'pipe:{write_fd}' for _, write_fd in pipes])
+    try:
+        process = subprocess.Popen(
+            command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            pass_fds=[write_fd for _, write_fd in pipes]
+        )
+    except OSError as e:
+        for read_fd, write_fd in pipes:
+            os.close(read_fd)
+            os.close(write_fd)
+        raise TranscodeError(f"Failed to start ffmpeg: {e}")
+
+    # Only ffmpeg holds the write ends now, so readers see EOF when it exits
+    for _, write_fd in pipes:
+        os.close(write_fd)
+
+    uploaders = [
+        threading.Thread(target=upload, args=(index, read_fd), name=f'export-upload-{index}', daemon=True)
+        for index, (read_fd, _) in enumerate(pipes)
+    ]
+    for thread in uploaders:
+        thread.start()
+
+    try:
+        _, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        _, stderr = process.communicate()
+        for thread in uploaders:
+            thread.join()
+        raise TranscodeError(f"ffmpeg timed out after {timeout}s")
+
+    for thread in uploaders:
+        thread.join()
+
+    if process.returncode != 0:
+        raise TranscodeError(f"ffmpeg failed: {stderr.decode(errors='ignore')[-1000:]}")
+    failed = [
+        f"{rendition.name}: {(result or {}).get('error', 'no output')}"
+        for rendition, result in zip(renditions, results) if not (result or {}).get('success')
+    ]
+    if failed:
+        raise TranscodeError(f"Upload of renditions failed ({'; '.join(failed)})")
+    return results
@@ -0,0 +1,295 @@
+"""
+Adaptive streaming packages (HLS, optionally DASH) for generated videos.
+
+A package is written by one ffmpeg process that decodes the video once and
+encodes every rung of the ladder with keyframes aligned to the segment
+duration, so players can switch rungs at any segment boundary and start
+playback after the first segment instead of the whole file. With DASH
+enabled the DASH muxer writes both manifests over the same fragmented MP4
+segments; otherwise the HLS muxer writes MPEG-TS segments.
+
+The package is stored under the video's own storage prefix. Its playlists
+refer to segments by relative name; ``rewrite_playlist`` turns those into
+presigned segment URLs (and nested playlists into API URLs) when served.
+"""
+import os
+import re
+import shutil
+import logging
+import tempfile
+import mimetypes
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from ..storage import storage_service
+from .renditions import Rendition, TranscodeError
+
+logger = logging.getLogger(__name__)
+
+HLS_MASTER = 'master.m3u8'
+DASH_MANIFEST = 'manifest.mpd'
+
+CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.mpd': 'application/dash+xml',
+    '.ts': 'video/mp2t',
+    '.m4s': 'video/iso.segment',
+}
+
+# Relative references inside playlists: URI lines and URI="..." attributes
+# in HLS, segment and initialization attributes in a DASH SegmentList
+_HLS_ATTRIBUTE = re.compile(r'URI="([^"]+)"')
+_DASH_ATTRIBUTE = re.compile(r'\b(media|sourceURL)="([^"]+)"')
+
+
+def stream_prefix(storage_path: str) -> str:
+    """Storage prefix of the package for a video (next to the video itself)"""
+    return f"{os.path.splitext(storage_path)[0]}/stream"
+
+
+def is_playlist(name: str) -> bool:
+    return name.endswith(('.m3u8', '.mpd'))
+
+
+def inspect_source(source: str, timeout: int = 120) -> Dict:
+    """
+    Video height and whether an audio stream exists, read from ffmpeg's
+    stream listing (ffprobe is not required)
+    """
+    process = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostdin', '-i', source],
+        capture_output=True, timeout=timeout
+    )
+    listing = process.stderr.decode(errors='ignore')
+    video = re.search(r'Stream #.*?Video: .*?(\d{2,5})x(\d{2,5})', listing)
+    if not video:
+        raise TranscodeError(f"No video stream found: {listing[-500:]}")
+    return {
+        'height': int(video.group(2)),
+        'audio': bool(re.search(r'Stream #.*?Audio: ', listing)),
+    }
+
+
+def build_package_command(source: str, renditions: Sequence[Rendition], output_dir: str,
+                          segment_seconds: int = 4, dash: bool = False, audio: bool = True) -> List[str]:
+    """
+    ffmpeg arguments that package ``source`` into ``output_dir``
+
+    HLS writes a variant playlist and segment directory per rung plus
+    ``master.m3u8``. DASH writes ``manifest.mpd`` and, from the same
+    segments, ``master.m3u8`` with one media playlist per stream.
+    """
+    count = len(renditions)
+    split = f"[0:v]split={count}" + ''.join(f"[s{i}]" for i in range(count))
+    scales = [f"[s{i}]scale=-2:'min({r.height},ih)'[v{i}]" for i, r in enumerate(renditions)]
+
+    command = ['ffmpeg', '-v', 'error', '-nostdin', '-y']
+    if source.startswith(('http://', 'https://')):
+        command += ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+    command += ['-i', source, '-filter_complex', ';'.join([split] + scales)]
+
+    for i in range(count):
+        command += ['-map', f'[v{i}]']
+        if audio and not dash:
+            # HLS variants are muxed; each carries its own audio rendition
+            command += ['-map', '0:a:0']
+    if audio and dash:
+        # DASH shares one audio representation across video rungs
+        command += ['-map', '0:a:0']
+
+    command += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'high', '-pix_fmt', 'yuv420p',
+        # Keyframes exactly on segment boundaries, aligned across rungs
+        '-sc_threshold', '0', '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+    ]
+    for i, rendition in enumerate(renditions):
+        command += [
+            f'-b:v:{i}', f'{rendition.video_bitrate}k',
+            f'-maxrate:v:{i}', f'{int(rendition.video_bitrate * 1.07)}k',
+            f'-bufsize:v:{i}', f'{rendition.video_bitrate * 2}k',
+        ]
+    if audio:
+        command += ['-c:a', 'aac']
+        if dash:
+            command += ['-b:a', f'{max(r.audio_bitrate for r in renditions)}k']
+        else:
+            for i, rendition in enumerate(renditions):
+                command += [f'-b:a:{i}', f'{rendition.audio_bitrate}k']
+
+    if dash:
+        adaptation_sets = 'id=0,streams=v' + (' id=1,streams=a' if audio else '')
+        command += [
+            '-f', 'dash', '-seg_duration', str(segment_seconds),
+            # Explicit segment lists (no templates) so every segment URL can be signed
+            '-use_template', '0', '-use_timeline', '0',
+            '-hls_playlist', '1', '-hls_master_name', HLS_MASTER,
+            '-adaptation_sets', adaptation_sets,
+            '-init_seg_name', 'init-$RepresentationID$.m4s',
+            '-media_seg_name', 'chunk-$RepresentationID$-$Number%05d$.m4s',
+            os.path.join(output_dir, DASH_MANIFEST)
+        ]
+    else:
+        var_stream_map = ' '.join(
+            f"v:{i},a:{i},name:{r.name}" if audio else f"v:{i},name:{r.name}"
+            for i, r in enumerate(renditions)
+        )
+        command += [
+            '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+            '-hls_flags', 'independent_segments',
+            '-hls_segment_filename', os.path.join(output_dir, '%v', 'seg_%05d.ts'),
+            '-master_pl_name', HLS_MASTER,
+            '-var_stream_map', var_stream_map,
+            os.path.join(output_dir, '%v', 'index.m3u8')
+        ]
+    return command
+
+
+def package_to_storage(app, source_url: str, renditions: Sequence[Rendition], prefix: str,
+                       bucket_name: Optional[str] = None, segment_seconds: int = 4, dash: bool = False,
+                       audio: bool = True, timeout: Optional[int] = None, upload_workers: int = 8) -> Dict:
+    """
+    Package a video and upload the package under ``prefix``
+
+    Segments are uploaded concurrently and playlists last, so a playlist in
+    storage never refers to a segment that is not there yet.
+
+    Args:
+        app: Flask app, pushed in the upload threads
+        source_url: URL ffmpeg reads the source from (e.g. a presigned GET)
+
+    Returns:
+        dict: Object names of the HLS master playlist and DASH manifest,
+        file count and total size
+
+    Raises:
+        TranscodeError: If ffmpeg fails or any upload fails
+    """
+    if not shutil.which('ffmpeg'):
+        raise TranscodeError('ffmpeg is required for stream packaging')
+
+    work_dir = tempfile.mkdtemp(prefix='stream_package_')
+    try:
+        command = build_package_command(source_url, renditions, work_dir, segment_seconds, dash, audio)
+        try:
+            process = subprocess.run(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise TranscodeError(f"ffmpeg timed out after {timeout}s")
+        if process.returncode != 0:
+            raise TranscodeError(f"ffmpeg failed: {process.stderr.decode(errors='ignore')[-1000:]}")
+
+        files = sorted(
+            os.path.relpath(os.path.join(root, name), work_dir)
+            for root, _, names in os.walk(work_dir) for name in names
+        )
+        segments = [name for name in files if not is_playlist(name)]
+        playlists = [name for name in files if is_playlist(name)]
+
+        def upload(relative_name):
+            with app.app_context():
+                path = os.path.join(work_dir, relative_name)
+                extension = os.path.splitext(relative_name)[1]
+                with open(path, 'rb') as file_data:
+                    result = storage_service.upload_file(
+                        file_data=file_data,
+                        object_name=f"{prefix}/{relative_name.replace(os.sep, '/')}",
+                        bucket_name=bucket_name,
+                        content_type=CONTENT_TYPES.get(extension) or mimetypes.guess_type(relative_name)[0]
+                    )
+                if not result.get('success'):
+                    raise TranscodeError(f"Upload of {relative_name} failed: {result.get('error')}")
+                return os.path.getsize(path)
+
+        with ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix='stream-upload') as executor:
+            total_size = sum(executor.map(upload, segments))
+            total_size += sum(executor.map(upload, playlists))
+
+        return {
+            'hls': f"{prefix}/{HLS_MASTER}",
+            'dash': f"{prefix}/{DASH_MANIFEST}" if dash else None,
+            'file_count': len(files),
+            'total_size': total_size,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def delete_package(prefix: str, bucket_name: Optional[str] = None) -> int:
+    """Remove every object of a package; returns the number deleted"""
+    deleted = 0
+    for obj in storage_service.list_objects(prefix=f"{prefix}/", bucket_name=bucket_name):
+        if storage_service.delete_file(obj['object_name'], bucket_name=bucket_name):
+            deleted += 1
+    return deleted
+
+
+def playlist_references(text: str, name: str) -> List[str]:
+    """Relative names a playlist refers to, in order"""
+    if name.endswith('.mpd'):
+        return [match.group(2) for match in _DASH_ATTRIBUTE.finditer(text)]
+    references = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#'):
+            references.extend(_HLS_ATTRIBUTE.findall(line))
+        elif line:
+            references.append(line)
+    return references
+
+
+def rewrite_playlist(text: str, name: str, resolve: Callable[[str], Optional[str]]) -> str:
+    """
+    Replace each relative reference in a playlist with ``resolve(reference)``
+
+    References are resolved relative to the playlist's own directory by the
+    caller; unresolvable ones are left as they are.
+    """
+    def replace(reference):
+        return resolve(reference) or reference
+
+    if name.endswith('.mpd'):
+        return _DASH_ATTRIBUTE.sub(
+            lambda match: f'{match.group(1)}="{_xml_escape(replace(match.group(2)))}"', text
+        )
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            line = _HLS_ATTRIBUTE.sub(lambda match: f'URI="{replace(match.group(1))}"', line)
+        elif stripped:
+            line = replace(stripped)
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def resolve_reference(playlist_name: str, reference: str) -> Optional[str]:
+    """
+    Package-relative name of a reference made from a playlist, or None if
+    it leaves the package (absolute URLs, ``..`` past the root)
+    """
+    if '://' in reference or reference.startswith('/'):
+        return None
+    joined = os.path.normpath(os.path.join(os.path.dirname(playlist_name), reference)).replace(os.sep, '/')
+    if joined.startswith('..'):
+        return None
+    return joined
+
+
+def sign_references(prefix: str, names: Iterable[str], bucket_name: Optional[str] = None, **kwargs) -> Dict[str, str]:
+    """Presigned GET URLs for package-relative names, signed in one batch"""
+    names = list(dict.fromkeys(names))
+    urls = storage_service.get_presigned_urls(
+        ((f"{prefix}/{name}", bucket_name) for name in names), **kwargs
+    )
+    signed = {}
+    for (_, object_name), url in urls.items():
+        if url:
+            signed[object_name[len(prefix) + 1:]] = url
+    return signed
+
+
+def _xml_escape(value: str) -> str:
+    return value.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;')
@@ -0,0 +1,42 @@
+"""
+Lazy package attributes (PEP 562) for service packages with heavy client stacks.
+
+A package lists which public name lives in which submodule; the submodule is
+imported the first time one of its names is accessed, and the value is then
+stored on the package so later lookups are plain attribute reads.
+
+Kept in ``app.services`` rather than ``app.utils``, whose package imports the
+models and Flask helpers.
+"""
+import importlib
+import sys
+from typing import Callable, Dict, Iterable, Tuple
+
+
+def lazy_attributes(package: str, attributes: Dict[str, str],
+                    public: Iterable[str] = ()) -> Tuple[Callable, Callable]:
+    """
+    Module ``__getattr__`` and ``__dir__`` for a package
+
+    Args:
+        package: The package's ``__name__``
+        attributes: Public name -> relative submodule that defines it
+        public: The package's ``__all__``, listed by ``dir()``
+
+    Usage::
+
+        __getattr__, __dir__ = lazy_attributes(__name__, {'Client': '.client'}, __all__)
+    """
+    public = list(public)
+
+    def __getattr__(name):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name], package), name)
+            setattr(sys.modules[package], name, value)
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(public))
+
+    return __getattr__, __dir__
@@ -1,6 +1,20 @@
 """
 LLM service package for script generation
+
+Names are resolved on first access (PEP 562) so importing this package does
+not load huggingface_hub until a client is actually created.
 """
-from .llama_client import LlamaClient, LlamaConfig, create_llama_client
+from ..lazy import lazy_attributes
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'LlamaClient': '.llama_client',
+    'LlamaConfig': '.llama_client',
+    'create_llama_client': '.llama_client',
+    'get_llama_client': '.llama_client',
+}
+
+__all__ = ['LlamaClient', 'LlamaConfig', 'create_llama_client', 'get_llama_client']
+
 
-__all__ = ['LlamaClient', 'LlamaConfig', 'create_llama_client']
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES, __all__)
@@ -1,17 +1,57 @@
 """
 Llama-3.1 LLM client for script generation using HuggingFace Inference API
 """
-import logging
+import os
+import re
+import json
+import math
 import time
-from typing import Dict, List, Optional, Any, Union
-from dataclasses import dataclass
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Any, Union
+from dataclasses import dataclass, astuple
 from pathlib import Path
 
 from huggingface_hub import InferenceClient
 from flask import current_app
 
+from . import prompt_cache
+from .scheduler import scheduler, LLMQueueTimeout
+from ... import extensions
+
 logger = logging.getLogger(__name__)
 
+HEALTH_KEY_PREFIX = 'llm_health'
+
+
+class _CallbackError(Exception):
+    """An ``on_token`` callback failed; carries its error past the provider error handling"""
+    
+    def __init__(self, error: BaseException):
+        super().__init__(str(error))
+        self.error = error
+
+
+def _guard_callback(on_token: Optional[Callable[[str], None]]) -> Optional[Callable[[str], None]]:
+    """
+    Wrap a streaming callback so its errors are told apart from the provider's
+    
+    A failure downstream of the callback (e.g. speech synthesis) says nothing
+    about the LLM, so it must not mark the provider unhealthy or be reported
+    as a failed generation; generate_script re-raises it unchanged.
+    """
+    if on_token is None or getattr(on_token, 'guarded', False):
+        return on_token
+    
+    def guarded(fragment: str):
+        try:
+            on_token(fragment)
+        except Exception as e:
+            raise _CallbackError(e) from e
+    guarded.guarded = True
+    return guarded
+
 
 @dataclass
 class LlamaConfig:
@@ -21,6 +61,9 @@ class LlamaConfig:
     timeout: int = 300  # 5 minutes
     max_tokens: int = 2000
     temperature: float = 0.7
+    long_form_min_minutes: int = 10  # at or above this, outline + parallel sections
+    section_words: int = 900  # target length of one long-form section
+    section_concurrency: int = 4  # section completions in flight at once
     
     def __post_init__(self):
         """Validate configuration after initialization"""
@@ -30,6 +73,10 @@ class LlamaConfig:
             raise ValueError("Temperature must be between 0.0 and 2.0")
         if self.max_tokens < 100:
             raise ValueError("Max tokens must be at least 100")
+        if self.section_concurrency < 1:
+            raise ValueError("Section concurrency must be at least 1")
+        if self.section_words < 100:
+            raise ValueError("Section words must be at least 100")
 
 
 class LlamaClient:
@@ -48,6 +95,8 @@ class LlamaClient:
         """
         self.config = config or LlamaConfig()
         self._client = None
+        self._client_lock = threading.Lock()
+        self._last_health = None
         self._last_health_check = 0
         self._health_check_interval = 300  # 5 minutes
         
@@ -58,13 +107,17 @@ class LlamaClient:
                 return current_app.config.get(key, default)
         except RuntimeError:
             # Outside Flask app context
-            import os
             return os.environ.get(key, default)
         return default
     
     def _get_client(self) -> InferenceClient:
-        """Get or create the HuggingFace Inference client"""
-        if self._client is None:
+        """Get or create the HuggingFace Inference client (shared by all threads)"""
+        if self._client is not None:
+            return self._client
+        with self._client_lock:
+            if self._client is not None:
+                return self._client
+            
             # Try HF_API_TOKEN first (consistent with config), then HF_API_KEY as fallback
             api_key = self._get_config_value('HF_API_TOKEN') or self._get_config_value('HF_API_KEY')
             if not api_key:
@@ -82,28 +135,97 @@ class LlamaClient:
             except Exception as e:
                 logger.error(f"Failed to initialize Llama client: {e}")
                 raise RuntimeError(f"Cannot connect to HuggingFace Inference API: {e}")
+            
+            return self._client
+    
+    def _health_key(self) -> str:
+        return f"{HEALTH_KEY_PREFIX}:{self.config.provider}:{self.config.model_name}"
+    
+    def _read_shared_health(self) -> Optional[Dict[str, Any]]:
+        redis_client = extensions.redis_client
+        if redis_client is None:
+            return None
+        try:
+            value = redis_client.get(self._health_key())
+        except Exception as e:
+            logger.warning(f"Failed to read shared LLM health: {e}")
+            return None
+        return json.loads(value) if value else None
+    
+    def _record_health(self, status: str, source: str, error: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Remember the service's health in this process and, with Redis, for all workers
+        
+        Successful or failed script completions are recorded too, so most
+        health checks are answered without spending a completion on a probe.
+        """
+        result = {
+            'status': status,
+            'model_name': self.config.model_name,
+            'provider': self.config.provider,
+            'source': source,
+            'timestamp': time.time()
+        }
+        if error:
+            result['error'] = error
+        self._last_health = result
+        self._last_health_check = result['timestamp']
         
-        return self._client
+        redis_client = extensions.redis_client
+        if redis_client is not None:
+            # Failures are rechecked sooner than successes
+            ttl = self._get_config_value('LLM_HEALTH_TTL', 300)
+            if status != 'healthy':
+                ttl = min(int(ttl), 60)
+            try:
+                redis_client.setex(self._health_key(), int(ttl), json.dumps(result))
+            except Exception as e:
+                logger.warning(f"Failed to share LLM health: {e}")
+        return result
     
-    def health_check(self) -> Dict[str, Any]:
+    def health_check(self, force: bool = False) -> Dict[str, Any]:
         """
         Check if the Llama service is healthy and accessible.
         
+        The result is shared through Redis for ``LLM_HEALTH_TTL`` seconds (one
+        minute after a failure), so at most one worker at a time spends a
+        probe completion on it. Recent script generations count as checks.
+        
+        Args:
+            force: Probe the service even if a recent result is known
+        
         Returns:
             Dict with health status information
         """
         current_time = time.time()
         
-        # Use cached result if recent
-        if (current_time - self._last_health_check) < self._health_check_interval:
-            return {'status': 'healthy', 'cached': True}
+        if not force:
+            shared = self._read_shared_health()
+            if shared:
+                return {**shared, 'cached': True}
+            # Without Redis, fall back to this process's last result
+            if self._last_health and (current_time - self._last_health_check) < self._health_check_interval:
+                return {**self._last_health, 'cached': True}
+        
+        redis_client = extensions.redis_client
+        lock_key = f"{self._health_key()}:probe"
+        if redis_client is not None and not force:
+            try:
+                if not redis_client.set(lock_key, '1', nx=True, ex=60):
+                    return {
+                        'status': 'unknown',
+                        'message': 'Health probe already running on another worker',
+                        'timestamp': current_time
+                    }
+            except Exception as e:
+                logger.warning(f"Failed to take LLM health probe lock: {e}")
         
         try:
             client = self._get_client()
             
             # Test with a simple prompt
             logger.debug("Starting health check with test prompt")
-            test_completion = client.chat.completions.create(
+            test_completion = scheduler.call(lambda: (client.chat.completions.create(
                 model=self.config.model_name,
                 messages=[
                     {
@@ -113,28 +235,36 @@ class LlamaClient:
                 ],
                 max_tokens=10,
                 temperature=0.1
-            )
+            ), None), tokens=30)
             
             test_response = test_completion.choices[0].message.content if test_completion.choices else "No response"
             
-            self._last_health_check = current_time
-            
             logger.info("Health check successful")
+            result = self._record_health('healthy', 'probe')
             return {
-                'status': 'healthy',
-                'model_name': self.config.model_name,
-                'provider': self.config.provider,
-                'test_response': str(test_response)[:100] + '...' if len(str(test_response)) > 100 else str(test_response),
-                'timestamp': current_time
+                **result,
+                'test_response': str(test_response)[:100] + '...' if len(str(test_response)) > 100 else str(test_response)
             }
             
-        except Exception as e:
-            logger.error(f"Llama health check failed: {e}")
+        except LLMQueueTimeout as e:
+            # Our own rate-limit queue, not the provider: leave the shared health alone
+            logger.warning(f"Llama health check not sent: {e}")
             return {
-                'status': 'unhealthy',
-                'error': str(e),
+                'status': 'unknown',
+                'message': str(e),
                 'timestamp': current_time
             }
+            
+        except Exception as e:
+            logger.error(f"Llama health check failed: {e}")
+            return self._record_health('unhealthy', 'probe', error=str(e))
+        
+        finally:
+            if redis_client is not None:
+                try:
+                    redis_client.delete(lock_key)
+                except Exception:
+                    pass
     
     def generate_script(
         self,
@@ -143,7 +273,10 @@ class LlamaClient:
         target_audience: Optional[str] = None,
         duration_minutes: Optional[int] = None,
         style: Optional[str] = None,
-        additional_context: Optional[str] = None
+        additional_context: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        user_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Generate a script based on the provided prompt and parameters.
@@ -155,11 +288,28 @@ class LlamaClient:
             duration_minutes: Optional target duration in minutes
             style: Optional style (e.g., "formal", "conversational", "educational")
             additional_context: Optional additional context or requirements
+            on_token: Optional callback; when given, the completion is streamed
+                and each text fragment is passed to it as it arrives
+            use_cache: Reuse a cached completion of the same prompt and settings
+                (False forces a fresh generation, which still refreshes the cache)
+            user_id: User the script is for, used to share rate limits fairly
             
         Returns:
             Dict containing the generated script and metadata
+            
+        Raises:
+            Exception: Whatever ``on_token`` raised; provider errors are
+                returned as ``success: False`` instead
         """
+        on_token = _guard_callback(on_token)
         try:
+            if duration_minutes and duration_minutes >= self.config.long_form_min_minutes:
+                # Too long for one completion: outline, then draft sections in parallel
+                return self.generate_long_script(
+                    prompt, topic, target_audience, duration_minutes, style, additional_context,
+                    on_token=on_token, use_cache=use_cache, user_id=user_id
+                )
+            
             # Build comprehensive prompt
             full_prompt = self._build_script_prompt(
                 prompt, topic, target_audience, duration_minutes, style, additional_context
@@ -169,29 +319,14 @@ class LlamaClient:
             logger.debug(f"Using model: {self.config.model_name}")
             logger.debug(f"Temperature: {self.config.temperature}, Max tokens: {self.config.max_tokens}")
             
-            client = self._get_client()
-            
             # Generate script using Llama-3.1
             start_time = time.time()
-            
-            logger.debug("Starting script generation API call")
-            completion = client.chat.completions.create(
-                model=self.config.model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": full_prompt
-                    }
-                ],
-                max_tokens=self.config.max_tokens,
-                temperature=self.config.temperature
+            script_text, cache_tier, time_to_first_token = self._complete(
+                full_prompt, self.config.max_tokens, on_token=on_token, use_cache=use_cache, user_id=user_id
             )
             
             generation_time = time.time() - start_time
             logger.info(f"Script generation completed in {generation_time:.2f} seconds")
-            
-            # Extract and format the result
-            script_text = self._extract_script_from_result(completion)
             logger.debug(f"Generated script length: {len(script_text)} characters")
             
             # Analyze the generated script
@@ -209,6 +344,9 @@ class LlamaClient:
                     'requested_duration': duration_minutes,
                     'style': style,
                     'generation_time': round(generation_time, 2),
+                    'time_to_first_token': round(time_to_first_token, 2) if time_to_first_token is not None else None,
+                    'streamed': on_token is not None,
+                    'cache': cache_tier,
                     'word_count': script_analysis['word_count'],
                     'estimated_duration': script_analysis['estimated_duration'],
                     'model': self.config.model_name
@@ -217,6 +355,8 @@ class LlamaClient:
                 'success': True
             }
             
+        except _CallbackError as e:
+            raise e.error
         except Exception as e:
             logger.error(f"Script generation failed: {e}", exc_info=True)
             return {
@@ -225,52 +365,410 @@ class LlamaClient:
                 'success': False
             }
     
-    def _build_script_prompt(
+    def generate_long_script(
         self,
         prompt: str,
         topic: Optional[str] = None,
         target_audience: Optional[str] = None,
         duration_minutes: Optional[int] = None,
         style: Optional[str] = None,
-        additional_context: Optional[str] = None
-    ) -> str:
-        """Build a comprehensive prompt for script generation"""
+        additional_context: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a long script from an outline with sections drafted concurrently.
         
-        logger.debug(f"Building script prompt with parameters: topic={topic}, "
-                    f"audience={target_audience}, duration={duration_minutes}, style={style}")
+        A single completion is capped at ``max_tokens`` and truncates long
+        lectures. Instead an outline of sections is generated first, then each
+        section is drafted as its own completion (at most
+        ``section_concurrency`` at a time) with a share of the word target.
+        Sections that come back well short of their target get one expansion
+        pass before the sections are joined in order. With ``on_token``, each
+        section is passed on as soon as it and all sections before it are done.
         
-        # Start with system instruction
-        system_prompt = "You are a professional content writer specializing in spoken content for video presentations. "
-        system_prompt += "Generate only the exact words that will be spoken by a presenter in a talking-head video. "
-        system_prompt += "Do not include any titles, headers, production notes, background music suggestions, or formatting. "
-        system_prompt += "Focus solely on creating natural, conversational spoken content.\n\n"
+        Returns:
+            Dict in the same shape as ``generate_script``
+        """
+        on_token = _guard_callback(on_token)
+        try:
+            start_time = time.time()
+            words_needed = (duration_minutes or 1) * 150  # Approximately 150 words per minute
+            section_count = max(2, math.ceil(words_needed / self.config.section_words))
+            section_words = math.ceil(words_needed / section_count)
+            
+            logger.info(f"Generating long-form script: {words_needed} words in {section_count} sections")
+            
+            outline = self._generate_outline(
+                prompt, topic, target_audience, duration_minutes, style, additional_context,
+                section_count, use_cache, user_id
+            )
+            
+            def draft(index: int) -> str:
+                section_prompt = self._build_section_prompt(
+                    prompt, topic, target_audience, style, additional_context,
+                    outline, index, section_words
+                )
+                text, _, _ = self._complete(
+                    section_prompt, self._tokens_for(section_words), use_cache=use_cache, user_id=user_id
+                )
+                
+                # Top up a section that fell well short of its share of the length
+                words = self._analyze_script(text)['word_count']
+                if words < section_words * 0.7:
+                    logger.info(f"Section {index + 1} has {words}/{section_words} words; expanding")
+                    expand_prompt = self._build_expand_prompt(section_prompt, text, section_words)
+                    expanded, _, _ = self._complete(
+                        expand_prompt, self._tokens_for(section_words), use_cache=use_cache, user_id=user_id
+                    )
+                    if self._analyze_script(expanded)['word_count'] > words:
+                        text = expanded
+                return text
+            
+            sections: List[Optional[str]] = [None] * len(outline)
+            emitted = 0
+            first_section_time = None
+            for index, text in self._map_concurrently(draft, range(len(outline))):
+                sections[index] = text
+                # Pass sections on in order as soon as the ones before them are done
+                while emitted < len(sections) and sections[emitted] is not None:
+                    if first_section_time is None:
+                        first_section_time = time.time() - start_time
+                    if on_token:
+                        on_token(('\n\n' if emitted else '') + sections[emitted])
+                    emitted += 1
+            
+            script_text = '\n\n'.join(section for section in sections if section)
+            generation_time = time.time() - start_time
+            script_analysis = self._analyze_script(script_text)
+            
+            logger.info(f"Long-form script completed in {generation_time:.2f} seconds: "
+                       f"{script_analysis['word_count']}/{words_needed} words")
+            
+            return {
+                'script': script_text,
+                'metadata': {
+                    'prompt': prompt,
+                    'topic': topic,
+                    'target_audience': target_audience,
+                    'requested_duration': duration_minutes,
+                    'style': style,
+                    'generation_time': round(generation_time, 2),
+                    'time_to_first_token': round(first_section_time, 2) if first_section_time is not None else None,
+                    'streamed': on_token is not None,
+                    'cache': None,
+                    'long_form': True,
+                    'outline': [section['title'] for section in outline],
+                    'section_word_counts': [self._analyze_script(section)['word_count'] for section in sections],
+                    'word_count': script_analysis['word_count'],
+                    'target_word_count': words_needed,
+                    'estimated_duration': script_analysis['estimated_duration'],
+                    'model': self.config.model_name
+                },
+                'analysis': script_analysis,
+                'success': True
+            }
+            
+        except _CallbackError as e:
+            raise e.error
+        except Exception as e:
+            logger.error(f"Long-form script generation failed: {e}", exc_info=True)
+            return {
+                'script': None,
+                'error': str(e),
+                'success': False
+            }
+    
+    def _tokens_for(self, words: int) -> int:
+        """Completion budget for a passage of ``words`` words, with headroom"""
+        return max(self.config.max_tokens, int(words * 1.6) + 200)
+    
+    def _map_concurrently(self, func: Callable[[int], str], indexes):
+        """
+        Run ``func`` for each index on a bounded thread pool
         
-        # Add specific requirements
-        requirements = []
+        Yields (index, result) in completion order. Worker threads run inside
+        the caller's Flask app context, when there is one.
+        """
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = None
+        
+        def run(index):
+            if app is None:
+                return func(index)
+            with app.app_context():
+                return func(index)
+        
+        with ThreadPoolExecutor(max_workers=self.config.section_concurrency) as pool:
+            futures = {pool.submit(run, index): index for index in indexes}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def _complete(
+        self,
+        full_prompt: str,
+        max_tokens: int,
+        on_token: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        user_id: Optional[int] = None
+    ) -> tuple:
+        """
+        Run one completion, serving it from the prompt cache when possible
+        
+        Requests to the provider go through the rate-limit scheduler, queued
+        fairly with other users' requests for ``user_id``.
+        
+        Returns:
+            Tuple of (text, cache tier that matched or None, seconds until the
+            first streamed fragment or None)
+        """
+        start_time = time.time()
+        
+        if use_cache:
+            cached, cache_tier = prompt_cache.lookup(
+                full_prompt, self.config.model_name, self.config.temperature, max_tokens
+            )
+            if cached:
+                logger.info(f"Completion served from prompt cache ({cache_tier} match)")
+                if on_token:
+                    on_token(cached['script'])
+                return cached['script'], cache_tier, None
+        
+        client = self._get_client()
+        
+        logger.debug("Starting script generation API call")
+        messages = [
+            {
+                "role": "user",
+                "content": full_prompt
+            }
+        ]
+        emitted = []
+        
+        def request():
+            if on_token:
+                def forward(fragment):
+                    emitted.append(True)
+                    on_token(fragment)
+                return self._stream_completion(client, messages, max_tokens, forward, start_time), None
+            completion = client.chat.completions.create(
+                model=self.config.model_name,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=self.config.temperature
+            )
+            # Extract and format the result
+            usage = getattr(completion, 'usage', None)
+            return (self._extract_script_from_result(completion), None), getattr(usage, 'total_tokens', None)
+        
+        # Rough reservation: ~4 characters per prompt token plus the full completion budget
+        estimated_tokens = len(full_prompt) // 4 + max_tokens
+        try:
+            text, time_to_first_token = scheduler.call(
+                request, user_id=user_id, tokens=estimated_tokens,
+                # Streamed fragments already passed on can't be taken back
+                can_retry=lambda: not emitted
+            )
+        except (_CallbackError, LLMQueueTimeout):
+            # Neither reached the provider: a downstream callback failed, or the
+            # request timed out in our rate-limit queue
+            raise
+        except Exception as e:
+            self._record_health('unhealthy', 'generation', error=str(e))
+            raise
+        
+        if time.time() - self._last_health_check > 30:
+            self._record_health('healthy', 'generation')
+        
+        prompt_cache.store(
+            full_prompt, self.config.model_name, self.config.temperature, max_tokens,
+            text, time.time() - start_time
+        )
+        return text, None, time_to_first_token
+    
+    def _stream_completion(
+        self,
+        client: InferenceClient,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        on_token: Callable[[str], None],
+        start_time: float
+    ) -> tuple:
+        """
+        Stream a chat completion, passing each text fragment to ``on_token``
+        
+        Returns:
+            Tuple of (complete text, seconds until the first fragment)
+        """
+        parts = []
+        time_to_first_token = None
+        stream = client.chat.completions.create(
+            model=self.config.model_name,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=self.config.temperature,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            if time_to_first_token is None:
+                time_to_first_token = time.time() - start_time
+                logger.info(f"First script tokens after {time_to_first_token:.2f} seconds")
+            parts.append(text)
+            on_token(text)
+        
+        return ''.join(parts).strip(), time_to_first_token
+    
+    def _generate_outline(
+        self,
+        prompt: str,
+        topic: Optional[str],
+        target_audience: Optional[str],
+        duration_minutes: Optional[int],
+        style: Optional[str],
+        additional_context: Optional[str],
+        section_count: int,
+        use_cache: bool,
+        user_id: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Plan a long script as ``section_count`` sections
         
+        Returns:
+            List of {'title', 'summary'} dicts, exactly ``section_count`` long
+        """
+        outline_prompt = "You are planning a spoken lecture for a talking-head video.\n\n"
+        outline_prompt += self._format_requirements(topic, target_audience, duration_minutes, style, additional_context)
+        outline_prompt += f"PROMPT:\n{prompt}\n\n"
+        outline_prompt += f"Divide the lecture into exactly {section_count} consecutive sections that together cover the prompt, "
+        outline_prompt += "from an opening that greets the audience to a closing summary. "
+        outline_prompt += f"Reply with exactly {section_count} lines and nothing else, one per section, in the form:\n"
+        outline_prompt += "<number>. <section title>: <one sentence describing what the section covers>\n\n"
+        outline_prompt += "OUTLINE:"
+        
+        text, _, _ = self._complete(outline_prompt, self.config.max_tokens, use_cache=use_cache, user_id=user_id)
+        
+        outline = []
+        for line in text.splitlines():
+            match = re.match(r'^\s*(?:section\s*)?\d+[.):-]\s*(.+)$', line, re.IGNORECASE)
+            if not match:
+                continue
+            title, _, summary = match.group(1).partition(':')
+            title = title.strip(' *#')
+            if title:
+                outline.append({'title': title, 'summary': summary.strip(' *')})
+        
+        if not outline:
+            logger.warning("Could not parse an outline; splitting the prompt into generic parts")
+        # Keep the planned length even if the model returned more or fewer sections
+        outline = outline[:section_count]
+        while len(outline) < section_count:
+            outline.append({'title': f"Part {len(outline) + 1}", 'summary': ''})
+        
+        logger.debug(f"Outline: {[section['title'] for section in outline]}")
+        return outline
+    
+    def _build_section_prompt(
+        self,
+        prompt: str,
+        topic: Optional[str],
+        target_audience: Optional[str],
+        style: Optional[str],
+        additional_context: Optional[str],
+        outline: List[Dict[str, str]],
+        index: int,
+        section_words: int
+    ) -> str:
+        """Build the prompt for drafting one section of a long script"""
+        section = outline[index]
+        is_first = index == 0
+        is_last = index == len(outline) - 1
+        
+        section_prompt = "You are a professional content writer specializing in spoken content for video presentations. "
+        section_prompt += "You are writing one section of a longer lecture that is split into consecutive sections.\n\n"
+        section_prompt += self._format_requirements(topic, target_audience, None, style, additional_context)
+        section_prompt += f"LECTURE PROMPT:\n{prompt}\n\n"
+        section_prompt += "LECTURE OUTLINE:\n"
+        section_prompt += "\n".join(
+            f"{number}. {item['title']}" + (f": {item['summary']}" if item['summary'] else '')
+            for number, item in enumerate(outline, start=1)
+        )
+        section_prompt += f"\n\nWrite ONLY section {index + 1}: {section['title']}"
+        if section['summary']:
+            section_prompt += f" ({section['summary']})"
+        section_prompt += f". It should be approximately {section_words} words.\n"
+        if not is_first:
+            section_prompt += "Do not greet the audience or introduce the lecture; continue naturally from the previous section.\n"
+        if not is_last:
+            section_prompt += "Do not wrap up or conclude the lecture; later sections follow.\n"
+        section_prompt += "Output only the spoken words, without titles, headers, section labels or production notes.\n\n"
+        section_prompt += "SPOKEN CONTENT:"
+        return section_prompt
+    
+    def _build_expand_prompt(self, section_prompt: str, draft: str, section_words: int) -> str:
+        """Build a prompt asking for a fuller version of a short section draft"""
+        expand_prompt = section_prompt.rsplit("SPOKEN CONTENT:", 1)[0]
+        expand_prompt += f"A first draft of this section was too short:\n\n{draft}\n\n"
+        expand_prompt += f"Rewrite it as a complete section of approximately {section_words} words, "
+        expand_prompt += "adding explanation and examples. Output only the spoken words.\n\n"
+        expand_prompt += "SPOKEN CONTENT:"
+        return expand_prompt
+    
+    def _format_requirements(
+        self,
+        topic: Optional[str],
+        target_audience: Optional[str],
+        duration_minutes: Optional[int],
+        style: Optional[str],
+        additional_context: Optional[str]
+    ) -> str:
+        """Format the optional request parameters as a REQUIREMENTS block"""
+        requirements = []
         if topic:
             requirements.append(f"Topic/Subject: {topic}")
-        
         if target_audience:
             requirements.append(f"Target Audience: {target_audience}")
-        
         if duration_minutes:
             words_needed = duration_minutes * 150  # Approximately 150 words per minute
             requirements.append(f"Target Duration: {duration_minutes} minutes (approximately {words_needed} words)")
-        
         if style:
             requirements.append(f"Style: {style}")
-        
         if additional_context:
             requirements.append(f"Additional Context: {additional_context}")
+        if not requirements:
+            return ""
+        return "REQUIREMENTS:\n" + "\n".join(f"- {req}" for req in requirements) + "\n\n"
+    
+    def _build_script_prompt(
+        self,
+        prompt: str,
+        topic: Optional[str] = None,
+        target_audience: Optional[str] = None,
+        duration_minutes: Optional[int] = None,
+        style: Optional[str] = None,
+        additional_context: Optional[str] = None
+    ) -> str:
+        """Build a comprehensive prompt for script generation"""
         
-        # Build the full prompt
-        full_prompt = system_prompt
+        logger.debug(f"Building script prompt with parameters: topic={topic}, "
+                    f"audience={target_audience}, duration={duration_minutes}, style={style}")
+        
+        # Start with system instruction
+        system_prompt = "You are a professional content writer specializing in spoken content for video presentations. "
+        system_prompt += "Generate only the exact words that will be spoken by a presenter in a talking-head video. "
+        system_prompt += "Do not include any titles, headers, production notes, background music suggestions, or formatting. "
+        system_prompt += "Focus solely on creating natural, conversational spoken content.\n\n"
         
-        if requirements:
-            full_prompt += "REQUIREMENTS:\n"
-            full_prompt += "\n".join(f"- {req}" for req in requirements)
-            full_prompt += "\n\n"
+        # Add specific requirements and build the full prompt
+        full_prompt = system_prompt
+        full_prompt += self._format_requirements(topic, target_audience, duration_minutes, style, additional_context)
         
         full_prompt += "PROMPT:\n"
         full_prompt += prompt
@@ -284,7 +782,7 @@ class LlamaClient:
         full_prompt += "6. Content that starts speaking immediately without introductory titles\n\n"
         full_prompt += "SPOKEN CONTENT:"
         
-        logger.debug(f"Built prompt with {len(requirements)} requirements, total length: {len(full_prompt)} characters")
+        logger.debug(f"Built prompt, total length: {len(full_prompt)} characters")
         
         return full_prompt
     
@@ -339,3 +837,34 @@ class LlamaClient:
 def create_llama_client(config: Optional[LlamaConfig] = None) -> LlamaClient:
     """Create a Llama client with default or custom configuration"""
     return LlamaClient(config)
+
+
+_shared_clients: Dict[tuple, LlamaClient] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_llama_client(config: Optional[LlamaConfig] = None) -> LlamaClient:
+    """
+    Get this process's Llama client for a configuration
+    
+    Tasks reuse one client (and its HTTP connections) per distinct
+    configuration instead of building a new one per task.
+    """
+    config = config or LlamaConfig()
+    key = astuple(config)
+    client = _shared_clients.get(key)
+    if client is None:
+        with _shared_clients_lock:
+            client = _shared_clients.get(key)
+            if client is None:
+                client = _shared_clients[key] = LlamaClient(config)
+    return client
+
+
+def _reset_shared_clients():
+    # A forked worker must not reuse the parent's connections
+    _shared_clients.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_shared_clients)
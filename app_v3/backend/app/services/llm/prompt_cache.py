@@ -0,0 +1,170 @@
+"""
+Redis-backed cache of LLM completions.
+
+Entries are keyed on the fully built prompt plus the generation settings that
+change the output (model, temperature, max tokens). Two tiers are kept:
+
+- exact: the prompt as sent to the model
+- normalized: the prompt with case, punctuation and whitespace differences
+  removed, so near-identical requests (e.g. a course template re-run with a
+  trailing space or different capitalisation) also hit
+
+Both tiers hold the same entry and expire on ``LLM_PROMPT_CACHE_TTL``. Hit,
+miss and store counts are kept in a Redis hash for ``stats()``. The cache is
+best effort: any Redis error is logged and treated as a miss.
+"""
+import re
+import json
+import time
+import hashlib
+import logging
+import unicodedata
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+
+from ... import extensions
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'llmcache'
+STATS_KEY = f'{KEY_PREFIX}:stats'
+
+TIER_EXACT = 'exact'
+TIER_NORMALIZED = 'normalized'
+
+_PUNCTUATION = re.compile(r'[^\w\s]+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _config(key: str, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        # Outside Flask app context
+        return default
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, punctuation and whitespace so near-identical prompts compare equal"""
+    text = unicodedata.normalize('NFKC', prompt).casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _cache_key(tier: str, prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+    digest = hashlib.sha256(
+        json.dumps([model, round(float(temperature), 3), int(max_tokens), prompt]).encode()
+    ).hexdigest()
+    return f'{KEY_PREFIX}:{tier}:{digest}'
+
+
+def _keys(prompt: str, model: str, temperature: float, max_tokens: int) -> Dict[str, str]:
+    keys = {TIER_EXACT: _cache_key(TIER_EXACT, prompt, model, temperature, max_tokens)}
+    if _config('LLM_PROMPT_CACHE_NORMALIZED', True):
+        keys[TIER_NORMALIZED] = _cache_key(
+            TIER_NORMALIZED, normalize_prompt(prompt), model, temperature, max_tokens
+        )
+    return keys
+
+
+def _enabled():
+    if not _config('LLM_PROMPT_CACHE_ENABLED', True):
+        return None
+    return extensions.redis_client
+
+
+def _count(redis_client, field: str, amount: float = 1):
+    try:
+        if isinstance(amount, float):
+            redis_client.hincrbyfloat(STATS_KEY, field, amount)
+        else:
+            redis_client.hincrby(STATS_KEY, field, amount)
+    except Exception as e:
+        logger.debug(f"Failed to update prompt cache stats: {e}")
+
+
+def lookup(prompt: str, model: str, temperature: float, max_tokens: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Find a cached completion for a prompt
+
+    Returns:
+        (entry, tier): the cached entry and the tier that matched, or
+        (None, None) on a miss
+    """
+    redis_client = _enabled()
+    if redis_client is None:
+        return None, None
+
+    keys = _keys(prompt, model, temperature, max_tokens)
+    tiers = list(keys)
+    try:
+        values = redis_client.mget([keys[tier] for tier in tiers])
+    except Exception as e:
+        logger.warning(f"Prompt cache lookup failed: {e}")
+        return None, None
+
+    for tier, value in zip(tiers, values):
+        if value:
+            entry = json.loads(value)
+            _count(redis_client, f'hits_{tier}')
+            _count(redis_client, 'saved_seconds', float(entry.get('generation_time') or 0.0))
+            return entry, tier
+
+    _count(redis_client, 'misses')
+    return None, None
+
+
+def store(prompt: str, model: str, temperature: float, max_tokens: int,
+          script: str, generation_time: float, ttl: Optional[int] = None):
+    """Cache a completion under every enabled tier"""
+    redis_client = _enabled()
+    if redis_client is None or not script:
+        return
+
+    ttl = ttl or _config('LLM_PROMPT_CACHE_TTL', 7 * 24 * 3600)
+    entry = json.dumps({
+        'script': script,
+        'model': model,
+        'generation_time': round(generation_time, 2),
+        'cached_at': time.time()
+    })
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in _keys(prompt, model, temperature, max_tokens).values():
+            pipe.setex(key, ttl, entry)
+        pipe.hincrby(STATS_KEY, 'stores', 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Prompt cache store failed: {e}")
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters since the stats were last reset"""
+    redis_client = extensions.redis_client
+    result = {
+        'enabled': bool(_config('LLM_PROMPT_CACHE_ENABLED', True)) and redis_client is not None,
+        'normalized_tier': bool(_config('LLM_PROMPT_CACHE_NORMALIZED', True)),
+        'ttl': _config('LLM_PROMPT_CACHE_TTL', 7 * 24 * 3600),
+    }
+    raw = {}
+    if redis_client is not None:
+        try:
+            raw = {
+                (k.decode() if isinstance(k, bytes) else k): float(v)
+                for k, v in redis_client.hgetall(STATS_KEY).items()
+            }
+        except Exception as e:
+            logger.warning(f"Failed to read prompt cache stats: {e}")
+
+    hits = {tier: int(raw.get(f'hits_{tier}', 0)) for tier in (TIER_EXACT, TIER_NORMALIZED)}
+    misses = int(raw.get('misses', 0))
+    lookups = sum(hits.values()) + misses
+    result.update({
+        'hits': hits,
+        'misses': misses,
+        'stores': int(raw.get('stores', 0)),
+        'hit_rate': round(sum(hits.values()) / lookups, 4) if lookups else None,
+        'saved_generation_seconds': round(raw.get('saved_seconds', 0.0), 2),
+    })
+    return result
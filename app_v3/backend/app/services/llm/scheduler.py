@@ -0,0 +1,399 @@
+"""
+Client-side scheduling of LLM requests against provider rate limits.
+
+Every completion first acquires capacity from token buckets for requests per
+minute (``LLM_RATE_LIMIT_RPM``) and tokens per minute (``LLM_RATE_LIMIT_TPM``).
+With Redis the buckets, and the queue of waiting requests, are shared by all
+workers and updated atomically by a Lua script. Without Redis a per-process
+bucket is used.
+
+Waiting requests are served in order of their user's recent plus pending
+token usage, so one user's burst (e.g. the sections of a long script) is
+interleaved with other users' requests rather than starving them. A waiter
+gives up once its deadline (``LLM_QUEUE_TIMEOUT``) passes.
+
+Rate-limit responses from the provider (429/503) pause the whole queue for
+the Retry-After the provider asked for (or an exponential backoff) and the
+request is retried, so bursts settle at the provider's limit instead of
+failing jobs.
+"""
+import time
+import uuid
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app
+
+from ... import extensions
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'llm_sched'
+WAITING_KEY = f'{KEY_PREFIX}:waiting'
+ALIVE_KEY = f'{KEY_PREFIX}:alive'
+BUCKET_KEY = f'{KEY_PREFIX}:bucket'
+BLOCKED_KEY = f'{KEY_PREFIX}:blocked_until'
+STATS_KEY = f'{KEY_PREFIX}:stats'
+
+# Stand-in for "no limit" inside the bucket arithmetic
+UNLIMITED = 10 ** 12
+
+# Seconds between polls of a waiter that is not at the head of the queue
+_POLL_INTERVAL = 0.05
+# A waiter that stops polling for this long is dropped from the queue
+_WAITER_TTL_MS = 10000
+
+# Returns 0 when capacity was taken, otherwise milliseconds to wait
+_ACQUIRE_SCRIPT = """
+local waiting, alive, bucket, blocked = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local member = ARGV[1]
+local now = tonumber(ARGV[2])
+local rpm = tonumber(ARGV[3])
+local tpm = tonumber(ARGV[4])
+local need = math.min(tonumber(ARGV[5]), tpm)
+local ttl = tonumber(ARGV[6])
+local score = tonumber(ARGV[7])
+
+-- Queue entry and liveness are written together, so a waiter that dies at
+-- any point leaves nothing the stale cleanup below cannot remove
+redis.call('ZADD', alive, now + ttl, member)
+redis.call('ZADD', waiting, 'NX', score, member)
+for _, stale in ipairs(redis.call('ZRANGEBYSCORE', alive, '-inf', now)) do
+  redis.call('ZREM', waiting, stale)
+  redis.call('ZREM', alive, stale)
+end
+
+local head = redis.call('ZRANGE', waiting, 0, 0)[1]
+while head and head ~= member and not redis.call('ZSCORE', alive, head) do
+  -- Queued without a liveness entry: nothing will ever serve or expire it
+  redis.call('ZREM', waiting, head)
+  head = redis.call('ZRANGE', waiting, 0, 0)[1]
+end
+if head ~= member then
+  return -1
+end
+
+local blocked_until = tonumber(redis.call('GET', blocked) or '0')
+if blocked_until > now then
+  return blocked_until - now
+end
+
+local state = redis.call('HMGET', bucket, 'requests', 'tokens', 'ts')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+requests = math.min(rpm, requests + elapsed * rpm / 60000)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60000)
+
+if requests >= 1 and tokens >= need then
+  redis.call('HSET', bucket, 'requests', requests - 1, 'tokens', tokens - need, 'ts', now)
+  redis.call('ZREM', waiting, member)
+  redis.call('ZREM', alive, member)
+  return 0
+end
+
+redis.call('HSET', bucket, 'requests', requests, 'tokens', tokens, 'ts', now)
+local wait = 0
+if requests < 1 then wait = (1 - requests) * 60000 / rpm end
+if tokens < need then wait = math.max(wait, (need - tokens) * 60000 / tpm) end
+return math.max(1, math.ceil(wait))
+"""
+
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+  redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[2]), tokens + tonumber(ARGV[1])))
+end
+return 0
+"""
+
+
+def _config(key: str, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        # Outside Flask app context
+        return default
+
+
+class LLMQueueTimeout(RuntimeError):
+    """Raised when an LLM request could not be scheduled before its deadline"""
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, if ``error`` is a rate-limit response
+
+    Returns:
+        The Retry-After delay (0.0 if the header is missing or not a number),
+        or None if the error is not a 429/503 response
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status_code', None)
+    if status not in (429, 503):
+        return None
+    header = None
+    if response is not None and getattr(response, 'headers', None) is not None:
+        header = response.headers.get('retry-after')
+    try:
+        return max(0.0, float(header))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _LocalBucket:
+    """Per-process token buckets, used when Redis is unavailable"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = None
+        self._tokens = None
+        self._updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def take(self, rpm: float, tpm: float, need: float) -> float:
+        """Take capacity; returns 0 on success or seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            if self._requests is None:
+                self._requests, self._tokens = rpm, tpm
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(rpm, self._requests + elapsed * rpm / 60)
+            self._tokens = min(tpm, self._tokens + elapsed * tpm / 60)
+            need = min(need, tpm)
+            if self._requests >= 1 and self._tokens >= need:
+                self._requests -= 1
+                self._tokens -= need
+                return 0.0
+            wait = (1 - self._requests) * 60 / rpm if self._requests < 1 else 0.0
+            if self._tokens < need:
+                wait = max(wait, (need - self._tokens) * 60 / tpm)
+            return max(wait, 0.001)
+
+    def refund(self, tokens: float, tpm: float):
+        with self._lock:
+            if self._tokens is not None:
+                self._tokens = min(tpm, self._tokens + tokens)
+
+
+class LLMScheduler:
+    """Admit LLM requests at the provider's rate limits, fairly across users"""
+
+    def __init__(self):
+        self._local = _LocalBucket()
+        self._scripts = {}
+
+    def _settings(self) -> Dict[str, Any]:
+        rpm = _config('LLM_RATE_LIMIT_RPM', 60)
+        tpm = _config('LLM_RATE_LIMIT_TPM', 100000)
+        return {
+            'rpm': float(rpm) if rpm else UNLIMITED,
+            'tpm': float(tpm) if tpm else UNLIMITED,
+            'limited': bool(rpm or tpm),
+            'queue_timeout': _config('LLM_QUEUE_TIMEOUT', 600),
+            'max_retries': _config('LLM_RATE_LIMIT_RETRIES', 5),
+        }
+
+    def _script(self, redis_client, source: str):
+        # Registered per client; the script object caches its SHA for EVALSHA
+        key = (id(redis_client), source)
+        if key not in self._scripts:
+            self._scripts[key] = redis_client.register_script(source)
+        return self._scripts[key]
+
+    def _count(self, field: str, amount: float = 1):
+        redis_client = extensions.redis_client
+        if redis_client is None:
+            return
+        try:
+            redis_client.hincrbyfloat(STATS_KEY, field, amount)
+        except Exception:
+            pass
+
+    def acquire(self, user_id, tokens: int, deadline: float):
+        """
+        Block until a request of ``tokens`` tokens may be sent
+
+        Args:
+            user_id: User the request is made for (None for system requests)
+            tokens: Estimated prompt plus completion tokens
+            deadline: ``time.monotonic()`` value after which to give up
+
+        Raises:
+            LLMQueueTimeout: If the deadline passes first
+        """
+        settings = self._settings()
+        if not settings['limited']:
+            return
+
+        started = time.monotonic()
+        redis_client = extensions.redis_client
+        if redis_client is not None:
+            try:
+                self._acquire_shared(redis_client, settings, user_id, tokens, deadline)
+                self._count('granted')
+                self._count('wait_seconds', time.monotonic() - started)
+                return
+            except LLMQueueTimeout:
+                self._count('timeouts')
+                raise
+            except Exception as e:
+                logger.warning(f"Shared LLM rate limiter unavailable, limiting per process: {e}")
+
+        while True:
+            wait = self._local.take(settings['rpm'], settings['tpm'], tokens)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise LLMQueueTimeout('Timed out waiting for LLM rate limit capacity')
+            time.sleep(wait)
+
+    def _acquire_shared(self, redis_client, settings, user_id, tokens: int, deadline: float):
+        user = user_id if user_id is not None else 'system'
+        usage_key = f'{KEY_PREFIX}:usage:{user}'
+        pending_key = f'{KEY_PREFIX}:pending:{user}'
+
+        # Queue position: the user's tokens used in the last minute plus those
+        # already waiting, so heavy users queue behind light ones
+        pipe = redis_client.pipeline()
+        pipe.get(usage_key)
+        pipe.incrby(pending_key, tokens)
+        pipe.expire(pending_key, 3600)
+        used, pending, _ = pipe.execute()
+        score = int(used or 0) + int(pending) - tokens
+        member = f'{time.time():.6f}:{uuid.uuid4().hex}'
+
+        acquire = self._script(redis_client, _ACQUIRE_SCRIPT)
+        granted = False
+        try:
+            while True:
+                wait_ms = acquire(
+                    keys=[WAITING_KEY, ALIVE_KEY, BUCKET_KEY, BLOCKED_KEY],
+                    args=[member, int(time.time() * 1000), settings['rpm'], settings['tpm'], tokens,
+                          _WAITER_TTL_MS, score]
+                )
+                if wait_ms == 0:
+                    granted = True
+                    break
+                if wait_ms < 0:
+                    # Not our turn (the script re-queues us if we were dropped as stale)
+                    wait = _POLL_INTERVAL
+                else:
+                    wait = wait_ms / 1000
+                if time.monotonic() + min(wait, _POLL_INTERVAL) > deadline:
+                    raise LLMQueueTimeout('Timed out waiting for LLM rate limit capacity')
+                # Head waiters re-check at least every poll interval so a
+                # shortened block (e.g. a refund) is noticed
+                time.sleep(min(wait, max(_POLL_INTERVAL, deadline - time.monotonic())))
+        finally:
+            pipe = redis_client.pipeline()
+            pipe.decrby(pending_key, tokens)
+            if granted:
+                pipe.incrby(usage_key, tokens)
+                pipe.expire(usage_key, 60)
+            else:
+                pipe.zrem(WAITING_KEY, member)
+                pipe.zrem(ALIVE_KEY, member)
+            pipe.execute()
+
+    def refund(self, tokens: int):
+        """Return capacity reserved for a request that used fewer tokens"""
+        if tokens <= 0:
+            return
+        settings = self._settings()
+        redis_client = extensions.redis_client
+        if redis_client is not None:
+            try:
+                self._script(redis_client, _REFUND_SCRIPT)(keys=[BUCKET_KEY], args=[tokens, settings['tpm']])
+                return
+            except Exception as e:
+                logger.debug(f"Failed to refund LLM tokens: {e}")
+        self._local.refund(tokens, settings['tpm'])
+
+    def pause(self, seconds: float):
+        """Hold all queued requests for ``seconds`` (provider asked us to back off)"""
+        redis_client = extensions.redis_client
+        if redis_client is not None:
+            try:
+                until = int((time.time() + seconds) * 1000)
+                current = int(redis_client.get(BLOCKED_KEY) or 0)
+                if until > current:
+                    redis_client.set(BLOCKED_KEY, until, px=int(seconds * 1000) + 1000)
+                self._count('throttled_seconds', seconds)
+                return
+            except Exception as e:
+                logger.debug(f"Failed to share LLM backoff: {e}")
+        self._local.blocked_until = max(self._local.blocked_until, time.monotonic() + seconds)
+
+    def call(self, func: Callable[[], Tuple[Any, Optional[int]]], user_id=None, tokens: int = 0,
+             can_retry: Callable[[], bool] = lambda: True) -> Any:
+        """
+        Run an LLM request once capacity is available, retrying rate-limit errors
+
+        Args:
+            func: Makes the request; returns (result, tokens actually used or None)
+            user_id: User the request is made for
+            tokens: Estimated prompt plus completion tokens
+            can_retry: Returns False once retrying is unsafe (e.g. streamed
+                output was already passed on)
+
+        Returns:
+            The result of ``func``
+
+        Raises:
+            LLMQueueTimeout: If no capacity was available before the deadline
+        """
+        settings = self._settings()
+        deadline = time.monotonic() + settings['queue_timeout']
+        attempt = 0
+        while True:
+            self.acquire(user_id, tokens, deadline)
+            try:
+                result, used = func()
+            except Exception as e:
+                delay = retry_after_seconds(e)
+                if delay is None or attempt >= settings['max_retries'] or not can_retry():
+                    raise
+                attempt += 1
+                delay = delay or min(60.0, 2.0 ** attempt)
+                logger.warning(f"LLM provider rate limited the request; retrying in {delay:.1f}s "
+                               f"(attempt {attempt}/{settings['max_retries']})")
+                self._count('retries')
+                self.pause(delay)
+                continue
+            if used is not None:
+                self.refund(tokens - used)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduler counters and current queue length"""
+        settings = self._settings()
+        result = {
+            'rpm_limit': _config('LLM_RATE_LIMIT_RPM', 60),
+            'tpm_limit': _config('LLM_RATE_LIMIT_TPM', 100000),
+            'queue_timeout': settings['queue_timeout'],
+            'shared': extensions.redis_client is not None,
+        }
+        redis_client = extensions.redis_client
+        if redis_client is not None:
+            try:
+                raw = redis_client.hgetall(STATS_KEY)
+                counters = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+                result.update({
+                    'waiting': redis_client.zcard(WAITING_KEY),
+                    'granted': int(counters.get('granted', 0)),
+                    'timeouts': int(counters.get('timeouts', 0)),
+                    'retries': int(counters.get('retries', 0)),
+                    'wait_seconds': round(counters.get('wait_seconds', 0.0), 2),
+                    'throttled_seconds': round(counters.get('throttled_seconds', 0.0), 2),
+                })
+            except Exception as e:
+                logger.warning(f"Failed to read LLM scheduler stats: {e}")
+        return result
+
+
+scheduler = LLMScheduler()
@@ -0,0 +1,200 @@
+"""
+Live job progress channel over Redis pub/sub.
+
+Workers publish incremental output (e.g. script text as the LLM produces it)
+to ``job_progress:<job_id>`` while also keeping the text so far in a snapshot
+key, so a client that connects mid-generation first receives everything
+produced until then and continues from there. Each text event carries the
+offset it starts at, which lets subscribers drop the overlap between the
+snapshot and events published while they were connecting.
+
+Publishing is best effort: without Redis the job still completes and clients
+fall back to polling the job status.
+"""
+import json
+import time
+import logging
+from typing import Any, Dict, Iterator, Optional
+
+from flask import current_app
+
+from .. import extensions
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'job_progress'
+
+EVENT_TEXT = 'text'
+EVENT_DONE = 'done'
+EVENT_ERROR = 'error'
+EVENT_SEGMENT = 'segment'
+EVENT_LECTURE = 'lecture'
+
+
+def progress_channel(job_id: int) -> str:
+    return f'{CHANNEL_PREFIX}:{job_id}'
+
+
+def snapshot_key(job_id: int) -> str:
+    return f'{CHANNEL_PREFIX}:{job_id}:text'
+
+
+def status_key(job_id: int) -> str:
+    return f'{CHANNEL_PREFIX}:{job_id}:final'
+
+
+class ProgressPublisher:
+    """
+    Publish partial output of a running job
+
+    Tokens are buffered and flushed at most every ``flush_interval`` seconds,
+    so a fast model does not turn into one Redis round trip per token.
+    """
+
+    def __init__(self, job_id: int, flush_interval: Optional[float] = None, ttl: Optional[int] = None):
+        self.job_id = job_id
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            current_app.config.get('JOB_PROGRESS_FLUSH_INTERVAL', 0.2)
+        self.ttl = ttl or current_app.config.get('JOB_PROGRESS_TTL', 3600)
+        self.redis_client = extensions.redis_client
+        self._published = 0
+        self._buffer = []
+        self._last_flush = 0.0
+        self.first_token_at = None
+
+        if self.redis_client is not None:
+            self._execute(lambda pipe: pipe.delete(snapshot_key(job_id), status_key(job_id)))
+
+    def _execute(self, build):
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            build(pipe)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to publish progress for job {self.job_id}: {e}")
+            return False
+
+    def append(self, text: str):
+        """Add generated text; published once the flush interval has passed"""
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+        self._buffer.append(text)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Publish buffered text immediately"""
+        self._last_flush = time.monotonic()
+        if not self._buffer or self.redis_client is None:
+            return
+        text = ''.join(self._buffer)
+        event = json.dumps({'type': EVENT_TEXT, 'offset': self._published, 'text': text})
+
+        def build(pipe):
+            pipe.append(snapshot_key(self.job_id), text)
+            pipe.expire(snapshot_key(self.job_id), self.ttl)
+            pipe.publish(progress_channel(self.job_id), event)
+
+        if self._execute(build):
+            self._published += len(text)
+            self._buffer = []
+
+    def publish(self, event_type: str, **data):
+        """
+        Publish a structured event (e.g. a pipeline segment becoming ready)
+
+        Unlike text these are not kept in the snapshot, so only subscribers
+        connected at the time receive them.
+        """
+        if self.redis_client is None:
+            return
+        event = json.dumps({'type': event_type, **data}, default=str)
+        self._execute(lambda pipe: pipe.publish(progress_channel(self.job_id), event))
+
+    def finish(self, **data):
+        """Flush remaining text and tell subscribers the job completed"""
+        self.flush()
+        self._close({'type': EVENT_DONE, **data})
+
+    def fail(self, error: str):
+        """Tell subscribers the job failed"""
+        self._close({'type': EVENT_ERROR, 'error': error})
+
+    def _close(self, payload: Dict[str, Any]):
+        if self.redis_client is None:
+            return
+        event = json.dumps(payload, default=str)
+
+        def build(pipe):
+            # Kept so clients connecting after the job ended still get the outcome
+            pipe.setex(status_key(self.job_id), self.ttl, event)
+            pipe.publish(progress_channel(self.job_id), event)
+
+        self._execute(build)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def iter_progress_events(job_id: int, follow: bool = True, heartbeat: float = 15.0,
+                         max_seconds: Optional[float] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Follow a job's progress channel
+
+    Yields the text produced so far as one event, then live events until the
+    job finishes or fails. ``None`` is yielded every ``heartbeat`` seconds of
+    silence so callers can keep their connection alive.
+
+    Args:
+        follow: False to only replay the stored text and outcome (for jobs
+            that already ended)
+
+    Raises:
+        RuntimeError: If Redis is not available
+    """
+    redis_client = extensions.redis_client
+    if redis_client is None:
+        raise RuntimeError('Progress channel unavailable')
+    if max_seconds is None:
+        max_seconds = current_app.config.get('JOB_PROGRESS_STREAM_MAX_SECONDS', 25)
+
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    try:
+        # Subscribe before reading the snapshot so nothing published in between is lost
+        pubsub.subscribe(progress_channel(job_id))
+        snapshot, final = redis_client.mget(snapshot_key(job_id), status_key(job_id))
+        received = 0
+        if snapshot:
+            snapshot = _decode(snapshot)
+            received = len(snapshot)
+            yield {'type': EVENT_TEXT, 'offset': 0, 'text': snapshot}
+        if final:
+            yield json.loads(_decode(final))
+            return
+        if not follow:
+            return
+
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=heartbeat)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(_decode(message['data']))
+            if event['type'] == EVENT_TEXT:
+                # Drop what the snapshot already contained
+                overlap = received - event['offset']
+                if overlap >= len(event['text']):
+                    continue
+                if overlap > 0:
+                    event = {**event, 'offset': received, 'text': event['text'][overlap:]}
+                received = event['offset'] + len(event['text'])
+            yield event
+            if event['type'] in (EVENT_DONE, EVENT_ERROR):
+                return
+    finally:
+        pubsub.close()
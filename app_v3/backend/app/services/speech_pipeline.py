@@ -0,0 +1,312 @@
+"""
+Pipelined script-to-speech.
+
+While the LLM is still writing a script, every completed paragraph is handed
+to a small pool of TTS workers (and, when a portrait is given, its audio is
+then rendered as a talking-head video segment), so synthesis of the opening
+paragraphs overlaps generation of the later ones. Segments finish in any
+order; they are joined in script order at the end.
+
+``ParagraphChunker`` turns the token stream into speakable segments,
+``SegmentPipeline`` runs the synthesis/render stages with bounded
+concurrency, and ``concat_wav``/``concat_videos`` join the results.
+"""
+import io
+import os
+import re
+import queue
+import wave
+import shutil
+import logging
+import time
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+class ParagraphChunker:
+    """
+    Split streamed text into paragraphs ready for synthesis
+
+    A paragraph is complete once a blank line follows it. Short paragraphs
+    (headings, one-line transitions) are held back and merged with the next
+    one so each TTS call carries enough text to be worth its overhead; long
+    ones are split at sentence boundaries.
+    """
+
+    def __init__(self, min_chars: int = 200, max_chars: int = 1200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ''
+        self._pending = ''
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the segments completed by it"""
+        self._buffer += text
+        segments = []
+        while True:
+            match = _PARAGRAPH_BREAK.search(self._buffer)
+            if not match:
+                break
+            paragraph = self._buffer[:match.start()].strip()
+            self._buffer = self._buffer[match.end():]
+            if paragraph:
+                self._pending = f"{self._pending}\n\n{paragraph}" if self._pending else paragraph
+            if len(self._pending) >= self.min_chars:
+                segments.extend(self._split(self._pending))
+                self._pending = ''
+        return segments
+
+    def flush(self) -> List[str]:
+        """Segments for whatever is left once the stream has ended"""
+        rest = '\n\n'.join(part for part in (self._pending, self._buffer.strip()) if part)
+        self._buffer = self._pending = ''
+        return self._split(rest) if rest else []
+
+    def _split(self, text: str) -> List[str]:
+        if len(text) <= self.max_chars:
+            return [text]
+        segments, current = [], ''
+        for sentence in _SENTENCE_END.split(text):
+            if current and len(current) + len(sentence) + 1 > self.max_chars:
+                segments.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            segments.append(current)
+        return segments
+
+
+@dataclass
+class Segment:
+    """One paragraph moving through the pipeline"""
+    index: int
+    text: str
+    audio: Optional[bytes] = None
+    video_path: Optional[str] = None
+    tts_seconds: float = 0.0
+    render_seconds: float = 0.0
+    error: Optional[BaseException] = None
+
+
+class SegmentError(RuntimeError):
+    """Synthesizing or rendering one segment failed"""
+
+    def __init__(self, stage: str, index: int, error: BaseException):
+        super().__init__(f"{stage} failed for segment {index + 1}: {error}")
+        self.stage = stage
+        self.index = index
+        self.error = error
+
+
+class SegmentPipeline:
+    """
+    Synthesize (and optionally render) segments as they are submitted
+
+    Args:
+        synthesize: ``text -> audio bytes``; called from the TTS pool
+        render: Optional ``(index, audio bytes) -> video path``; called from
+            the render pool once a segment's audio is ready
+        tts_concurrency: TTS calls in flight
+        render_concurrency: Render calls in flight
+
+    Finished segments are reported through ``completed()``/``wait()`` on the
+    caller's thread, so progress can be published without sharing
+    non-thread-safe objects with the pools. Both raise the first segment
+    error as a SegmentError, so a failed synthesis also stops the script
+    generation feeding the pipeline.
+    """
+
+    def __init__(self, synthesize: Callable[[str], bytes],
+                 render: Optional[Callable[[int, bytes], str]] = None,
+                 tts_concurrency: int = 2, render_concurrency: int = 1):
+        self.synthesize = synthesize
+        self.render = render
+        self.segments: List[Segment] = []
+        self._finished = queue.Queue()
+        self._reported = 0
+        self._cancelled = threading.Event()
+        self._tts_pool = ThreadPoolExecutor(max_workers=max(1, tts_concurrency), thread_name_prefix='pipeline-tts')
+        self._render_pool = ThreadPoolExecutor(
+            max_workers=max(1, render_concurrency), thread_name_prefix='pipeline-render'
+        ) if render else None
+
+    def submit(self, text: str) -> Segment:
+        segment = Segment(index=len(self.segments), text=text)
+        self.segments.append(segment)
+        self._tts_pool.submit(self._run_tts, segment)
+        return segment
+
+    def _run_tts(self, segment: Segment):
+        if self._cancelled.is_set():
+            return self._finish(segment, RuntimeError('Pipeline cancelled'))
+        try:
+            start = time.perf_counter()
+            segment.audio = self.synthesize(segment.text)
+            segment.tts_seconds = time.perf_counter() - start
+        except BaseException as e:
+            return self._finish(segment, SegmentError('TTS', segment.index, e))
+        if self._render_pool:
+            try:
+                self._render_pool.submit(self._run_render, segment)
+            except RuntimeError as e:
+                # Pool already shut down by cancel()
+                self._finish(segment, e)
+        else:
+            self._finish(segment)
+
+    def _run_render(self, segment: Segment):
+        if self._cancelled.is_set():
+            return self._finish(segment, RuntimeError('Pipeline cancelled'))
+        try:
+            start = time.perf_counter()
+            segment.video_path = self.render(segment.index, segment.audio)
+            segment.render_seconds = time.perf_counter() - start
+        except BaseException as e:
+            return self._finish(segment, SegmentError('Video render', segment.index, e))
+        self._finish(segment)
+
+    def _finish(self, segment: Segment, error: Optional[BaseException] = None):
+        segment.error = error
+        self._finished.put(segment)
+
+    def _take(self, segment: Segment) -> Segment:
+        self._reported += 1
+        if segment.error:
+            self.cancel()
+            raise segment.error
+        return segment
+
+    def completed(self) -> Iterator[Segment]:
+        """Segments finished since the last call, without blocking"""
+        while True:
+            try:
+                segment = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            yield self._take(segment)
+
+    def wait(self) -> Iterator[Segment]:
+        """
+        Block until every submitted segment has finished, yielding each in
+        completion order (segments already taken by ``completed()`` are not
+        repeated)
+        """
+        while self._reported < len(self.segments):
+            yield self._take(self._finished.get())
+
+    def cancel(self):
+        """Skip segments that have not started; in-flight calls run to completion"""
+        self._cancelled.set()
+        self.shutdown()
+
+    def shutdown(self):
+        self._tts_pool.shutdown(wait=False)
+        if self._render_pool:
+            self._render_pool.shutdown(wait=False)
+
+
+def silence_frames(params, seconds: float) -> bytes:
+    """PCM silence matching a WAV stream's parameters"""
+    frames = int(params.framerate * max(0.0, seconds))
+    return b'\x00' * frames * params.sampwidth * params.nchannels
+
+
+def concat_wav(segments: List[bytes], pause_seconds: float = 0.0) -> bytes:
+    """
+    Join WAV segments in order with an optional pause between them
+
+    Segments with matching formats are joined directly; otherwise ffmpeg
+    resamples them to the first segment's format.
+    """
+    if not segments:
+        raise ValueError('No audio segments to join')
+    readers = [wave.open(io.BytesIO(data), 'rb') for data in segments]
+    try:
+        params = readers[0].getparams()
+        shape = (params.nchannels, params.sampwidth, params.framerate)
+        if any((r.getnchannels(), r.getsampwidth(), r.getframerate()) != shape for r in readers[1:]):
+            return _ffmpeg_concat_audio(segments, params, pause_seconds)
+
+        output = io.BytesIO()
+        with wave.open(output, 'wb') as writer:
+            writer.setnchannels(params.nchannels)
+            writer.setsampwidth(params.sampwidth)
+            writer.setframerate(params.framerate)
+            pause = silence_frames(params, pause_seconds)
+            for position, reader in enumerate(readers):
+                if position and pause:
+                    writer.writeframes(pause)
+                writer.writeframes(reader.readframes(reader.getnframes()))
+        return output.getvalue()
+    finally:
+        for reader in readers:
+            reader.close()
+
+
+def _ffmpeg_concat_audio(segments: List[bytes], params, pause_seconds: float) -> bytes:
+    if not shutil.which('ffmpeg'):
+        raise RuntimeError('Audio segments differ in format and ffmpeg is not available to join them')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        inputs, labels = [], []
+        for position, data in enumerate(segments):
+            path = os.path.join(tmp_dir, f'segment_{position}.wav')
+            with open(path, 'wb') as fh:
+                fh.write(data)
+            inputs += ['-i', path]
+            labels.append(f'[{position}:a]aresample={params.framerate},apad=pad_dur={pause_seconds}[a{position}]')
+        # The last segment gets no trailing pause
+        labels[-1] = f'[{len(segments) - 1}:a]aresample={params.framerate}[a{len(segments) - 1}]'
+        joined = ''.join(f'[a{position}]' for position in range(len(segments)))
+        graph = ';'.join(labels) + f';{joined}concat=n={len(segments)}:v=0:a=1[out]'
+        output_path = os.path.join(tmp_dir, 'joined.wav')
+        process = subprocess.run(
+            ['ffmpeg', '-v', 'error', *inputs, '-filter_complex', graph, '-map', '[out]',
+             '-ac', str(params.nchannels), '-acodec', 'pcm_s16le', '-y', output_path],
+            capture_output=True, timeout=600
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"Failed to join audio segments: {process.stderr.decode(errors='ignore')[:500]}")
+        with open(output_path, 'rb') as fh:
+            return fh.read()
+
+
+def concat_videos(paths: List[str], output_path: str):
+    """
+    Join rendered video segments in order
+
+    Segments from the same renderer share codecs, so they are joined without
+    re-encoding; if that fails they are re-encoded once.
+
+    Raises:
+        RuntimeError: If ffmpeg is unavailable or cannot join the segments
+    """
+    if not shutil.which('ffmpeg'):
+        raise RuntimeError('ffmpeg is required to join video segments')
+    list_path = f'{output_path}.txt'
+    with open(list_path, 'w') as fh:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", r"'\''")
+            fh.write(f"file '{escaped}'\n")
+    try:
+        base = ['ffmpeg', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+        process = subprocess.run(base + ['-c', 'copy', '-y', output_path], capture_output=True, timeout=1800)
+        if process.returncode != 0:
+            logger.warning("Stream copy of video segments failed; re-encoding")
+            process = subprocess.run(
+                base + ['-c:v', 'libx264', '-preset', 'veryfast', '-c:a', 'aac', '-y', output_path],
+                capture_output=True, timeout=3600
+            )
+        if process.returncode != 0:
+            raise RuntimeError(f"Failed to join video segments: {process.stderr.decode(errors='ignore')[:500]}")
+    finally:
+        os.unlink(list_path)
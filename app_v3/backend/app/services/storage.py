@@ -2,39 +2,102 @@
 MinIO/S3 storage service for file operations
 """
 import os
+import hashlib
 import logging
-from datetime import timedelta
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urljoin
 import minio
+from minio.datatypes import Part
 from minio.error import S3Error
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 
 
+class HashingReader:
+    """
+    File-like wrapper that hashes and counts bytes as they are read
+    
+    Lets put_object compute the content hash while it streams the data, so no
+    second pass over the file is needed.
+    """
+    
+    def __init__(self, stream, algorithm='sha256'):
+        self._stream = stream
+        self._hash = hashlib.new(algorithm)
+        self.bytes_read = 0
+    
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        self._hash.update(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+    
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
 class StorageService:
     """MinIO/S3 storage service for file operations"""
     
     def __init__(self, app=None):
-        self.client = None
+        self._client = None
+        self._settings = None
+        self._client_lock = threading.Lock()
+        # (bucket, object, method) -> (url, lifetime, expires_at), least recently used first
+        self._url_cache = OrderedDict()
+        self._url_cache_lock = threading.Lock()
+        self.url_cache_size = 10000
+        self.url_refresh_margin = timedelta(minutes=5)
         if app:
             self.init_app(app)
     
     def init_app(self, app):
-        """Initialize MinIO client with Flask app"""
+        """Record MinIO settings; the connection is made on first use"""
+        self.url_cache_size = app.config.get('PRESIGNED_URL_CACHE_SIZE', 10000)
+        self.url_refresh_margin = timedelta(seconds=app.config.get('PRESIGNED_URL_REFRESH_MARGIN', 300))
+        self._settings = {
+            'endpoint': app.config.get('MINIO_ENDPOINT'),
+            'access_key': app.config.get('MINIO_ACCESS_KEY'),
+            'secret_key': app.config.get('MINIO_SECRET_KEY'),
+            'secure': app.config.get('MINIO_SECURE', False),
+            'bucket_name': app.config.get('MINIO_BUCKET_NAME')
+        }
+        self._client = None
+    
+    @property
+    def client(self):
+        """MinIO client, created (and the bucket ensured) on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        self._client = value
+    
+    def _connect(self):
+        """Create the MinIO client and make sure the configured bucket exists"""
+        if not self._settings:
+            raise RuntimeError("StorageService used before init_app()")
+        
         try:
-            self.client = minio.Minio(
-                endpoint=app.config.get('MINIO_ENDPOINT'),
-                access_key=app.config.get('MINIO_ACCESS_KEY'),
-                secret_key=app.config.get('MINIO_SECRET_KEY'),
-                secure=app.config.get('MINIO_SECURE', False)
+            client = minio.Minio(
+                endpoint=self._settings['endpoint'],
+                access_key=self._settings['access_key'],
+                secret_key=self._settings['secret_key'],
+                secure=self._settings['secure']
             )
             
             # Ensure bucket exists
-            bucket_name = app.config.get('MINIO_BUCKET_NAME')
-            if not self.client.bucket_exists(bucket_name):
+            bucket_name = self._settings['bucket_name']
+            if not client.bucket_exists(bucket_name):
                 logger.info(f"Creating bucket: {bucket_name}")
-                self.client.make_bucket(bucket_name)
+                client.make_bucket(bucket_name)
                 
                 # Set bucket policy for public read access to certain prefixes
                 policy = {
@@ -53,6 +116,7 @@ class StorageService:
                 # For development, we'll handle this through signed URLs
                 
             logger.info("MinIO client initialized successfully")
+            return client
             
         except Exception as e:
             logger.error(f"Failed to initialize MinIO client: {str(e)}")
@@ -119,6 +183,66 @@ class StorageService:
                 'error': str(e)
             }
     
+    def upload_stream(self, stream, object_name, bucket_name=None, content_type=None, part_size=None):
+        """
+        Stream a file-like object to MinIO in parts, hashing it on the way
+        
+        The stream is read sequentially in ``part_size`` chunks (at least 5MB,
+        the S3 minimum), so memory use is bounded by one part whatever the
+        file size, and its length does not need to be known up front.
+        
+        Args:
+            stream: Readable file-like object positioned at the start
+            object_name: Object name in bucket (path)
+            bucket_name: Bucket name (defaults to configured bucket)
+            content_type: MIME type of the file
+            part_size: Bytes per part (defaults to UPLOAD_PART_SIZE)
+            
+        Returns:
+            dict: Upload result with metadata, including file_size and sha256
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        part_size = max(part_size or current_app.config.get('UPLOAD_PART_SIZE', 8 * 1024 * 1024),
+                        5 * 1024 * 1024)
+        
+        reader = HashingReader(stream)
+        try:
+            result = self.client.put_object(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                data=reader,
+                length=-1,
+                content_type=content_type or 'application/octet-stream',
+                part_size=part_size
+            )
+            
+            logger.info(f"File streamed successfully: {object_name} ({reader.bytes_read} bytes)")
+            
+            return {
+                'success': True,
+                'bucket_name': bucket_name,
+                'object_name': object_name,
+                'file_size': reader.bytes_read,
+                'sha256': reader.hexdigest(),
+                'etag': result.etag,
+                'version_id': result.version_id
+            }
+            
+        except S3Error as e:
+            logger.error(f"MinIO upload error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'error_code': e.code
+            }
+        except Exception as e:
+            logger.error(f"Upload error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def download_file(self, object_name, bucket_name=None):
         """
         Download file from MinIO bucket
@@ -147,6 +271,34 @@ class StorageService:
             logger.error(f"Download error: {str(e)}")
             return None
     
+    def read_if_exists(self, object_name, bucket_name=None):
+        """
+        Download a small object that may legitimately be missing (e.g. a cache entry)
+        
+        Unlike download_file, a missing object is not logged as an error.
+        
+        Returns:
+            bytes: File data, or None if the object does not exist or cannot be read
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        try:
+            response = self.client.get_object(bucket_name, object_name)
+            try:
+                return response.data
+            finally:
+                response.close()
+                response.release_conn()
+        
+        except S3Error as e:
+            if e.code not in ('NoSuchKey', 'NoSuchObject'):
+                logger.error(f"MinIO download error: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Download error: {str(e)}")
+            return None
+    
     def delete_file(self, object_name, bucket_name=None):
         """
         Delete file from MinIO bucket
@@ -163,6 +315,7 @@ class StorageService:
         
         try:
             self.client.remove_object(bucket_name, object_name)
+            self.evict_presigned_urls(object_name, bucket_name)
             logger.info(f"File deleted successfully: {object_name}")
             return True
             
@@ -177,6 +330,9 @@ class StorageService:
         """
         Generate presigned URL for file access
         
+        URLs are cached and reused until they are within the refresh margin of
+        expiring, so repeated requests for the same object do not re-sign.
+        
         Args:
             object_name: Object name in bucket
             bucket_name: Bucket name (defaults to configured bucket)
@@ -189,21 +345,226 @@ class StorageService:
         if not bucket_name:
             bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
         
+        urls = self.get_presigned_urls([(object_name, bucket_name)], expires=expires, method=method)
+        return urls.get((bucket_name, object_name))
+    
+    def get_presigned_urls(self, objects, expires=timedelta(hours=1), method='GET'):
+        """
+        Generate presigned URLs for many objects at once
+        
+        Cached URLs are served under a single lock acquisition and the rest are
+        signed in one pass with a shared request date, so a page of assets
+        expires together and is re-signed together.
+        
+        Args:
+            objects: Iterable of (object_name, bucket_name) pairs; bucket_name
+                may be None for the configured bucket
+            expires: URL expiration time
+            method: HTTP method ('GET' for download, 'PUT' for upload)
+            
+        Returns:
+            dict: {(bucket_name, object_name): url}; url is None if signing failed
+        """
+        default_bucket = None
+        method = method.upper()
+        now = datetime.now(timezone.utc)
+        # Never hand out a URL with less than the margin (or half its lifetime) left
+        margin = min(self.url_refresh_margin, expires / 2)
+        
+        urls = {}
+        missing = []
+        with self._url_cache_lock:
+            for object_name, bucket_name in objects:
+                if not bucket_name:
+                    default_bucket = default_bucket or current_app.config.get('MINIO_BUCKET_NAME')
+                    bucket_name = default_bucket
+                key = (bucket_name, object_name, method)
+                entry = self._url_cache.get(key)
+                if entry and entry[1] == expires and entry[2] - margin > now:
+                    self._url_cache.move_to_end(key)
+                    urls[(bucket_name, object_name)] = entry[0]
+                else:
+                    missing.append(key)
+        
+        signed = {}
+        for bucket_name, object_name, _ in missing:
+            try:
+                url = self.client.get_presigned_url(
+                    method, bucket_name, object_name, expires=expires, request_date=now
+                )
+                signed[(bucket_name, object_name, method)] = url
+                urls[(bucket_name, object_name)] = url
+            except S3Error as e:
+                logger.error(f"MinIO presigned URL error: {str(e)}")
+                urls[(bucket_name, object_name)] = None
+            except Exception as e:
+                logger.error(f"Presigned URL error: {str(e)}")
+                urls[(bucket_name, object_name)] = None
+        
+        if signed:
+            with self._url_cache_lock:
+                for key, url in signed.items():
+                    self._url_cache[key] = (url, expires, now + expires)
+                    self._url_cache.move_to_end(key)
+                while len(self._url_cache) > self.url_cache_size:
+                    self._url_cache.popitem(last=False)
+        
+        return urls
+    
+    def evict_presigned_urls(self, object_name, bucket_name=None):
+        """Drop cached presigned URLs for an object (e.g. after it is deleted)"""
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        with self._url_cache_lock:
+            for method in ('GET', 'PUT'):
+                self._url_cache.pop((bucket_name, object_name, method), None)
+    
+    def create_multipart_upload(self, object_name, bucket_name=None, content_type=None):
+        """
+        Start a multipart upload whose parts the client PUTs directly
+        
+        Args:
+            object_name: Object name in bucket
+            bucket_name: Bucket name (defaults to configured bucket)
+            content_type: MIME type of the assembled object
+            
+        Returns:
+            str: Upload ID or None if error
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        # The parts come straight from the browser, so put_object's streaming
+        # multipart cannot be used; the private Minio calls here and below are
+        # why minio is pinned exactly in requirements.txt
         try:
-            if method.upper() == 'PUT':
-                url = self.client.presigned_put_object(bucket_name, object_name, expires=expires)
-            else:
-                url = self.client.presigned_get_object(bucket_name, object_name, expires=expires)
-                
-            return url
+            headers = {'Content-Type': content_type} if content_type else {}
+            return self.client._create_multipart_upload(bucket_name, object_name, headers)
+            
+        except S3Error as e:
+            logger.error(f"MinIO multipart create error: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Multipart create error: {str(e)}")
+            return None
+    
+    def get_presigned_part_urls(self, object_name, upload_id, part_count, bucket_name=None,
+                                expires=timedelta(hours=1)):
+        """
+        Generate presigned PUT URLs for parts 1..part_count of a multipart upload
+        
+        Part URLs are single-use, so they bypass the presigned URL cache.
+        
+        Returns:
+            list: URLs in part order, or None if signing failed
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        now = datetime.now(timezone.utc)
+        try:
+            return [
+                self.client.get_presigned_url(
+                    'PUT', bucket_name, object_name, expires=expires, request_date=now,
+                    extra_query_params={'uploadId': upload_id, 'partNumber': str(part_number)}
+                )
+                for part_number in range(1, part_count + 1)
+            ]
             
         except S3Error as e:
-            logger.error(f"MinIO presigned URL error: {str(e)}")
+            logger.error(f"MinIO presigned part URL error: {str(e)}")
             return None
         except Exception as e:
-            logger.error(f"Presigned URL error: {str(e)}")
+            logger.error(f"Presigned part URL error: {str(e)}")
             return None
     
+    def complete_multipart_upload(self, object_name, upload_id, parts, bucket_name=None):
+        """
+        Assemble an uploaded object from its parts
+        
+        Args:
+            object_name: Object name in bucket
+            upload_id: Multipart upload ID
+            parts: Iterable of (part_number, etag) as reported by the client;
+                storage rejects ETags that do not match the stored parts
+            bucket_name: Bucket name (defaults to configured bucket)
+            
+        Returns:
+            dict: Completion result with the object's ETag
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        try:
+            result = self.client._complete_multipart_upload(
+                bucket_name, object_name, upload_id,
+                [Part(int(number), etag.strip('"')) for number, etag in sorted(parts)]
+            )
+            logger.info(f"Multipart upload completed: {object_name}")
+            return {
+                'success': True,
+                'bucket_name': bucket_name,
+                'object_name': object_name,
+                'etag': result.etag,
+                'version_id': result.version_id
+            }
+            
+        except S3Error as e:
+            logger.error(f"MinIO multipart complete error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'error_code': e.code
+            }
+        except Exception as e:
+            logger.error(f"Multipart complete error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def abort_multipart_upload(self, object_name, upload_id, bucket_name=None):
+        """
+        Abort a multipart upload and discard its parts
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        try:
+            self.client._abort_multipart_upload(bucket_name, object_name, upload_id)
+            return True
+            
+        except S3Error as e:
+            logger.error(f"MinIO multipart abort error: {str(e)}")
+            return False
+        except Exception as e:
+            logger.error(f"Multipart abort error: {str(e)}")
+            return False
+    
+    def iter_file(self, object_name, bucket_name=None, chunk_size=1024 * 1024):
+        """
+        Stream an object in chunks without holding it in memory
+        
+        Unlike download_file, errors are raised to the caller.
+        
+        Yields:
+            bytes: Successive chunks of the object
+        """
+        if not bucket_name:
+            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+        
+        response = self.client.get_object(bucket_name, object_name)
+        try:
+            for chunk in response.stream(chunk_size):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+    
     def list_objects(self, prefix=None, bucket_name=None):
         """
         List objects in bucket
@@ -1,7 +1,26 @@
 """
 Text-to-Speech services package.
+
+Client classes are resolved on first access (PEP 562) so importing this
+package, e.g. from the API process, does not load gradio_client or
+huggingface_hub. Only the Celery workers that synthesize speech pay for them.
 """
+from ..lazy import lazy_attributes
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'IndexTTSClient': '.indextts_client',
+    'IndexTTSAPIError': '.indextts_client',
+    'create_indextts_client': '.indextts_client',
+}
+
+__all__ = ['IndexTTSClient', 'IndexTTSAPIError', 'create_indextts_client', 'create_tts_client']
+
+
+def create_tts_client():
+    """Create the configured TTS client, importing its client stack on first use"""
+    from .indextts_client import IndexTTSClient
+    return IndexTTSClient()
 
-from .indextts_client import IndexTTSClient
 
-__all__ = ['IndexTTSClient']
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES, __all__)
@@ -1,7 +1,26 @@
 """
 Video generation services package.
+
+Client classes are resolved on first access (PEP 562) so importing this
+package, e.g. from the API process, does not load gradio_client or
+huggingface_hub. Only the Celery workers that render video pay for them.
 """
+from ..lazy import lazy_attributes
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'KDTalkerClient': '.kdtalker_client',
+    'VideoGenerationConfig': '.kdtalker_client',
+    'generate_talking_head': '.kdtalker_client',
+}
+
+__all__ = ['KDTalkerClient', 'VideoGenerationConfig', 'generate_talking_head', 'create_video_client']
+
+
+def create_video_client():
+    """Create the configured talking-head client, importing its client stack on first use"""
+    from .kdtalker_client import KDTalkerClient
+    return KDTalkerClient()
 
-from .kdtalker_client import KDTalkerClient, VideoGenerationConfig
 
-__all__ = ['KDTalkerClient', 'VideoGenerationConfig']
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES, __all__)
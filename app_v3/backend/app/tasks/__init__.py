@@ -6,7 +6,13 @@ from .voice_tasks import clone_voice_task, validate_voice_sample, echo_task
 from .tts_tasks import text_to_speech_task, convert_audio_format, generate_speech, validate_tts_service
 from .video_tasks import generate_video_thumbnail, full_generation_pipeline, generate_video, validate_video_service
 from .llm_tasks import generate_script, validate_llm_service
-from .export_tasks import export_video_format, create_scorm_package, create_html5_package
+from .export_tasks import (
+    export_video_format, package_video_stream, create_scorm_package, create_html5_package,
+    export_course, export_course_lecture, assemble_course_export, expire_course_exports
+)
+from .analytics_tasks import reconcile_analytics_rollups
+from .asset_tasks import process_uploaded_asset, collect_blob_garbage
+from .pipeline_tasks import scripted_speech_pipeline
 
 __all__ = [
     'celery',
@@ -24,6 +30,15 @@ __all__ = [
     'generate_script',
     'validate_llm_service',
     'export_video_format',
+    'package_video_stream',
     'create_scorm_package',
-    'create_html5_package'
+    'create_html5_package',
+    'export_course',
+    'export_course_lecture',
+    'assemble_course_export',
+    'expire_course_exports',
+    'reconcile_analytics_rollups',
+    'process_uploaded_asset',
+    'collect_blob_garbage',
+    'scripted_speech_pipeline'
 ]
@@ -0,0 +1,37 @@
+"""
+Analytics rollup maintenance Celery tasks
+"""
+import logging
+from ..extensions import celery
+from ..services.analytics import reconcile_rollups
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(bind=True, name='reconcile_analytics_rollups')
+def reconcile_analytics_rollups(self, days=None):
+    """
+    Rebuild recent analytics rollups from the jobs table
+    
+    Args:
+        days: Number of recent days to rebuild (defaults to ANALYTICS_ROLLUP_RECONCILE_DAYS,
+              0 rebuilds the full history)
+    
+    Returns:
+        dict: Reconciliation summary
+    """
+    try:
+        if days is None:
+            days = celery.flask_app.config.get('ANALYTICS_ROLLUP_RECONCILE_DAYS', 2)
+        
+        result = reconcile_rollups(days=days or None)
+        result['status'] = 'completed'
+        return result
+        
+    except Exception as exc:
+        logger.error(f"Analytics rollup reconciliation failed: {exc}")
+        self.update_state(
+            state='FAILURE',
+            meta={'error': str(exc)}
+        )
+        raise exc
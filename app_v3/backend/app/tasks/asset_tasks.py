@@ -0,0 +1,217 @@
+"""
+Post-upload asset processing Celery tasks
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import subprocess
+
+from ..extensions import celery, db
+from ..models.asset import Asset, AssetType, AssetStatus
+from ..services.storage import storage_service
+from ..services.blobs import claim_object, adopt_blob, collect_garbage
+
+logger = logging.getLogger(__name__)
+
+
+def probe_media(path):
+    """
+    Read format and stream information with ffprobe
+    
+    Returns:
+        dict: Duration, container and first stream details, or None if ffprobe
+        is unavailable or cannot read the file
+    """
+    if not shutil.which('ffprobe'):
+        logger.warning("ffprobe not found; skipping media probe")
+        return None
+    
+    process = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, timeout=60
+    )
+    if process.returncode != 0:
+        logger.warning(f"ffprobe failed: {process.stderr.decode(errors='ignore')[:500]}")
+        return None
+    
+    info = json.loads(process.stdout or b'{}')
+    fmt = info.get('format', {})
+    stream = (info.get('streams') or [{}])[0]
+    probe = {
+        'format': fmt.get('format_name'),
+        'duration': float(fmt['duration']) if fmt.get('duration') else None,
+        'bit_rate': int(fmt['bit_rate']) if fmt.get('bit_rate') else None,
+        'codec': stream.get('codec_name'),
+        'sample_rate': int(stream['sample_rate']) if stream.get('sample_rate') else None,
+        'channels': stream.get('channels'),
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+    }
+    return {key: value for key, value in probe.items() if value is not None}
+
+
+def normalize_voice_sample(source_path, output_path, sample_rate):
+    """
+    Convert a voice sample to loudness-normalized mono 16-bit WAV
+    
+    Browser recordings arrive as webm/ogg; the TTS client expects WAV.
+    
+    Returns:
+        bool: True if the normalized file was written
+    """
+    if not shutil.which('ffmpeg'):
+        logger.warning("ffmpeg not found; skipping voice sample normalization")
+        return False
+    
+    process = subprocess.run(
+        [
+            'ffmpeg', '-v', 'error', '-i', source_path,
+            '-af', 'loudnorm=I=-20:TP=-2',
+            '-ac', '1', '-ar', str(sample_rate), '-acodec', 'pcm_s16le',
+            '-y', output_path
+        ],
+        capture_output=True, timeout=300
+    )
+    if process.returncode != 0:
+        logger.warning(f"Voice sample normalization failed: {process.stderr.decode(errors='ignore')[:500]}")
+        return False
+    return True
+
+
+@celery.task(bind=True, name='process_uploaded_asset')
+def process_uploaded_asset(self, asset_id: int):
+    """
+    Verify and prepare an asset uploaded directly to storage
+    
+    Streams the object once to compute its SHA-256 (checked against the
+    checksum the client declared), probes it with ffprobe and, for voice
+    samples, stores a normalized WAV next to the original. Content that is
+    already stored is deduplicated: the asset is pointed at the existing blob,
+    reuses its probe/normalized results and the uploaded copy is deleted. The
+    asset is then marked READY, or ERROR if verification fails.
+    
+    Args:
+        asset_id: ID of an asset in PROCESSING state
+    
+    Returns:
+        dict: Processing results
+    """
+    app = celery.flask_app
+    
+    with app.app_context():
+        asset = Asset.query.get(asset_id)
+        if not asset or asset.status != AssetStatus.PROCESSING:
+            logger.info(f"Skipping post-upload processing for asset {asset_id}: not awaiting processing")
+            return {'asset_id': asset_id, 'status': 'skipped'}
+        
+        metadata = dict(asset.asset_metadata or {})
+        
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                local_path = os.path.join(tmp_dir, f"source{asset.file_extension or ''}")
+                digest = hashlib.sha256()
+                size = 0
+                with open(local_path, 'wb') as fh:
+                    for chunk in storage_service.iter_file(asset.storage_path, asset.storage_bucket):
+                        digest.update(chunk)
+                        fh.write(chunk)
+                        size += len(chunk)
+                
+                sha256 = digest.hexdigest()
+                expected = metadata.get('expected_sha256')
+                if expected and expected != sha256:
+                    asset.status = AssetStatus.ERROR
+                    asset.processing_info = {'error': 'Checksum mismatch', 'expected_sha256': expected, 'sha256': sha256}
+                    db.session.commit()
+                    storage_service.delete_file(asset.storage_path, bucket_name=asset.storage_bucket)
+                    logger.warning(f"Asset {asset_id} failed checksum verification")
+                    return {'asset_id': asset_id, 'status': 'error', 'error': 'Checksum mismatch'}
+                
+                metadata['sha256'] = sha256
+                
+                # Identical content already stored: share it instead of keeping a copy
+                blob, created = claim_object(
+                    sha256, asset.storage_bucket, asset.storage_path, size, asset.mime_type
+                )
+                redundant = None
+                if not created:
+                    redundant = adopt_blob(asset, blob)
+                    metadata.update(blob.derived or {})
+                else:
+                    derived = {}
+                    if asset.asset_type in (AssetType.VOICE_SAMPLE, AssetType.PORTRAIT):
+                        probe = probe_media(local_path)
+                        if probe:
+                            derived['probe'] = probe
+                    
+                    if asset.asset_type == AssetType.VOICE_SAMPLE:
+                        normalized_path = os.path.join(tmp_dir, 'normalized.wav')
+                        sample_rate = app.config.get('VOICE_SAMPLE_SAMPLE_RATE', 24000)
+                        if normalize_voice_sample(local_path, normalized_path, sample_rate):
+                            object_name = f"{os.path.splitext(asset.storage_path)[0]}.normalized.wav"
+                            with open(normalized_path, 'rb') as fh:
+                                upload_result = storage_service.upload_file(
+                                    file_data=fh,
+                                    object_name=object_name,
+                                    bucket_name=asset.storage_bucket,
+                                    content_type='audio/wav'
+                                )
+                            if upload_result['success']:
+                                derived['normalized_path'] = object_name
+                    
+                    # Derived files belong to the blob and are shared by later duplicates
+                    blob.derived = derived or None
+                    metadata.update(derived)
+            
+            asset.file_size = size
+            asset.asset_metadata = metadata
+            asset.status = AssetStatus.READY
+            db.session.commit()
+            
+            if redundant:
+                storage_service.delete_file(redundant[0], bucket_name=redundant[1])
+            
+            logger.info(f"Asset {asset_id} processed and ready{' (deduplicated)' if redundant else ''}")
+            return {'asset_id': asset_id, 'status': 'ready', 'sha256': sha256, 'deduplicated': not created}
+        
+        except Exception as exc:
+            db.session.rollback()
+            logger.error(f"Post-upload processing failed for asset {asset_id}: {exc}")
+            asset = Asset.query.get(asset_id)
+            if asset:
+                asset.status = AssetStatus.ERROR
+                asset.processing_info = {'error': f"Processing failed: {exc}"}
+                db.session.commit()
+            raise
+
+
+@celery.task(bind=True, name='collect_blob_garbage')
+def collect_blob_garbage(self, grace_seconds=None):
+    """
+    Delete stored blobs no asset has referenced for the grace period
+    
+    Args:
+        grace_seconds: Minimum time unreferenced (defaults to BLOB_GC_GRACE_SECONDS)
+    
+    Returns:
+        dict: Garbage collection summary
+    """
+    app = celery.flask_app
+    
+    with app.app_context():
+        try:
+            result = collect_garbage(grace_seconds=grace_seconds)
+            result['status'] = 'completed'
+            return result
+            
+        except Exception as exc:
+            db.session.rollback()
+            logger.error(f"Blob garbage collection failed: {exc}")
+            self.update_state(
+                state='FAILURE',
+                meta={'error': str(exc)}
+            )
+            raise exc
@@ -1,55 +1,385 @@
 """
-Export and SCORM packaging Celery tasks
+Export, SCORM packaging and course export Celery tasks
 """
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+
 from celery import current_task
-from ..extensions import celery
+from ..extensions import celery, db
+from ..models import Job, JobStatus, JobType
+from ..models.asset import Asset, AssetType
+from ..services.storage import storage_service
+from ..services.progress import ProgressPublisher, EVENT_LECTURE
+from ..services.export import (
+    FORMATS, ENGINE_VERSION, parse_ladder, fit_to_source, transcode_to_storage,
+    source_key, course_key, rendition_object_name, manifest_object_name, package_object_name, package_manifest_name,
+    load_manifest, save_manifest, release_in_progress,
+    stream_prefix, inspect_source, package_to_storage, delete_package,
+    normalize_package_config, build_package_entries, stream_zip_to_storage, package_filename
+)
+from .asset_tasks import probe_media
+
+logger = logging.getLogger(__name__)
+
+
+def export_renditions(app, video, target_format, requested, report=None):
+    """
+    Export manifest of a video's renditions, transcoding them unless an
+    identical export already exists
+    
+    Args:
+        app: Flask app (an app context must be active)
+        video: Generated video Asset
+        requested: Renditions asked for (capped at the source height)
+        report: Optional callback(progress, status) for progress updates
+    
+    Returns:
+        tuple: (manifest, cached)
+    """
+    report = report or (lambda progress, status: None)
+    key = source_key(video)
+    manifest_name = manifest_object_name(key, 'video', target_format, requested)
+    manifest = load_manifest(manifest_name)
+    if manifest:
+        return manifest, True
+    
+    report(10, 'Probing source video')
+    
+    source_url = storage_service.get_presigned_url(
+        video.storage_path, video.storage_bucket,
+        expires=timedelta(seconds=app.config.get('EXPORT_TIMEOUT', 3600) + 600)
+    )
+    if not source_url:
+        raise ValueError(f"Failed to get a download URL for video {video.id}")
+    
+    probe = (video.asset_metadata or {}).get('probe') or probe_media(source_url) or {}
+    outputs = fit_to_source(requested, probe.get('height'))
+    object_names = [rendition_object_name(key, target_format, rendition) for rendition in outputs]
+    bucket_name = app.config.get('MINIO_BUCKET_NAME')
+    
+    report(20, f"Transcoding {', '.join(r.name for r in outputs)} ({target_format})")
+    
+    start = time.perf_counter()
+    uploads = transcode_to_storage(
+        app, source_url, outputs, target_format, object_names, bucket_name,
+        timeout=app.config.get('EXPORT_TIMEOUT', 3600)
+    )
+    transcode_seconds = time.perf_counter() - start
+    
+    report(90, 'Saving export manifest')
+    
+    manifest = save_manifest(manifest_name, {
+        'source': {
+            'asset_id': video.id,
+            'key': key,
+            'height': probe.get('height'),
+            'duration': probe.get('duration')
+        },
+        'format': target_format,
+        'content_type': FORMATS[target_format]['content_type'],
+        'requested': [r.name for r in requested],
+        'renditions': [
+            {
+                **rendition.to_dict(),
+                'object_name': object_name,
+                'bucket_name': bucket_name,
+                'file_size': upload['file_size'],
+                'sha256': upload['sha256']
+            }
+            for rendition, object_name, upload in zip(outputs, object_names, uploads)
+        ],
+        'transcode_seconds': round(transcode_seconds, 2)
+    }, bucket_name)
+    
+    logger.info(
+        f"Exported video {video.id} as {target_format} "
+        f"({', '.join(r.name for r in outputs)}) in {transcode_seconds:.1f}s"
+    )
+    return manifest, False
 
 
 @celery.task(bind=True)
-def export_video_format(self, video_id, target_format, user_id):
+def export_video_format(self, video_id, target_format, user_id, renditions=None):
     """
     Export video in different format
     
+    Transcodes a generated video into every rendition of the requested ladder
+    in a single decode pass. The source is read from storage by ffmpeg and
+    each output is uploaded while it is encoded. Outputs and a manifest are
+    stored under names derived from the source and settings, so a repeat
+    request is served from the manifest without transcoding.
+    
     Args:
         video_id: ID of the video to export
-        target_format: Target format (mp4, webm, etc.)
+        target_format: Target format (mp4, webm)
         user_id: ID of the user requesting export
+        renditions: Comma-separated ladder rungs (e.g. "720p,480p"); defaults
+            to EXPORT_DEFAULT_RENDITIONS
     
     Returns:
         dict: Export results
     """
-    try:
-        # Update task progress
-        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': f'Starting {target_format} export'})
-        
-        # TODO: Implement video format conversion
-        # 1. Load source video
-        # 2. Convert to target format using FFmpeg
-        # 3. Optimize settings for target use case
-        # 4. Store converted video
-        
-        self.update_state(state='PROGRESS', meta={'progress': 60, 'status': 'Converting video format'})
+    app = celery.flask_app
+    manifest_name = None
+    
+    with app.app_context():
+        try:
+            # Update task progress
+            self.update_state(state='PROGRESS', meta={'progress': 5, 'status': f'Starting {target_format} export'})
+            
+            if target_format not in FORMATS:
+                raise ValueError(f"Unsupported export format: {target_format}")
+            requested = parse_ladder(renditions, app.config.get('EXPORT_DEFAULT_RENDITIONS', '720p,480p,360p'))
+            
+            video = Asset.query.filter_by(id=video_id, user_id=user_id, asset_type=AssetType.GENERATED_VIDEO).first()
+            if not video:
+                raise ValueError(f"Video {video_id} not found")
+            
+            # Marker set by the export API while this task runs
+            manifest_name = manifest_object_name(source_key(video), 'video', target_format, requested)
+            manifest, cached = export_renditions(
+                app, video, target_format, requested,
+                report=lambda progress, status: self.update_state(
+                    state='PROGRESS', meta={'progress': progress, 'status': status}
+                )
+            )
+            # A cached manifest was produced by an identical request while this one was queued
+            return {**manifest, 'status': 'completed', 'cached': cached, 'manifest_path': manifest_name}
+            
+        except Exception as exc:
+            logger.error(f"Export of video {video_id} as {target_format} failed: {exc}")
+            self.update_state(
+                state='FAILURE',
+                meta={'error': str(exc), 'progress': 0}
+            )
+            raise exc
         
-        # Placeholder implementation
-        import time
-        time.sleep(2)
+        finally:
+            if manifest_name:
+                release_in_progress(manifest_name)
+
+
+def _set_stream_metadata(asset, stream):
+    asset.asset_metadata = {**(asset.asset_metadata or {}), 'stream': stream}
+
+
+def queue_stream_packaging(asset):
+    """
+    Queue HLS/DASH packaging of a generated video, if enabled
+    
+    Commits the asset's pending stream state; a failure to queue is logged and
+    never fails the generation that produced the video.
+    
+    Returns:
+        str: Celery task ID, or None if packaging is disabled or not queued
+    """
+    if not celery.flask_app.config.get('STREAM_PACKAGING_ENABLED', True):
+        return None
+    asset_id = asset.id
+    try:
+        _set_stream_metadata(asset, {'status': 'queued'})
+        db.session.commit()
+        task = package_video_stream.delay(asset_id)
+        logger.info(f"Queued stream packaging for video {asset_id}: {task.id}")
+        return task.id
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Failed to queue stream packaging for video {asset_id}: {e}")
+        return None
+
+
+@celery.task(bind=True)
+def package_video_stream(self, video_id, force=False):
+    """
+    Package a generated video for adaptive streaming
+    
+    Encodes the STREAM_RENDITIONS ladder (capped at the source height) in one
+    ffmpeg pass into segmented HLS, plus DASH over the same segments when
+    STREAM_DASH_ENABLED, and stores the package under the video's storage
+    prefix. The package location and ladder are recorded in the asset's
+    ``stream`` metadata, which the asset API serves playlists from.
+    
+    Args:
+        video_id: ID of the generated video asset
+        force: Repackage even if a package with the same settings exists
+    
+    Returns:
+        dict: The asset's stream metadata
+    """
+    app = celery.flask_app
+    
+    with app.app_context():
+        video = Asset.query.filter_by(id=video_id, asset_type=AssetType.GENERATED_VIDEO).first()
+        if not video:
+            raise ValueError(f"Video {video_id} not found")
         
-        result = {
-            'exported_path': f'exports/video_{video_id}.{target_format}',
-            'format': target_format,
-            'file_size': 7234567,
-            'duration': 45.2,
-            'status': 'completed'
+        settings = {
+            'renditions': app.config.get('STREAM_RENDITIONS', '720p,480p,360p'),
+            'segment_seconds': app.config.get('STREAM_SEGMENT_SECONDS', 4),
+            'dash': app.config.get('STREAM_DASH_ENABLED', False),
+            'engine_version': ENGINE_VERSION
         }
+        previous = (video.asset_metadata or {}).get('stream') or {}
+        if not force and previous.get('status') == 'ready' and previous.get('settings') == settings:
+            return previous
         
-        return result
+        prefix = stream_prefix(video.storage_path)
+        bucket_name = video.storage_bucket
+        _set_stream_metadata(video, {'status': 'processing', 'task_id': current_task.request.id})
+        db.session.commit()
+        
+        try:
+            self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Inspecting video'})
+            
+            source_url = storage_service.get_presigned_url(
+                video.storage_path, bucket_name,
+                expires=timedelta(seconds=app.config.get('EXPORT_TIMEOUT', 3600) + 600)
+            )
+            if not source_url:
+                raise ValueError(f"Failed to get a download URL for video {video_id}")
+            
+            source = inspect_source(source_url)
+            renditions = fit_to_source(parse_ladder(settings['renditions']), source['height'])
+            
+            if previous.get('prefix'):
+                # Settings changed; drop segments the new package would not overwrite
+                delete_package(previous['prefix'], bucket_name)
+            
+            self.update_state(state='PROGRESS', meta={
+                'progress': 20,
+                'status': f"Packaging {', '.join(r.name for r in renditions)}"
+            })
+            
+            start = time.perf_counter()
+            package = package_to_storage(
+                app, source_url, renditions, prefix, bucket_name,
+                segment_seconds=settings['segment_seconds'],
+                dash=settings['dash'],
+                audio=source['audio'],
+                timeout=app.config.get('EXPORT_TIMEOUT', 3600)
+            )
+            package_seconds = time.perf_counter() - start
+            
+            stream = {
+                'status': 'ready',
+                'prefix': prefix,
+                'hls': package['hls'],
+                'dash': package['dash'],
+                'renditions': [rendition.to_dict() for rendition in renditions],
+                'segment_seconds': settings['segment_seconds'],
+                'file_count': package['file_count'],
+                'total_size': package['total_size'],
+                'package_seconds': round(package_seconds, 2),
+                'settings': settings
+            }
+            video = Asset.query.get(video_id)
+            _set_stream_metadata(video, stream)
+            db.session.commit()
+            
+            logger.info(
+                f"Packaged video {video_id} for streaming ({', '.join(r.name for r in renditions)}, "
+                f"{package['file_count']} files) in {package_seconds:.1f}s"
+            )
+            return stream
+            
+        except Exception as exc:
+            logger.error(f"Stream packaging of video {video_id} failed: {exc}")
+            db.session.rollback()
+            video = Asset.query.get(video_id)
+            if video:
+                _set_stream_metadata(video, {'status': 'failed', 'error': str(exc), 'prefix': prefix})
+                db.session.commit()
+            self.update_state(
+                state='FAILURE',
+                meta={'error': str(exc), 'progress': 0}
+            )
+            raise exc
+
+
+def _build_package(task, kind, video_id, user_id, package_config):
+    """Shared body of the SCORM and HTML5 package tasks"""
+    app = celery.flask_app
+    manifest_name = None
+    task_id = task.request.id
+    
+    def report(progress, status):
+        # Also called from the zip writer thread, where task.request is unset
+        task.update_state(task_id=task_id, state='PROGRESS', meta={'progress': int(progress), 'status': status})
+    
+    with app.app_context():
+        try:
+            report(5, f'Starting {kind} package')
+            
+            config = normalize_package_config(
+                kind, package_config, app.config.get('PACKAGE_DEFAULT_RENDITIONS', '720p,360p')
+            )
+            video = Asset.query.filter_by(id=video_id, user_id=user_id, asset_type=AssetType.GENERATED_VIDEO).first()
+            if not video:
+                raise ValueError(f"Video {video_id} not found")
+            
+            key = source_key(video)
+            manifest_name = package_manifest_name(key, kind, config)
+            manifest = load_manifest(manifest_name)
+            if manifest:
+                return {**manifest, 'status': 'completed', 'cached': True, 'manifest_path': manifest_name}
+            
+            # Renditions come from (and are added to) the video export cache
+            renditions, _ = export_renditions(
+                app, video, 'mp4', parse_ladder(','.join(config['renditions'])),
+                report=lambda progress, status: report(5 + progress * 0.45, status)
+            )
+            
+            title = config['title'] or os.path.splitext(video.original_filename or video.filename)[0]
+            entries = build_package_entries(kind, config, f"lecture_{key[:16]}", [
+                {'title': title, 'renditions': renditions['renditions']}
+            ])
+            total = sum(entry.size or len(entry.data or b'') for entry in entries) or 1
+            
+            report(50, 'Writing package')
+            start = time.perf_counter()
+            object_name = package_object_name(key, kind, config)
+            bucket_name = app.config.get('MINIO_BUCKET_NAME')
+            upload = stream_zip_to_storage(
+                app, entries, object_name, bucket_name,
+                on_entry=lambda entry, written: report(
+                    50 + min(written / total, 1) * 45, f'Writing package ({entry.name})'
+                )
+            )
+            build_seconds = time.perf_counter() - start
+            
+            manifest = save_manifest(manifest_name, {
+                'kind': kind,
+                'config': config,
+                'source': {'asset_id': video.id, 'key': key},
+                'title': title,
+                'filename': package_filename(title, kind),
+                'object_name': object_name,
+                'bucket_name': bucket_name,
+                'file_size': upload['file_size'],
+                'sha256': upload['sha256'],
+                'entries': len(entries),
+                'renditions': [rendition['name'] for rendition in renditions['renditions']],
+                'build_seconds': round(build_seconds, 2)
+            }, bucket_name)
+            
+            logger.info(
+                f"Built {kind} package for video {video_id} ({upload['file_size']} bytes) in {build_seconds:.1f}s"
+            )
+            return {**manifest, 'status': 'completed', 'cached': False, 'manifest_path': manifest_name}
+            
+        except Exception as exc:
+            logger.error(f"{kind} package of video {video_id} failed: {exc}")
+            task.update_state(
+                state='FAILURE',
+                meta={'error': str(exc), 'progress': 0}
+            )
+            raise exc
         
-    except Exception as exc:
-        self.update_state(
-            state='FAILURE',
-            meta={'error': str(exc), 'progress': 0}
-        )
-        raise exc
+        finally:
+            if manifest_name:
+                release_in_progress(manifest_name)
 
 
 @celery.task(bind=True)
@@ -57,95 +387,417 @@ def create_scorm_package(self, video_id, package_config, user_id):
     """
     Create SCORM-compliant package for LMS integration
     
+    The zip (imsmanifest.xml, HTML5 player with SCORM completion tracking and
+    the video renditions) is written as a stream straight into a multipart
+    upload, and cached per video and configuration.
+    
     Args:
         video_id: ID of the video to package
-        package_config: SCORM package configuration
+        package_config: SCORM package configuration (scorm_version "1.2" or
+            "2004", title, renditions, completion_threshold)
         user_id: ID of the user requesting SCORM export
     
     Returns:
         dict: SCORM package results
     """
-    try:
-        # Update task progress
-        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Initializing SCORM package'})
-        
-        # TODO: Implement SCORM packaging
-        # 1. Create SCORM manifest (imsmanifest.xml)
-        # 2. Generate HTML5 player wrapper
-        # 3. Include video files and assets
-        # 4. Add tracking and completion logic
-        # 5. Create ZIP package
-        
-        self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Creating SCORM manifest'})
-        
-        self.update_state(state='PROGRESS', meta={'progress': 50, 'status': 'Generating HTML5 player'})
-        
-        self.update_state(state='PROGRESS', meta={'progress': 80, 'status': 'Packaging SCORM files'})
-        
-        # Placeholder implementation
-        import time
-        time.sleep(3)
-        
-        result = {
-            'scorm_package_path': f'exports/scorm_video_{video_id}.zip',
-            'package_size': 9876543,
-            'scorm_version': '1.2',
-            'html5_compatible': True,
-            'tracking_enabled': True,
-            'status': 'completed'
-        }
-        
-        return result
-        
-    except Exception as exc:
-        self.update_state(
-            state='FAILURE',
-            meta={'error': str(exc), 'progress': 0}
-        )
-        raise exc
+    return _build_package(self, 'scorm', video_id, user_id, package_config)
 
 
 @celery.task(bind=True)
-def create_html5_package(self, video_id, user_id):
+def create_html5_package(self, video_id, user_id, package_config=None):
     """
     Create standalone HTML5 package
     
     Args:
         video_id: ID of the video to package
         user_id: ID of the user requesting HTML5 export
+        package_config: Optional title, renditions and completion_threshold
     
     Returns:
         dict: HTML5 package results
     """
-    try:
-        # Update task progress
-        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Creating HTML5 package'})
-        
-        # TODO: Implement HTML5 packaging
-        # 1. Create responsive HTML5 video player
-        # 2. Include video files and poster image
-        # 3. Add CSS styling and JavaScript controls
-        # 4. Create ZIP package
+    return _build_package(self, 'html5', video_id, user_id, package_config)
+
+
+# Batch course export
+#
+# A course export is a parent Job whose lectures are exported by separate
+# tasks. At most COURSE_EXPORT_CONCURRENCY lecture tasks are queued at once:
+# each finishing task marks its lecture under a row lock on the Job and
+# queues the next pending one, and the last to finish queues the assembly of
+# the course package. No task waits on another, so a single worker cannot
+# deadlock on its own children.
+
+# Share of the parent job's progress taken by lecture exports; assembly is the rest
+COURSE_LECTURE_PROGRESS = 85
+
+
+def _lock_course_job(job_id):
+    # populate_existing: a job already loaded in the session is re-read under the lock
+    return Job.query.filter_by(id=job_id).with_for_update().populate_existing().first()
+
+
+def _course_progress(lectures):
+    """Parent job progress from the lecture states"""
+    if not lectures:
+        return 0
+    done = sum(min(lecture.get('progress', 0), 100) for lecture in lectures.values())
+    return int(done / len(lectures) * COURSE_LECTURE_PROGRESS / 100)
+
+
+def _set_lecture(job, video_id, **changes):
+    lectures = dict((job.results or {}).get('lectures') or {})
+    lectures[str(video_id)] = {**lectures.get(str(video_id), {}), **changes}
+    job.results = {**(job.results or {}), 'lectures': lectures}
+    return lectures
+
+
+def _course_lecture_status(lectures, status):
+    return [video_id for video_id, lecture in lectures.items() if lecture.get('status') == status]
+
+
+def course_export_overdue(job):
+    """Whether a course export is still unfinished past COURSE_EXPORT_TIMEOUT"""
+    timeout = celery.flask_app.config.get('COURSE_EXPORT_TIMEOUT', 21600)
+    return (
+        timeout > 0
+        and job.status in (JobStatus.PENDING, JobStatus.PROCESSING)
+        and isinstance(job.created_at, datetime)
+        and job.created_at < datetime.utcnow() - timedelta(seconds=timeout)
+    )
+
+
+def expire_course_export(job_id):
+    """
+    Fail a course export that missed its deadline
+    
+    Lectures are queued by the tasks of the lectures before them, so a lost
+    task would leave the export processing forever. Lecture tasks still
+    running skip themselves once they see the failed job.
+    
+    Returns:
+        bool: Whether the export was failed
+    """
+    job = _lock_course_job(job_id)
+    if not job or not course_export_overdue(job):
+        db.session.commit()
+        return False
+    
+    lectures = (job.results or {}).get('lectures') or {}
+    for status in ('pending', 'queued', 'running'):
+        for video_id in _course_lecture_status(lectures, status):
+            _set_lecture(job, video_id, status='skipped')
+    timeout = celery.flask_app.config.get('COURSE_EXPORT_TIMEOUT', 21600)
+    error = f"Course export did not finish within {timeout} seconds"
+    job.mark_failed({'error_message': error, 'failed_at': time.time()})
+    db.session.commit()
+    
+    ProgressPublisher(job_id).fail(error)
+    logger.warning(f"Course export job {job_id} failed: {error}")
+    return True
+
+
+@celery.task(bind=True, name='expire_course_exports')
+def expire_course_exports(self):
+    """
+    Fail course exports still unfinished past COURSE_EXPORT_TIMEOUT
+    
+    Returns:
+        dict: Ids of the exports failed
+    """
+    app = celery.flask_app
+    
+    with app.app_context():
+        timeout = app.config.get('COURSE_EXPORT_TIMEOUT', 21600)
+        if timeout <= 0:
+            return {'status': 'skipped'}
         
-        self.update_state(state='PROGRESS', meta={'progress': 60, 'status': 'Generating HTML5 player'})
+        cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+        candidates = db.session.query(Job.id, Job.parameters).filter(
+            Job.job_type == JobType.FULL_PIPELINE,
+            Job.status.in_([JobStatus.PENDING, JobStatus.PROCESSING]),
+            Job.created_at < cutoff
+        ).all()
+        db.session.commit()
         
-        # Placeholder implementation
-        import time
-        time.sleep(2)
+        expired = [
+            job_id for job_id, parameters in candidates
+            if (parameters or {}).get('pipeline_type') == 'course_export' and expire_course_export(job_id)
+        ]
+        return {'status': 'completed', 'expired': expired}
+
+
+@celery.task(bind=True)
+def export_course(self, job_id):
+    """
+    Start a batch course export
+    
+    Queues the first lectures of the course; the rest are queued as those
+    finish (see ``export_course_lecture``).
+    
+    Args:
+        job_id: Parent Job with the course export parameters (video_ids,
+            titles, formats, renditions, package, package_config)
+    """
+    app = celery.flask_app
+    
+    with app.app_context():
+        job = _lock_course_job(job_id)
+        if not job or job.status in (JobStatus.CANCELLED, JobStatus.FAILED):
+            return {'status': 'skipped'}
         
-        result = {
-            'html5_package_path': f'exports/html5_video_{video_id}.zip',
-            'package_size': 8765432,
-            'responsive': True,
-            'mobile_compatible': True,
-            'status': 'completed'
+        video_ids = job.parameters['video_ids']
+        concurrency = max(1, app.config.get('COURSE_EXPORT_CONCURRENCY', 3))
+        first = video_ids[:concurrency]
+        job.mark_started()
+        job.results = {
+            **(job.results or {}),
+            'lectures': {
+                str(video_id): {'status': 'queued' if video_id in first else 'pending', 'progress': 0}
+                for video_id in video_ids
+            }
         }
+        job.update_progress(1, f"Exporting {len(video_ids)} lectures")
+        db.session.commit()
+    
+    for video_id in first:
+        export_course_lecture.delay(job_id, video_id)
+    logger.info(f"Course export job {job_id} started: {len(video_ids)} lectures, {len(first)} at a time")
+    return {'status': 'started', 'lectures': len(video_ids)}
+
+
+@celery.task(bind=True)
+def export_course_lecture(self, job_id, video_id):
+    """
+    Export one lecture of a course: its renditions in every requested
+    format, plus MP4 renditions for the course package
+    
+    Renditions go through the video export cache, so lectures exported
+    before (alone or in another course) are not transcoded again.
+    """
+    app = celery.flask_app
+    
+    with app.app_context():
+        job = Job.query.get(job_id)
+        if not job or job.status in (JobStatus.CANCELLED, JobStatus.FAILED):
+            return {'status': 'skipped'}
+        params = job.parameters
+        user_id = job.user_id
+        db.session.commit()
         
-        return result
+        reported = {'progress': 0}
+        
+        def report(progress):
+            # Throttled: every update takes the parent job's row lock
+            if progress - reported['progress'] < 10:
+                return
+            reported['progress'] = progress
+            job = _lock_course_job(job_id)
+            if not job or job.status in (JobStatus.CANCELLED, JobStatus.FAILED):
+                # Expired or failed by another lecture: keep its lecture states and progress
+                db.session.commit()
+                return
+            lectures = _set_lecture(job, video_id, status='running', progress=int(progress))
+            job.update_progress(_course_progress(lectures), f"Exporting lecture {video_id}")
+            db.session.commit()
+        
+        try:
+            video = Asset.query.filter_by(id=video_id, user_id=user_id, asset_type=AssetType.GENERATED_VIDEO).first()
+            if not video:
+                raise ValueError(f"Video {video_id} not found")
+            
+            ladder = parse_ladder(','.join(params['renditions']))
+            targets = list(params.get('formats') or [])
+            if params.get('package') and 'mp4' not in targets:
+                targets.append('mp4')
+            
+            exports = {}
+            for index, target_format in enumerate(targets):
+                export_renditions(
+                    app, video, target_format, ladder,
+                    report=lambda progress, status, index=index: report((index * 100 + progress) / len(targets))
+                )
+                exports[target_format] = manifest_object_name(source_key(video), 'video', target_format, ladder)
+            outcome = {'status': 'completed', 'progress': 100, 'exports': exports}
+            
+        except Exception as exc:
+            logger.error(f"Course export job {job_id}: lecture {video_id} failed: {exc}")
+            db.session.rollback()
+            outcome = {'status': 'failed', 'progress': 100, 'error': str(exc)}
+        
+        return _finish_course_lecture(job_id, video_id, outcome)
+
+
+def _finish_course_lecture(job_id, video_id, outcome):
+    """
+    Record a finished lecture and queue what comes next: another lecture,
+    the course assembly, or nothing if the export has failed
+    """
+    publisher = ProgressPublisher(job_id)
+    next_video_id = None
+    assemble = False
+    
+    job = _lock_course_job(job_id)
+    if not job or job.status in (JobStatus.CANCELLED, JobStatus.FAILED):
+        db.session.commit()
+        return {'status': 'skipped'}
+    
+    lectures = _set_lecture(job, video_id, **outcome)
+    publisher.publish(EVENT_LECTURE, video_id=video_id, **outcome)
+    
+    if outcome['status'] == 'failed':
+        # A course package missing a lecture is of no use; stop queueing, and
+        # lectures already queued skip themselves once they see the failed job
+        for skipped_id in _course_lecture_status(lectures, 'pending') + _course_lecture_status(lectures, 'queued'):
+            lectures = _set_lecture(job, skipped_id, status='skipped')
+        job.mark_failed({
+            'error_message': f"Lecture {video_id} failed: {outcome['error']}",
+            'failed_at': time.time()
+        })
+        db.session.commit()
+        publisher.fail(f"Lecture {video_id} failed: {outcome['error']}")
+        return outcome
+    
+    pending = [
+        video_id for video_id in job.parameters['video_ids']
+        if lectures[str(video_id)].get('status') == 'pending'
+    ]
+    if pending:
+        next_video_id = pending[0]
+        lectures = _set_lecture(job, next_video_id, status='queued')
+    elif len(_course_lecture_status(lectures, 'completed')) == len(lectures):
+        assemble = True
+    
+    completed = len(_course_lecture_status(lectures, 'completed'))
+    job.update_progress(_course_progress(lectures), f"Exported {completed} of {len(lectures)} lectures")
+    db.session.commit()
+    
+    if next_video_id is not None:
+        export_course_lecture.delay(job_id, next_video_id)
+    if assemble:
+        assemble_course_export.delay(job_id)
+    return outcome
+
+
+@celery.task(bind=True)
+def assemble_course_export(self, job_id):
+    """
+    Finish a course export: build the course package (one SCO or page per
+    lecture sharing a single copy of the player) and complete the parent job
+    
+    The package is cached per ordered set of lecture sources and package
+    configuration, so re-exporting an unchanged course reuses it.
+    """
+    app = celery.flask_app
+    task_id = self.request.id
+    
+    with app.app_context():
+        job = Job.query.get(job_id)
+        if not job or job.status in (JobStatus.CANCELLED, JobStatus.FAILED):
+            return {'status': 'skipped'}
+        params = job.parameters
+        publisher = ProgressPublisher(job_id)
         
-    except Exception as exc:
-        self.update_state(
-            state='FAILURE',
-            meta={'error': str(exc), 'progress': 0}
-        )
-        raise exc
+        try:
+            videos = {
+                video.id: video for video in Asset.query.filter(
+                    Asset.id.in_(params['video_ids']), Asset.user_id == job.user_id
+                )
+            }
+            titles = params.get('titles') or [None] * len(params['video_ids'])
+            lectures = []
+            for video_id, title in zip(params['video_ids'], titles):
+                video = videos[video_id]
+                exports = job.results['lectures'][str(video_id)].get('exports', {})
+                lectures.append({
+                    'video_id': video_id,
+                    'title': title or os.path.splitext(video.original_filename or video.filename)[0],
+                    'exports': {
+                        target_format: {'manifest_path': manifest_name, 'manifest': load_manifest(manifest_name)}
+                        for target_format, manifest_name in exports.items()
+                    }
+                })
+            
+            package = None
+            kind = params.get('package')
+            if kind:
+                job.update_progress(COURSE_LECTURE_PROGRESS, f'Building {kind} course package')
+                db.session.commit()
+                
+                config = {**params['package_config'], 'lectures': [lecture['title'] for lecture in lectures]}
+                key = course_key([source_key(videos[video_id]) for video_id in params['video_ids']])
+                manifest_name = package_manifest_name(key, f'course-{kind}', config)
+                package = load_manifest(manifest_name)
+                cached = bool(package)
+                if not package:
+                    entries = build_package_entries(kind, config, f"course_{key[:16]}", [
+                        {'title': lecture['title'], 'renditions': lecture['exports']['mp4']['manifest']['renditions']}
+                        for lecture in lectures
+                    ])
+                    total = sum(entry.size or len(entry.data or b'') for entry in entries) or 1
+                    title = config.get('title') or lectures[0]['title']
+                    object_name = package_object_name(key, f'course-{kind}', config)
+                    bucket_name = app.config.get('MINIO_BUCKET_NAME')
+                    
+                    start = time.perf_counter()
+                    upload = stream_zip_to_storage(
+                        app, entries, object_name, bucket_name,
+                        on_entry=lambda entry, written: self.update_state(task_id=task_id, state='PROGRESS', meta={
+                            'progress': int(min(written / total, 1) * 100),
+                            'status': f'Writing package ({entry.name})'
+                        })
+                    )
+                    package = save_manifest(manifest_name, {
+                        'kind': kind,
+                        'config': config,
+                        'source': {'video_ids': params['video_ids'], 'key': key},
+                        'title': title,
+                        'filename': package_filename(title, kind),
+                        'object_name': object_name,
+                        'bucket_name': bucket_name,
+                        'file_size': upload['file_size'],
+                        'sha256': upload['sha256'],
+                        'entries': len(entries),
+                        'build_seconds': round(time.perf_counter() - start, 2)
+                    }, bucket_name)
+                package = {**package, 'cached': cached, 'manifest_path': manifest_name}
+            
+            result = {
+                'status': 'completed',
+                'pipeline_type': 'course_export',
+                'lectures': [
+                    {
+                        'video_id': lecture['video_id'],
+                        'title': lecture['title'],
+                        'exports': {
+                            target_format: {
+                                'manifest_path': export['manifest_path'],
+                                'renditions': [rendition['name'] for rendition in export['manifest']['renditions']]
+                            }
+                            for target_format, export in lecture['exports'].items()
+                        }
+                    }
+                    for lecture in lectures
+                ],
+                'package': package
+            }
+            job.update_progress(100, 'Course export completed')
+            job.mark_completed(result)
+            db.session.commit()
+            
+            publisher.finish(job_id=job_id, package=(package or {}).get('object_name'), lectures=len(lectures))
+            logger.info(f"Course export job {job_id} completed: {len(lectures)} lectures")
+            return result
+            
+        except Exception as exc:
+            logger.error(f"Course export job {job_id} failed while assembling: {exc}")
+            db.session.rollback()
+            job = Job.query.get(job_id)
+            job.mark_failed({'error_message': str(exc), 'task_id': task_id, 'failed_at': time.time()})
+            db.session.commit()
+            publisher.fail(str(exc))
+            self.update_state(
+                state='FAILURE',
+                meta={'error': str(exc), 'progress': 0}
+            )
+            raise exc
@@ -1,6 +1,7 @@
 """
 Celery tasks for LLM script generation
 """
+import time
 import logging
 from typing import Dict, Any, Optional
 from flask import current_app
@@ -9,12 +10,96 @@ from ..extensions import db, celery
 from ..models import Job, Asset
 from ..models.job import JobStatus
 from ..models.asset import AssetType, AssetStatus
-from ..services.llm import create_llama_client, LlamaConfig
 from ..services.storage import storage_service
+from ..services.analytics import StageTimings, STAGE_SCRIPT, STAGE_UPLOAD
+from ..services.progress import ProgressPublisher
 
 logger = logging.getLogger(__name__)
 
 
+def shared_llama_client():
+    """
+    This worker process's Llama client, configured from the app config
+    
+    Imported lazily so processes that only queue tasks never load huggingface_hub.
+    """
+    from ..services.llm import get_llama_client, LlamaConfig
+    llama_config = LlamaConfig(
+        long_form_min_minutes=current_app.config.get('LLM_LONG_FORM_MIN_MINUTES', 10),
+        section_words=current_app.config.get('LLM_SECTION_WORDS', 900),
+        section_concurrency=current_app.config.get('LLM_SECTION_CONCURRENCY', 4)
+    )
+    return get_llama_client(llama_config)
+
+
+def save_script_asset(job, prompt: str, script_content: str, metadata: Dict[str, Any],
+                      params: Dict[str, Any], timings: Optional[StageTimings] = None) -> Asset:
+    """
+    Store a generated script and create its SCRIPT asset (flushed, not committed)
+    
+    The asset is marked ERROR rather than raising if the upload fails.
+    """
+    script_filename = f"script_{job.id}.txt"
+    
+    # Generate storage path and get bucket name
+    from ..api.assets import generate_storage_path
+    storage_path = generate_storage_path(job.user_id, 'script', script_filename)
+    bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
+    
+    # Upload script to storage
+    script_asset = Asset(
+        filename=f"script_{job.id}_{job.user_id}.txt",
+        original_filename=script_filename,
+        storage_path=storage_path,
+        storage_bucket=bucket_name,
+        file_size=len(script_content.encode('utf-8')),
+        mime_type='text/plain',
+        file_extension='.txt',
+        asset_type=AssetType.SCRIPT,
+        status=AssetStatus.PROCESSING,
+        user_id=job.user_id,
+        asset_metadata={
+            'generation_prompt': prompt,
+            'word_count': metadata['word_count'],
+            'estimated_duration': metadata['estimated_duration'],
+            'topic': params.get('topic'),
+            'target_audience': params.get('target_audience'),
+            'style': params.get('style')
+        }
+    )
+    
+    db.session.add(script_asset)
+    db.session.flush()  # Get asset ID
+    
+    # Save script content to storage
+    try:
+        from io import BytesIO
+        script_file = BytesIO(script_content.encode('utf-8'))
+        
+        upload_start = time.perf_counter()
+        storage_result = storage_service.upload_file(
+            file_data=script_file,
+            object_name=storage_path,
+            bucket_name=bucket_name,
+            content_type='text/plain'
+        )
+        if timings:
+            timings.add(STAGE_UPLOAD, 'minio', time.perf_counter() - upload_start)
+        
+        if storage_result.get('success'):
+            script_asset.status = AssetStatus.READY
+            # Generate presigned URL for download
+            script_asset.download_url = storage_service.get_presigned_url(storage_path, bucket_name)
+        else:
+            script_asset.status = AssetStatus.ERROR
+        
+    except Exception as e:
+        logger.error(f"Failed to save script to storage: {e}")
+        script_asset.status = AssetStatus.ERROR
+    
+    return script_asset
+
+
 @celery.task(bind=True, name='generate_script')
 def generate_script(self, job_id: int, prompt: str, **kwargs):
     """
@@ -23,12 +108,15 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
     Args:
         job_id: ID of the job to process
         prompt: Main prompt for script generation
-        **kwargs: Additional parameters (topic, target_audience, duration_minutes, style, additional_context)
+        **kwargs: Additional parameters (topic, target_audience, duration_minutes, style, additional_context,
+            regenerate to bypass the prompt cache)
     
     Returns:
         Dict with generation results
     """
     job = None
+    publisher = None
+    timings = StageTimings()
     
     # Get Flask app instance for context
     from ..extensions import celery
@@ -47,6 +135,8 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
             if not job:
                 raise ValueError(f"Job {job_id} not found")
             
+            timings.add_queue_wait(job.created_at)
+            
             # Update job status
             job.status = JobStatus.PROCESSING
             job.started_at = db.func.now()
@@ -58,10 +148,9 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
                 meta={'progress': 10, 'message': 'Connecting to Llama service'}
             )
             
-            # Initialize Llama client
+            # Shared Llama client of this worker process
             logger.info(f"Initializing Llama client for job {job_id}")
-            llama_config = LlamaConfig()
-            llama_client = create_llama_client(llama_config)
+            llama_client = shared_llama_client()
             
             # Update progress
             job.update_progress(20, "Connecting to Llama service")
@@ -77,15 +166,23 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
                        f"prompt_length={len(prompt)}, topic={kwargs.get('topic')}, "
                        f"audience={kwargs.get('target_audience')}, duration={kwargs.get('duration_minutes')}")
             
+            # Publish the script to the job's progress channel as it is written
+            if current_app.config.get('LLM_STREAMING_ENABLED', True):
+                publisher = ProgressPublisher(job_id)
+            
             # Generate script
-            generation_result = llama_client.generate_script(
-                prompt=prompt,
-                topic=kwargs.get('topic'),
-                target_audience=kwargs.get('target_audience'),
-                duration_minutes=kwargs.get('duration_minutes'),
-                style=kwargs.get('style'),
-                additional_context=kwargs.get('additional_context')
-            )
+            with timings.measure(STAGE_SCRIPT, 'llm'):
+                generation_result = llama_client.generate_script(
+                    prompt=prompt,
+                    topic=kwargs.get('topic'),
+                    target_audience=kwargs.get('target_audience'),
+                    duration_minutes=kwargs.get('duration_minutes'),
+                    style=kwargs.get('style'),
+                    additional_context=kwargs.get('additional_context'),
+                    on_token=publisher.append if publisher else None,
+                    use_cache=not kwargs.get('regenerate', False),
+                    user_id=job.user_id
+                )
             
             logger.info(f"Script generation completed: success={generation_result.get('success')}")
             
@@ -105,60 +202,7 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
             
             # Save script as asset
             script_content = generation_result['script']
-            script_filename = f"script_{job_id}.txt"
-            
-            # Generate storage path and get bucket name
-            from ..api.assets import generate_storage_path
-            storage_path = generate_storage_path(job.user_id, 'script', script_filename)
-            bucket_name = current_app.config.get('MINIO_BUCKET_NAME')
-            
-            # Upload script to storage
-            script_asset = Asset(
-                filename=f"script_{job.id}_{job.user_id}.txt",
-                original_filename=script_filename,
-                storage_path=storage_path,
-                storage_bucket=bucket_name,
-                file_size=len(script_content.encode('utf-8')),
-                mime_type='text/plain',
-                file_extension='.txt',
-                asset_type=AssetType.SCRIPT,
-                status=AssetStatus.PROCESSING,
-                user_id=job.user_id,
-                asset_metadata={
-                    'generation_prompt': prompt,
-                    'word_count': generation_result['metadata']['word_count'],
-                    'estimated_duration': generation_result['metadata']['estimated_duration'],
-                    'topic': kwargs.get('topic'),
-                    'target_audience': kwargs.get('target_audience'),
-                    'style': kwargs.get('style')
-                }
-            )
-            
-            db.session.add(script_asset)
-            db.session.flush()  # Get asset ID
-            
-            # Save script content to storage
-            try:
-                from io import BytesIO
-                script_file = BytesIO(script_content.encode('utf-8'))
-                
-                storage_result = storage_service.upload_file(
-                    file_data=script_file,
-                    object_name=storage_path,
-                    bucket_name=bucket_name,
-                    content_type='text/plain'
-                )
-                
-                if storage_result.get('success'):
-                    script_asset.status = AssetStatus.READY
-                    # Generate presigned URL for download
-                    script_asset.download_url = storage_service.get_presigned_url(storage_path, bucket_name)
-                else:
-                    script_asset.status = AssetStatus.ERROR
-                
-            except Exception as e:
-                logger.error(f"Failed to save script to storage: {e}")
-                script_asset.status = AssetStatus.ERROR
+            script_asset = save_script_asset(job, prompt, script_content, generation_result['metadata'], kwargs, timings)
             
             # Update progress
             job.update_progress(90, "Finalizing script generation")
@@ -182,9 +226,17 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
             
             # Associate script asset with job
             job.add_asset(script_asset)
+            timings.record()
             
             db.session.commit()
             
+            if publisher:
+                publisher.finish(
+                    script_asset_id=script_asset.id,
+                    word_count=generation_result['metadata']['word_count'],
+                    estimated_duration=generation_result['metadata']['estimated_duration']
+                )
+            
             logger.info(f"Script generation completed successfully for job {job_id}")
             
             return {
@@ -208,6 +260,9 @@ def generate_script(self, job_id: int, prompt: str, **kwargs):
                 }
                 db.session.commit()
             
+            if publisher:
+                publisher.fail(str(e))
+            
             # Update task state to FAILURE
             self.update_state(
                 state='FAILURE',
@@ -234,8 +289,9 @@ def validate_llm_service(self):
         
         # Create client and test connection
         logger.debug("Creating Llama client for validation")
+        from ..services.llm import get_llama_client, LlamaConfig
         llama_config = LlamaConfig()
-        llama_client = create_llama_client(llama_config)
+        llama_client = get_llama_client(llama_config)
         
         self.update_state(
             state='PROGRESS',
@@ -0,0 +1,358 @@
+"""
+Pipelined script-to-speech Celery tasks
+"""
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from datetime import datetime
+
+from celery import current_task
+from flask import current_app
+
+from ..extensions import celery, db
+from ..models import Job, Asset
+from ..models.asset import AssetType, AssetStatus
+from ..services.storage import storage_service
+from ..services.blobs import store_bytes
+from ..services.progress import ProgressPublisher, EVENT_SEGMENT
+from ..services.speech_pipeline import ParagraphChunker, SegmentPipeline, concat_wav, concat_videos
+from ..services.analytics import (
+    StageTimings, STAGE_ASSET_DOWNLOAD, STAGE_SCRIPT, STAGE_TTS, STAGE_VIDEO_RENDER, STAGE_UPLOAD
+)
+from .llm_tasks import shared_llama_client, save_script_asset
+from .export_tasks import queue_stream_packaging
+
+logger = logging.getLogger(__name__)
+
+
+def _load_input_asset(asset_id, user_id, asset_type):
+    asset = Asset.query.filter_by(id=asset_id, user_id=user_id).first()
+    if not asset:
+        raise ValueError(f"Asset {asset_id} not found or not accessible")
+    if asset.asset_type != asset_type:
+        raise ValueError(f"Asset {asset_id} is not a {asset_type.value}")
+    if asset.status != AssetStatus.READY:
+        raise ValueError(f"Asset {asset_id} is not ready (status: {asset.status.value})")
+    return asset
+
+
+@celery.task(bind=True, name='scripted_speech_pipeline')
+def scripted_speech_pipeline(self, job_id: int, prompt: str, voice_asset_id: int,
+                             portrait_asset_id=None, **kwargs):
+    """
+    Generate a script and speak it while it is still being written
+
+    Each paragraph the LLM completes is synthesized straight away (and, with a
+    portrait, rendered as a talking-head segment) while later paragraphs are
+    still streaming, so the job takes about as long as its slowest stage
+    rather than the sum of all of them. The segments are joined in script
+    order into one audio asset (and one video asset).
+
+    Args:
+        job_id: ID of the job to process
+        prompt: Main prompt for script generation
+        voice_asset_id: ID of the voice sample to clone
+        portrait_asset_id: Optional portrait; when given, video is rendered too
+        **kwargs: Script parameters as for generate_script (topic,
+            target_audience, duration_minutes, style, additional_context,
+            regenerate)
+
+    Returns:
+        dict: Pipeline results
+    """
+    job = None
+    pipeline = None
+    publisher = None
+    timings = StageTimings()
+    temp_dir = tempfile.mkdtemp(prefix=f"pipeline_{job_id}_")
+    app = celery.flask_app
+
+    with app.app_context():
+        try:
+            job = Job.query.get(job_id)
+            if not job:
+                raise ValueError(f"Job {job_id} not found")
+
+            timings.add_queue_wait(job.created_at)
+            job.mark_started()
+            job.update_progress(5, 'Loading input assets')
+            db.session.commit()
+
+            self.update_state(state='PROGRESS', meta={'progress': 5, 'status': 'Loading input assets'})
+
+            voice_asset = _load_input_asset(voice_asset_id, job.user_id, AssetType.VOICE_SAMPLE)
+            portrait_asset = _load_input_asset(portrait_asset_id, job.user_id, AssetType.PORTRAIT) \
+                if portrait_asset_id else None
+
+            with timings.measure(STAGE_ASSET_DOWNLOAD, 'minio'):
+                # Prefer the normalized WAV made after upload, if there is one
+                voice_path = (voice_asset.asset_metadata or {}).get('normalized_path') or voice_asset.storage_path
+                voice_audio_data = storage_service.download_file(voice_path, voice_asset.storage_bucket)
+                if not voice_audio_data:
+                    raise ValueError(f"Failed to download voice asset {voice_asset_id}")
+
+                portrait_path = None
+                if portrait_asset:
+                    portrait_data = storage_service.download_file(
+                        portrait_asset.storage_path, portrait_asset.storage_bucket
+                    )
+                    if not portrait_data:
+                        raise ValueError(f"Failed to download portrait asset {portrait_asset_id}")
+                    portrait_path = os.path.join(
+                        temp_dir, f"portrait{os.path.splitext(portrait_asset.filename)[1] or '.png'}"
+                    )
+                    with open(portrait_path, 'wb') as fh:
+                        fh.write(portrait_data)
+
+            # Gradio clients are not shared across threads: one per pool thread.
+            # Imported here so processes that only queue tasks never load gradio_client
+            from ..services.tts import create_tts_client
+            clients = threading.local()
+
+            def synthesize(text):
+                if not hasattr(clients, 'tts'):
+                    clients.tts = create_tts_client()
+                return clients.tts.generate_speech(text=text, speaker_audio=voice_audio_data)
+
+            job_params = job.parameters or {}
+
+            def _render(index, audio):
+                # Imported on first use, like the TTS client, when the job has a portrait
+                from ..services.video import create_video_client, VideoGenerationConfig
+                if not hasattr(clients, 'video'):
+                    clients.video = create_video_client()
+                audio_path = os.path.join(temp_dir, f"segment_{index:04d}.wav")
+                with open(audio_path, 'wb') as fh:
+                    fh.write(audio)
+                result = clients.video.generate_video(
+                    portrait_path=portrait_path,
+                    audio_path=audio_path,
+                    output_path=os.path.join(temp_dir, f"segment_{index:04d}.mp4"),
+                    config=VideoGenerationConfig(
+                        driven_audio_type='upload',
+                        smoothed_pitch=job_params.get('smoothed_pitch', 0.8),
+                        smoothed_yaw=job_params.get('smoothed_yaw', 0.8),
+                        smoothed_roll=job_params.get('smoothed_roll', 0.8),
+                        smoothed_t=job_params.get('smoothed_t', 0.8)
+                    )
+                )
+                return result['video_path']
+
+            render = _render if portrait_path else None
+
+            config = current_app.config
+            chunker = ParagraphChunker(
+                min_chars=config.get('PIPELINE_SEGMENT_MIN_CHARS', 200),
+                max_chars=config.get('PIPELINE_SEGMENT_MAX_CHARS', 1200)
+            )
+            pipeline = SegmentPipeline(
+                synthesize, render,
+                tts_concurrency=config.get('PIPELINE_TTS_CONCURRENCY', 2),
+                render_concurrency=config.get('PIPELINE_RENDER_CONCURRENCY', 1)
+            )
+            publisher = ProgressPublisher(job_id)
+            ready = []
+
+            def report(segments):
+                for segment in segments:
+                    ready.append(segment.index)
+                    publisher.publish(
+                        EVENT_SEGMENT, index=segment.index, ready=len(ready), submitted=len(pipeline.segments),
+                        tts_seconds=round(segment.tts_seconds, 2),
+                        render_seconds=round(segment.render_seconds, 2) if render else None
+                    )
+
+            def on_token(fragment):
+                publisher.append(fragment)
+                for text in chunker.feed(fragment):
+                    pipeline.submit(text)
+                report(pipeline.completed())
+
+            job.update_progress(10, 'Generating script and speech')
+            db.session.commit()
+            self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Generating script and speech'})
+
+            pipeline_start = time.perf_counter()
+            with timings.measure(STAGE_SCRIPT, 'llm'):
+                generation_result = shared_llama_client().generate_script(
+                    prompt=prompt,
+                    topic=kwargs.get('topic'),
+                    target_audience=kwargs.get('target_audience'),
+                    duration_minutes=kwargs.get('duration_minutes'),
+                    style=kwargs.get('style'),
+                    additional_context=kwargs.get('additional_context'),
+                    on_token=on_token,
+                    use_cache=not kwargs.get('regenerate', False),
+                    user_id=job.user_id
+                )
+            script_seconds = time.perf_counter() - pipeline_start
+
+            if not generation_result.get('success'):
+                raise RuntimeError(f"Script generation failed: {generation_result.get('error', 'Unknown error')}")
+
+            for text in chunker.flush():
+                pipeline.submit(text)
+            total = len(pipeline.segments)
+            if not total:
+                raise RuntimeError('Script generation returned no text to speak')
+
+            # Speech for the paragraphs written last is still being produced
+            stage = 'Rendering' if render else 'Synthesizing'
+            for segment in pipeline.wait():
+                report([segment])
+                progress = 50 + int(35 * len(ready) / total)
+                job.update_progress(progress, f"{stage} segment {len(ready)} of {total}")
+                db.session.commit()
+            pipeline.shutdown()
+
+            segments = pipeline.segments
+            for segment in segments:
+                timings.add(STAGE_TTS, 'indextts', segment.tts_seconds)
+                if render:
+                    timings.add(STAGE_VIDEO_RENDER, 'kdtalker', segment.render_seconds)
+
+            job.update_progress(88, 'Joining segments')
+            db.session.commit()
+            self.update_state(state='PROGRESS', meta={'progress': 88, 'status': 'Joining segments'})
+
+            script_content = generation_result['script']
+            script_asset = save_script_asset(
+                job, prompt, script_content, generation_result['metadata'], kwargs, timings
+            )
+            job.add_asset(script_asset)
+
+            speech_audio_data = concat_wav(
+                [segment.audio for segment in segments],
+                pause_seconds=config.get('PIPELINE_PARAGRAPH_PAUSE', 0.4)
+            )
+            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+            bucket_name = config.get('MINIO_BUCKET_NAME', 'voice-clone-assets')
+
+            with timings.measure(STAGE_UPLOAD, 'minio'):
+                audio_blob = store_bytes(speech_audio_data, content_type='audio/wav')
+
+            audio_asset = Asset(
+                filename=f"generated_speech_{job_id}_{timestamp}.wav",
+                original_filename=f"generated_speech_{job_id}_{timestamp}.wav",
+                file_size=len(speech_audio_data),
+                mime_type='audio/wav',
+                file_extension='.wav',
+                asset_type=AssetType.GENERATED_AUDIO,
+                status=AssetStatus.READY,
+                storage_path=audio_blob.object_name,
+                storage_bucket=bucket_name,
+                user_id=job.user_id,
+                description=f"Generated speech for job {job_id}: {script_content[:100]}{'...' if len(script_content) > 100 else ''}",
+                asset_metadata={'sha256': audio_blob.sha256, 'segments': total}
+            )
+            db.session.add(audio_asset)
+            db.session.flush()
+            job.add_asset(audio_asset)
+
+            video_asset = None
+            if render:
+                video_filename = f"generated_video_{job_id}_{timestamp}.mp4"
+                video_local_path = os.path.join(temp_dir, video_filename)
+                concat_videos([segment.video_path for segment in segments], video_local_path)
+
+                storage_path = f"generated/videos/{job.user_id}/{video_filename}"
+                with timings.measure(STAGE_UPLOAD, 'minio'):
+                    with open(video_local_path, 'rb') as video_file:
+                        upload_result = storage_service.upload_file(
+                            file_data=video_file,
+                            object_name=storage_path,
+                            bucket_name=bucket_name,
+                            content_type='video/mp4'
+                        )
+                if not upload_result.get('success'):
+                    raise ValueError(f"Failed to upload video: {upload_result.get('error')}")
+
+                video_asset = Asset(
+                    filename=video_filename,
+                    original_filename=video_filename,
+                    file_size=os.path.getsize(video_local_path),
+                    mime_type='video/mp4',
+                    file_extension='.mp4',
+                    asset_type=AssetType.GENERATED_VIDEO,
+                    status=AssetStatus.READY,
+                    storage_path=storage_path,
+                    storage_bucket=bucket_name,
+                    user_id=job.user_id,
+                    description=f"Generated video from portrait (asset {portrait_asset_id}) and script of job {job_id}",
+                    asset_metadata={'segments': total}
+                )
+                db.session.add(video_asset)
+                db.session.flush()
+                job.add_asset(video_asset)
+
+            elapsed = time.perf_counter() - pipeline_start
+            stage_seconds = {
+                'script': round(script_seconds, 2),
+                'tts': round(sum(segment.tts_seconds for segment in segments), 2),
+                'render': round(sum(segment.render_seconds for segment in segments), 2) if render else None
+            }
+            result = {
+                'status': 'completed',
+                'script_asset_id': script_asset.id,
+                'audio_asset_id': audio_asset.id,
+                'video_asset_id': video_asset.id if video_asset else None,
+                'generated_asset_id': (video_asset or audio_asset).id,
+                'segments': total,
+                'word_count': generation_result['metadata']['word_count'],
+                'estimated_duration': generation_result['metadata']['estimated_duration'],
+                'pipeline': {
+                    'elapsed_seconds': round(elapsed, 2),
+                    # Time the stages would have taken back to back
+                    'sequential_seconds': round(sum(value or 0 for value in stage_seconds.values()), 2),
+                    'stage_seconds': stage_seconds
+                }
+            }
+
+            job.update_service_metadata({
+                'llm': {'model': generation_result['metadata'].get('model')},
+                'generation_timestamp': time.time(),
+                'task_id': current_task.request.id
+            })
+            timings.record()
+            job.update_progress(100, 'Script, speech and video generated' if render else 'Script and speech generated')
+            job.mark_completed(result)
+            db.session.commit()
+            if video_asset:
+                queue_stream_packaging(video_asset)
+
+            publisher.finish(**result)
+            logger.info(
+                f"Pipelined generation for job {job_id} completed: {total} segments in {elapsed:.1f}s "
+                f"(stages back to back: {result['pipeline']['sequential_seconds']:.1f}s)"
+            )
+            return result
+
+        except Exception as exc:
+            error_msg = f"Pipelined generation failed: {exc}"
+            logger.error(f"Job {job_id} - {error_msg}")
+            db.session.rollback()
+
+            if pipeline:
+                pipeline.cancel()
+            if publisher:
+                publisher.fail(error_msg)
+
+            if job:
+                job = Job.query.get(job_id)
+                job.update_progress(0, error_msg)
+                job.mark_failed({
+                    'error_message': error_msg,
+                    'task_id': current_task.request.id,
+                    'failed_at': time.time()
+                })
+                job.error_message = error_msg
+                db.session.commit()
+
+            self.update_state(state='FAILURE', meta={'error': error_msg, 'progress': 0})
+            raise
+
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -5,15 +5,15 @@ import os
 import time
 import logging
 import subprocess
-from io import BytesIO
 from celery import current_task
 from flask import current_app
 
 from ..extensions import celery, db
 from ..models import Job, JobStep, Asset, JobStatus, JobType
 from ..models.asset import AssetType
-from ..services.tts import IndexTTSClient
 from ..services.storage import storage_service
+from ..services.blobs import store_bytes
+from ..services.analytics import StageTimings, STAGE_ASSET_DOWNLOAD, STAGE_TTS, STAGE_UPLOAD
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +32,7 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
         dict: Speech generation results with audio file paths
     """
     job = None
+    timings = StageTimings()
     
     # Get Flask app instance for context
     from ..extensions import celery
@@ -44,6 +45,8 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
             if not job:
                 raise ValueError(f"Job {job_id} not found")
             
+            timings.add_queue_wait(job.created_at)
+            
             # Update job status to processing when task starts with timing
             job.mark_started()
             db.session.commit()
@@ -66,22 +69,28 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
             self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Downloading reference voice'})
             job.update_progress(10, 'Downloading reference voice from storage')
             
-            voice_audio_data = storage_service.download_file(voice_asset.storage_path)
+            with timings.measure(STAGE_ASSET_DOWNLOAD, 'minio'):
+                # Prefer the normalized WAV made after upload, if there is one
+                voice_path = (voice_asset.asset_metadata or {}).get('normalized_path') or voice_asset.storage_path
+                voice_audio_data = storage_service.download_file(voice_path)
             
             # Initialize IndexTTS client
             self.update_state(state='PROGRESS', meta={'progress': 20, 'status': 'Initializing TTS service'})
             job.update_progress(20, 'Connecting to IndexTTS service')
             
-            indextts_client = IndexTTSClient()
+            # Imported here so processes that only queue tasks never load gradio_client
+            from ..services.tts import create_tts_client
+            indextts_client = create_tts_client()
             
             # Generate speech using IndexTTS
             self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Generating speech with voice clone'})
             job.update_progress(30, 'Generating speech with cloned voice')
             
-            speech_audio_data = indextts_client.generate_speech(
-                text=text,
-                speaker_audio=voice_audio_data
-            )
+            with timings.measure(STAGE_TTS, 'indextts'):
+                speech_audio_data = indextts_client.generate_speech(
+                    text=text,
+                    speaker_audio=voice_audio_data
+                )
             
             # Capture IndexTTS metadata including hardware information
             logger.info(f"📋 Capturing IndexTTS service metadata...")
@@ -94,45 +103,22 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
                     "error": str(e),
                     "captured_at": time.time()
                 }
+            timings.set_hardware('indextts', indextts_metadata)
             
             # Store the generated audio in MinIO
             self.update_state(state='PROGRESS', meta={'progress': 60, 'status': 'Storing generated speech'})
             job.update_progress(60, 'Storing generated audio file')
             
-            # Generate unique filename
-            audio_filename = f"speech/{job_id}/generated_speech.wav"
-            
-            # Convert bytes to BytesIO for MinIO compatibility
-            audio_file_obj = BytesIO(speech_audio_data)
-            
-            audio_result = storage_service.upload_file(
-                file_data=audio_file_obj,
-                object_name=audio_filename,
-                content_type='audio/wav'
-            )
-            
-            if not audio_result.get('success'):
-                raise RuntimeError(f"Failed to upload audio file: {audio_result.get('error')}")
+            # Stored by content hash: regenerating identical audio reuses the
+            # existing object instead of uploading another copy
+            upload_start = time.perf_counter()
+            blob = store_bytes(speech_audio_data, content_type='audio/wav')
             
-            # IndexTTS typically outputs WAV format directly
-            self.update_state(state='PROGRESS', meta={'progress': 70, 'status': 'Processing audio format'})
-            job.update_progress(70, 'Processing audio format')
-            
-            # The speech_audio_data from IndexTTS is already in WAV format
+            # IndexTTS outputs WAV directly, so the same object serves both paths
             wav_data = speech_audio_data
-            wav_filename = f"speech/{job_id}/generated_speech_wav.wav"
-            
-            # Convert bytes to BytesIO for MinIO compatibility
-            wav_file_obj = BytesIO(wav_data)
-            
-            wav_result = storage_service.upload_file(
-                file_data=wav_file_obj,
-                object_name=wav_filename,
-                content_type='audio/wav'
-            )
-            
-            if not wav_result.get('success'):
-                raise RuntimeError(f"Failed to upload WAV file: {wav_result.get('error')}")
+            audio_filename = wav_filename = blob.object_name
+            storage_result = {'success': True, 'object_name': blob.object_name, 'sha256': blob.sha256}
+            timings.add(STAGE_UPLOAD, 'minio', time.perf_counter() - upload_start)
             
             # Calculate audio metadata
             self.update_state(state='PROGRESS', meta={'progress': 90, 'status': 'Finalizing results'})
@@ -154,7 +140,8 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
                 storage_path=wav_filename,
                 storage_bucket=current_app.config.get('MINIO_BUCKET_NAME', 'voice-clone-assets'),
                 user_id=job.user_id,
-                description=f"Generated speech from text: {text[:100]}{'...' if len(text) > 100 else ''}"
+                description=f"Generated speech from text: {text[:100]}{'...' if len(text) > 100 else ''}",
+                asset_metadata={'sha256': blob.sha256}
             )
             
             db.session.add(asset)
@@ -165,9 +152,9 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
             # Create result data
             result = {
                 'audio_file_path': audio_filename,
-                'audio_storage_result': audio_result,
+                'audio_storage_result': storage_result,
                 'wav_file_path': wav_filename,
-                'wav_storage_result': wav_result,
+                'wav_storage_result': storage_result,
                 'text_length': len(text),
                 'voice_asset_id': voice_asset_id,
                 'duration_estimated': len(text) * 0.05,  # Rough estimate: 50ms per character
@@ -182,6 +169,7 @@ def generate_speech(self, job_id: int, text: str, voice_asset_id: int):
                 'task_id': current_task.request.id
             }
             job.update_service_metadata(service_metadata)
+            timings.record()
             
             # Update job with final progress and mark as completed with timing
             job.update_progress(100, 'Speech generation completed successfully')
@@ -391,7 +379,8 @@ def validate_tts_service(self):
         self.update_state(state='PROGRESS', meta={'progress': 20, 'status': 'Checking IndexTTS configuration'})
         
         # Initialize client and check configuration
-        indextts_client = IndexTTSClient()
+        from ..services.tts import create_tts_client
+        indextts_client = create_tts_client()
         config_result = indextts_client.validate_configuration()
         
         if not config_result['valid']:
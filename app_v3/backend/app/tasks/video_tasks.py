@@ -8,8 +8,9 @@ from pathlib import Path
 from celery import current_task
 from ..extensions import celery, db
 from ..models import Job, JobStep, Asset, JobStatus
-from ..services.video import KDTalkerClient, VideoGenerationConfig
 from ..services.storage import storage_service
+from ..services.analytics import StageTimings, STAGE_ASSET_DOWNLOAD, STAGE_TTS, STAGE_VIDEO_RENDER, STAGE_UPLOAD
+from .export_tasks import queue_stream_packaging
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
     Returns:
         dict: Video generation results
     """
+    timings = StageTimings()
     try:
         logger.info(f"🎬 ================== VIDEO GENERATION STARTED ==================")
         logger.info(f"🆔 Job ID: {job_id}")
@@ -51,6 +53,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
             
             logger.info(f"✅ Job loaded: {job.title} (type: {job.job_type})")
             logger.info(f"📋 Job parameters: {job.parameters}")
+            timings.add_queue_wait(job.created_at)
             
             # Update job status and mark as started with timing
             job.mark_started()
@@ -108,6 +111,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
             logger.info(f"📁 Created temp directory: {temp_dir}")
             
             # Download portrait image
+            download_start = time.perf_counter()
             portrait_local_path = temp_dir / f"portrait_{portrait_asset.id}{Path(portrait_asset.filename).suffix}"
             logger.info(f"⬇️ Downloading portrait from: {portrait_asset.storage_path}")
             portrait_data = storage_service.download_file(portrait_asset.storage_path)
@@ -130,6 +134,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
             with open(audio_local_path, 'wb') as f:
                 f.write(audio_data)
             logger.info(f"✅ Audio downloaded to: {audio_local_path} ({len(audio_data)} bytes)")
+            timings.add(STAGE_ASSET_DOWNLOAD, 'minio', time.perf_counter() - download_start)
         
         # Update progress
         self.update_state(state='PROGRESS', meta={
@@ -138,8 +143,10 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
         })
         logger.info(f"📊 Updated job progress to 30% - Preparing KDTalker generation")
         
-        # Initialize KDTalker client
-        kdtalker_client = KDTalkerClient()
+        # Initialize KDTalker client (imported here so processes that only
+        # queue tasks never load gradio_client)
+        from ..services.video import create_video_client, VideoGenerationConfig
+        kdtalker_client = create_video_client()
         
         # Validate KDTalker service is available
         logger.info(f"🛠️ Initializing KDTalker client...")
@@ -178,7 +185,6 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
         logger.info(f"  - Output: {output_local_path}")
         
         # Generate video using KDTalker
-        import time
         generation_start_time = time.time()
         logger.info(f"⏱️ Generation started at: {generation_start_time}")
         generation_result = kdtalker_client.generate_video(
@@ -189,6 +195,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
         )
         generation_end_time = time.time()
         generation_duration = generation_end_time - generation_start_time
+        timings.add(STAGE_VIDEO_RENDER, 'kdtalker', generation_duration)
         
         logger.info(f"✅ Video generation completed in {generation_duration:.2f} seconds")
         logger.info(f"📊 Generation result: {generation_result}")
@@ -204,6 +211,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
                 "error": str(e),
                 "captured_at": time.time()
             }
+        timings.set_hardware('kdtalker', kdtalker_metadata)
         
         # Check if output file was created
         if not output_local_path.exists():
@@ -254,6 +262,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
             else:
                 logger.warning(f"⚠️ Thumbnail generation failed, skipping thumbnail upload")
                 thumbnail_storage_path = None
+            timings.add(STAGE_UPLOAD, 'minio', time.time() - upload_start_time)
         
         # Update progress
         self.update_state(state='PROGRESS', meta={
@@ -305,6 +314,9 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
             db.session.add(asset)
             db.session.commit()
             
+            # Segmented HLS/DASH for streaming playback, produced in the background
+            queue_stream_packaging(asset)
+            
             logger.info(f"✅ Successfully created Asset record with ID {asset.id} for video output")
         
         result = {
@@ -333,6 +345,7 @@ def generate_video(self, job_id: int, portrait_asset_id: int, audio_asset_id: in
                 'task_id': current_task.request.id
             }
             job.update_service_metadata(service_metadata)
+            timings.record()
             
             # Mark as completed with timing and results
             job.mark_completed(result)
@@ -425,7 +438,8 @@ def validate_video_service(self):
         dict: Service validation results
     """
     try:
-        client = KDTalkerClient()
+        from ..services.video import create_video_client
+        client = create_video_client()
         
         # Perform health check
         health_check = client.health_check()
@@ -508,6 +522,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
     Returns:
         dict: Complete pipeline results
     """
+    timings = StageTimings()
     try:
         logger.info(f"🎬 ================== FULL PIPELINE STARTED ==================")
         logger.info(f"🆔 Job ID: {job_id}")
@@ -529,6 +544,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             main_job = Job.query.get(job_id)
             if not main_job:
                 raise ValueError(f"Main job {job_id} not found")
+            timings.add_queue_wait(main_job.created_at)
             
             # Mark main job as started with timing
             main_job.mark_started()
@@ -563,23 +579,27 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             self.update_state(state='PROGRESS', meta={'progress': 20, 'status': 'Downloading reference voice'})
             main_job.update_progress(20, 'Downloading reference voice from storage')
             
-            voice_audio_data = storage_service.download_file(voice_asset.storage_path)
+            with timings.measure(STAGE_ASSET_DOWNLOAD, 'minio'):
+                # Prefer the normalized WAV made after upload, if there is one
+                voice_path = (voice_asset.asset_metadata or {}).get('normalized_path') or voice_asset.storage_path
+                voice_audio_data = storage_service.download_file(voice_path)
             
             # Initialize IndexTTS client
             self.update_state(state='PROGRESS', meta={'progress': 25, 'status': 'Initializing TTS service'})
             main_job.update_progress(25, 'Connecting to IndexTTS service')
             
-            from ..services.tts import IndexTTSClient
-            indextts_client = IndexTTSClient()
+            from ..services.tts import create_tts_client
+            indextts_client = create_tts_client()
             
             # Generate speech using IndexTTS
             self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Generating speech with voice clone'})
             main_job.update_progress(30, 'Generating speech with cloned voice')
             
-            speech_audio_data = indextts_client.generate_speech(
-                text=script_text,
-                speaker_audio=voice_audio_data
-            )
+            with timings.measure(STAGE_TTS, 'indextts'):
+                speech_audio_data = indextts_client.generate_speech(
+                    text=script_text,
+                    speaker_audio=voice_audio_data
+                )
             
             # Capture IndexTTS metadata including hardware information
             logger.info(f"📋 Capturing IndexTTS service metadata...")
@@ -592,28 +612,21 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
                     "error": str(e),
                     "captured_at": time.time()
                 }
+            timings.set_hardware('indextts', indextts_metadata)
             
             # Store the generated audio
             self.update_state(state='PROGRESS', meta={'progress': 40, 'status': 'Storing generated speech'})
             main_job.update_progress(40, 'Storing generated audio file')
             
-            # Generate unique filename for main job
-            import io
+            # Stored by content hash, so re-running a job with the same script
+            # and voice reuses the existing audio object
             from datetime import datetime
+            from ..services.blobs import store_bytes
             timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            audio_filename = f"speech/{job_id}/generated_speech_{timestamp}.wav"
-            
-            # Convert bytes to BytesIO for storage compatibility
-            audio_file_obj = io.BytesIO(speech_audio_data)
-            
-            audio_result = storage_service.upload_file(
-                file_data=audio_file_obj,
-                object_name=audio_filename,
-                content_type='audio/wav'
-            )
             
-            if not audio_result.get('success'):
-                raise RuntimeError(f"Failed to upload audio file: {audio_result.get('error')}")
+            with timings.measure(STAGE_UPLOAD, 'minio'):
+                audio_blob = store_bytes(speech_audio_data, content_type='audio/wav')
+            audio_filename = audio_blob.object_name
             
             # Create Asset record for the generated audio attached to main job
             self.update_state(state='PROGRESS', meta={'progress': 45, 'status': 'Creating audio asset record'})
@@ -633,7 +646,8 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
                 storage_path=audio_filename,
                 storage_bucket=current_app.config.get('MINIO_BUCKET_NAME', 'voice-clone-assets'),
                 user_id=user_id,
-                description=f"Generated speech for main job {job_id}: {script_text[:100]}{'...' if len(script_text) > 100 else ''}"
+                description=f"Generated speech for main job {job_id}: {script_text[:100]}{'...' if len(script_text) > 100 else ''}",
+                asset_metadata={'sha256': audio_blob.sha256}
             )
             
             db.session.add(generated_audio_asset)
@@ -663,7 +677,6 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             logger.info(f"✅ Audio asset verified: {audio_asset.id} - {audio_asset.original_filename} ({audio_asset.status})")
             
             # Small delay to ensure database consistency
-            import time
             time.sleep(1)
             logger.info("⏳ Database sync delay completed")
             
@@ -716,6 +729,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             import os
             
             # Get presigned URL for portrait asset
+            download_start = time.time()
             portrait_url = storage_service.get_presigned_url(
                 object_name=portrait_asset.storage_path,
                 bucket_name=portrait_asset.storage_bucket
@@ -757,13 +771,13 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
                 f.write(audio_response.content)
             
             logger.info(f"✅ Audio downloaded to: {audio_path}")
+            timings.add(STAGE_ASSET_DOWNLOAD, 'minio', time.time() - download_start)
             
             # Generate video using KDTalker
             logger.info("🎬 Starting KDTalker video generation...")
-            import time
             start_time = time.time()
             
-            from ..services.video.kdtalker_client import KDTalkerClient, VideoGenerationConfig
+            from ..services.video import create_video_client, VideoGenerationConfig
             
             # Create configuration with the correct parameters
             config = VideoGenerationConfig(
@@ -774,7 +788,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
                 smoothed_t=0.8
             )
             
-            kdtalker_client = KDTalkerClient()
+            kdtalker_client = create_video_client()
             result = kdtalker_client.generate_video(
                 portrait_path=portrait_path,
                 audio_path=audio_path,
@@ -783,6 +797,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             
             generation_time = time.time() - start_time
             logger.info(f"✅ KDTalker generation completed in {generation_time:.2f}s")
+            timings.add(STAGE_VIDEO_RENDER, 'kdtalker', generation_time)
             
             # Capture KDTalker metadata including hardware information
             logger.info(f"📋 Capturing KDTalker service metadata...")
@@ -795,6 +810,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
                     "error": str(e),
                     "captured_at": time.time()
                 }
+            timings.set_hardware('kdtalker', kdtalker_metadata)
             
             # Get the output path from the result
             if not result or 'video_path' not in result:
@@ -839,6 +855,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             
             upload_time = time.time() - upload_start
             logger.info(f"✅ Video uploaded in {upload_time:.2f}s to: {storage_path}")
+            timings.add(STAGE_UPLOAD, 'minio', upload_time)
             
             # Create video asset record
             logger.info("💾 Creating video asset record...")
@@ -866,6 +883,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
             db.session.commit()
             
             logger.info(f"✅ Video asset created with ID: {video_asset.id}")
+            queue_stream_packaging(video_asset)
             
             # Update main job with video result
             logger.info("💾 Updating main job with video result")
@@ -896,6 +914,7 @@ def full_generation_pipeline(self, job_id: int, portrait_asset_id, voice_asset_i
                 'task_id': current_task.request.id
             }
             main_job.update_service_metadata(service_metadata)
+            timings.record()
             
             # Update main job status to completed with timing
             main_job.mark_completed()
@@ -7,6 +7,7 @@ from flask_jwt_extended import get_jwt_identity
 from marshmallow import ValidationError
 from ..models import User, UserRole
 from ..schemas import ErrorResponseSchema
+from ..auth.identity import get_user_identity
 
 
 def handle_errors(f):
@@ -32,8 +33,7 @@ def require_role(required_role):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            user = get_user_identity()
             
             if not user:
                 return jsonify(ErrorResponseSchema().dump({
@@ -64,8 +64,7 @@ def require_faculty_or_admin(f):
     """Decorator to require faculty or admin role"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_user_identity()
         
         if not user:
             return jsonify(ErrorResponseSchema().dump({
@@ -0,0 +1,197 @@
+"""
+Redis-backed response cache for read-heavy API endpoints.
+
+Responses are keyed by endpoint namespace, user (for user-scoped data) and
+query parameters. Each key also embeds a generation counter for its namespace
+(and user, for user-scoped data); invalidation bumps the counter so stale
+entries are simply never read again and expire on their TTL. Jobs and assets
+bump the counters of the namespaces that depend on them when a session that
+changed them commits.
+"""
+import json
+import hashlib
+import logging
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from flask import current_app, request, make_response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .. import extensions
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'respcache'
+
+# Data sources that trigger invalidation
+SOURCE_JOBS = 'jobs'
+SOURCE_ASSETS = 'assets'
+
+# namespace -> {'scope': 'user'|'global', 'sources': set of data sources}
+_registry: Dict[str, Dict] = {}
+
+_PENDING_KEY = 'response_cache_pending'
+
+
+def _generation_keys(namespace: str, user_id) -> list:
+    """Global generation counter, plus the user's own unless user_id is None"""
+    keys = [f'{KEY_PREFIX}:gen:{namespace}']
+    if user_id is not None:
+        keys.append(f'{KEY_PREFIX}:gen:{namespace}:{user_id}')
+    return keys
+
+
+def _cache_key(namespace: str, user_id, generations, view_args: Dict) -> str:
+    params = sorted((k, v) for k in request.args for v in request.args.getlist(k))
+    digest = hashlib.sha1(
+        json.dumps([params, sorted(view_args.items())], default=str).encode()
+    ).hexdigest()
+    gens = ':'.join((g.decode() if isinstance(g, bytes) else str(g)) if g else '0' for g in generations)
+    owner = 'global' if user_id is None else user_id
+    return f'{KEY_PREFIX}:{namespace}:{owner}:{gens}:{digest}'
+
+
+def _cache_enabled() -> bool:
+    return extensions.redis_client is not None and current_app.config.get('RESPONSE_CACHE_ENABLED', True)
+
+
+def cached_response(namespace: str, ttl: int = 60, scope: str = 'user',
+                    invalidated_by: Iterable[str] = (),
+                    cache_if: Optional[Callable[[Dict], bool]] = None):
+    """
+    Cache successful JSON responses of a view in Redis.
+
+    Must be applied below ``@jwt_required()`` so the user identity is known.
+
+    Args:
+        namespace: Cache namespace for the endpoint
+        ttl: Seconds to keep a response; ``RESPONSE_CACHE_TTLS[namespace]`` overrides it
+        scope: 'user' if the data belongs to the requesting user, 'global' if it is
+            shared, which decides whether a change invalidates one user or everyone
+        invalidated_by: Data sources (SOURCE_JOBS, SOURCE_ASSETS) whose changes
+            invalidate this namespace
+        cache_if: Optional predicate on the decoded JSON body; responses it
+            rejects (e.g. a status check reporting an error) are not cached
+    """
+    _registry[namespace] = {'scope': scope, 'sources': set(invalidated_by)}
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not _cache_enabled():
+                return f(*args, **kwargs)
+
+            redis_client = extensions.redis_client
+            # Shared data is cached once for everyone
+            user_id = None if scope == 'global' else get_jwt_identity()
+            try:
+                generations = redis_client.mget(_generation_keys(namespace, user_id))
+                key = _cache_key(namespace, user_id, generations, kwargs)
+                cached = redis_client.get(key)
+            except Exception as e:
+                logger.warning(f"Response cache unavailable for {namespace}: {e}")
+                return f(*args, **kwargs)
+
+            if cached is not None:
+                entry = json.loads(cached)
+                response = current_app.response_class(
+                    entry['body'], status=entry['status'], mimetype=entry['mimetype']
+                )
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if (response.status_code == 200 and response.mimetype == 'application/json'
+                    and (cache_if is None or cache_if(response.get_json(silent=True) or {}))):
+                ttl_seconds = current_app.config.get('RESPONSE_CACHE_TTLS', {}).get(namespace, ttl)
+                try:
+                    redis_client.setex(key, ttl_seconds, json.dumps({
+                        'body': response.get_data(as_text=True),
+                        'status': response.status_code,
+                        'mimetype': response.mimetype
+                    }))
+                except Exception as e:
+                    logger.warning(f"Failed to store cached response for {namespace}: {e}")
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated_function
+    return decorator
+
+
+def invalidate_cache(namespace: str, user_id=None):
+    """Invalidate a namespace for one user, or for everyone when user_id is None"""
+    redis_client = extensions.redis_client
+    if redis_client is None:
+        return
+    key = _generation_keys(namespace, user_id)[-1]
+    try:
+        redis_client.incr(key)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate response cache {namespace}: {e}")
+
+
+def invalidate_source(source: str, user_ids: Optional[Set] = None):
+    """Invalidate every namespace that depends on a data source"""
+    redis_client = extensions.redis_client
+    if redis_client is None:
+        return
+    user_ids = user_ids or set()
+    keys = []
+    for namespace, entry in _registry.items():
+        if source not in entry['sources']:
+            continue
+        if entry['scope'] == 'global' or not user_ids:
+            keys.append(_generation_keys(namespace, None)[0])
+        else:
+            keys.extend(_generation_keys(namespace, user_id)[1] for user_id in user_ids)
+    if not keys:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to invalidate response cache for {source}: {e}")
+
+
+def _after_flush(session, flush_context):
+    """Remember which users' jobs and assets changed in this transaction"""
+    from ..models.job import Job
+    from ..models.asset import Asset
+
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Job):
+            # Progress updates do not change anything the cached views show
+            if obj in session.dirty and not inspect(obj).attrs.status.history.has_changes():
+                continue
+            source = SOURCE_JOBS
+        elif isinstance(obj, Asset):
+            source = SOURCE_ASSETS
+        else:
+            continue
+        # JWT identities are strings
+        pending.setdefault(source, set()).add(str(obj.__dict__.get('user_id')))
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    for source, user_ids in (pending or {}).items():
+        # Rows without an owner fall back to invalidating every user
+        invalidate_source(source, None if 'None' in user_ids else user_ids)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_cache_invalidation():
+    """Invalidate cached responses when jobs or assets are committed (idempotent)"""
+    for name, listener in (('after_flush', _after_flush),
+                           ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
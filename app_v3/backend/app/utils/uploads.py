@@ -0,0 +1,21 @@
+"""
+Bounded-memory request handling for files uploaded through the API.
+
+Each multipart file part is written to a SpooledTemporaryFile: small files
+stay in memory, anything above UPLOAD_SPOOL_THRESHOLD rolls over to disk, so
+the memory a concurrent upload can pin is capped regardless of the size the
+client declares (or fails to declare).
+"""
+import tempfile
+
+from flask import Request, current_app
+
+
+class SpooledUploadRequest(Request):
+    """Request class that spools uploaded files to disk above a threshold"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(
+            max_size=current_app.config.get('UPLOAD_SPOOL_THRESHOLD', 1024 * 1024),
+            dir=current_app.config.get('UPLOAD_SPOOL_DIR')
+        )
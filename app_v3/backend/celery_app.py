@@ -7,6 +7,9 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Size database pools for Celery children (read by app.config)
+os.environ.setdefault('APP_PROCESS_ROLE', 'worker')
+
 from app import create_app
 from app.extensions import make_celery
 
@@ -22,6 +25,9 @@ from app.tasks.tts_tasks import text_to_speech_task, convert_audio_format
 from app.tasks.video_tasks import generate_video, generate_video_thumbnail, full_generation_pipeline, validate_video_service
 from app.tasks.export_tasks import export_video_format, create_html5_package, create_scorm_package
 from app.tasks.llm_tasks import generate_script, validate_llm_service # Added this line
+from app.tasks.analytics_tasks import reconcile_analytics_rollups
+from app.tasks.asset_tasks import process_uploaded_asset, collect_blob_garbage
+from app.tasks.pipeline_tasks import scripted_speech_pipeline
 
 if __name__ == '__main__':
     celery.start()
@@ -2,6 +2,10 @@
 Celery worker entry point for the Voice-Cloned Talking-Head Lecturer backend
 """
 import os
+
+# Size database pools for Celery children (read by app.config)
+os.environ.setdefault('APP_PROCESS_ROLE', 'worker')
+
 from app import create_app
 from app.extensions import make_celery
 from app.config import config
@@ -14,7 +18,7 @@ app = create_app(config[config_name])
 celery = make_celery(app)
 
 # Import tasks to register them with Celery
-from app.tasks import voice_tasks, tts_tasks, video_tasks, export_tasks
+from app.tasks import voice_tasks, tts_tasks, video_tasks, export_tasks, analytics_tasks, asset_tasks, pipeline_tasks
 
 if __name__ == '__main__':
     # Start Celery worker
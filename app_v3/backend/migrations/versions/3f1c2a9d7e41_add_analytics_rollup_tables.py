@@ -0,0 +1,53 @@
+"""Add analytics rollup tables
+
+Revision ID: 3f1c2a9d7e41
+Revises: eebd8a6acfa0
+Create Date: 2026-10-19 09:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7e41'
+down_revision = 'eebd8a6acfa0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_daily_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('job_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('job_count', sa.Integer(), nullable=False),
+    sa.Column('total_processing_seconds', sa.Float(), nullable=False),
+    sa.Column('processing_samples', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'job_type', 'status', name='uq_job_daily_rollup')
+    )
+    op.create_index(op.f('ix_job_daily_rollups_day'), 'job_daily_rollups', ['day'], unique=False)
+
+    op.create_table('model_usage_daily_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('job_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('model_type', sa.String(length=50), nullable=False),
+    sa.Column('model_name', sa.String(length=255), nullable=False),
+    sa.Column('job_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'job_type', 'status', 'model_type', 'model_name', name='uq_model_usage_daily_rollup')
+    )
+    op.create_index(op.f('ix_model_usage_daily_rollups_day'), 'model_usage_daily_rollups', ['day'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_model_usage_daily_rollups_day'), table_name='model_usage_daily_rollups')
+    op.drop_table('model_usage_daily_rollups')
+    op.drop_index(op.f('ix_job_daily_rollups_day'), table_name='job_daily_rollups')
+    op.drop_table('job_daily_rollups')
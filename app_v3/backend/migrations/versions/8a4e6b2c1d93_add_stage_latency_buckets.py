@@ -0,0 +1,38 @@
+"""Add stage latency histogram buckets
+
+Revision ID: 8a4e6b2c1d93
+Revises: 3f1c2a9d7e41
+Create Date: 2026-10-19 11:47:05.619384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6b2c1d93'
+down_revision = '3f1c2a9d7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stage_latency_buckets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('stage', sa.String(length=50), nullable=False),
+    sa.Column('backend', sa.String(length=50), nullable=False),
+    sa.Column('hardware_tier', sa.String(length=50), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('total_seconds', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'stage', 'backend', 'hardware_tier', 'bucket', name='uq_stage_latency_bucket')
+    )
+    op.create_index(op.f('ix_stage_latency_buckets_day'), 'stage_latency_buckets', ['day'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_stage_latency_buckets_day'), table_name='stage_latency_buckets')
+    op.drop_table('stage_latency_buckets')
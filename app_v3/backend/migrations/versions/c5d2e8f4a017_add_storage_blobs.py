@@ -0,0 +1,42 @@
+"""Add content-addressed storage blobs
+
+Revision ID: c5d2e8f4a017
+Revises: 8a4e6b2c1d93
+Create Date: 2026-10-19 14:02:37.118462
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8f4a017'
+down_revision = '8a4e6b2c1d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('storage_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('bucket_name', sa.String(length=100), nullable=False),
+    sa.Column('object_name', sa.String(length=500), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('unreferenced_at', sa.DateTime(), nullable=True),
+    sa.Column('derived', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_storage_blobs_sha256'), 'storage_blobs', ['sha256'], unique=True)
+    op.create_index(op.f('ix_storage_blobs_object_name'), 'storage_blobs', ['object_name'], unique=True)
+    op.create_index(op.f('ix_storage_blobs_unreferenced_at'), 'storage_blobs', ['unreferenced_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_storage_blobs_unreferenced_at'), table_name='storage_blobs')
+    op.drop_index(op.f('ix_storage_blobs_object_name'), table_name='storage_blobs')
+    op.drop_index(op.f('ix_storage_blobs_sha256'), table_name='storage_blobs')
+    op.drop_table('storage_blobs')
@@ -14,6 +14,9 @@ load_dotenv()
 backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
+# Size database pools for Celery children (read by app.config)
+os.environ.setdefault('APP_PROCESS_ROLE', 'worker')
+
 from app import create_app
 from app.extensions import make_celery
 
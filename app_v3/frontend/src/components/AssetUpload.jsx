@@ -63,35 +63,6 @@ const AssetUpload = ({ onUploadComplete, onClose }) => {
     setError('');
   };
 
-  const uploadToPresignedUrl = async (presignedUrl, file) => {
-    return new Promise((resolve, reject) => {
-      const xhr = new XMLHttpRequest();
-
-      xhr.upload.addEventListener('progress', (event) => {
-        if (event.lengthComputable) {
-          const progress = Math.round((event.loaded / event.total) * 100);
-          setUploadProgress(progress);
-        }
-      });
-
-      xhr.addEventListener('load', () => {
-        if (xhr.status >= 200 && xhr.status < 300) {
-          resolve();
-        } else {
-          reject(new Error(`Upload failed with status ${xhr.status}`));
-        }
-      });
-
-      xhr.addEventListener('error', () => {
-        reject(new Error('Upload failed'));
-      });
-
-      xhr.open('PUT', presignedUrl);
-      xhr.setRequestHeader('Content-Type', file.type);
-      xhr.send(file);
-    });
-  };
-
   const handleUpload = async () => {
     if (!selectedFile || !assetType) return;
 
@@ -99,19 +70,11 @@ const AssetUpload = ({ onUploadComplete, onClose }) => {
       setUploading(true);
       setError('');
 
-      // Step 1: Get presigned URL
-      const presignedResponse = await assetService.getPresignedUrl(
-        selectedFile.name,
-        selectedFile.type,
-        assetType,
-        selectedFile.size
-      );
-
-      // Step 2: Upload to presigned URL
-      await uploadToPresignedUrl(presignedResponse.upload_url, selectedFile);
-
-      // Step 3: Confirm the upload
-      const confirmResponse = await assetService.confirmUpload(presignedResponse.asset_id);
+      // Presign, upload straight to storage, then confirm
+      const confirmResponse = await assetService.uploadFile(selectedFile, assetType, {
+        description,
+        onProgress: setUploadProgress,
+      });
 
       setStep('confirm');
       if (onUploadComplete) {
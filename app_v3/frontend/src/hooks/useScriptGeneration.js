@@ -109,7 +109,24 @@ export const useScriptGeneration = () => {
     return { success: false, error: 'Polling timeout' };
   }, []);
 
-  const generateScript = useCallback(async (prompt, durationMinutes = 3) => {
+  // Show the script while it is being written. Resolves once the job has
+  // finished (or streaming is unavailable); polling then picks up the result.
+  const followPartialScript = useCallback(async (jobId, onPartial) => {
+    let script = '';
+    try {
+      const event = await jobService.streamJobProgress(jobId, {
+        onText: (text) => {
+          script += text;
+          onPartial(script);
+        },
+      });
+      console.log(`📡 Script stream for job ${jobId} ended:`, event.type);
+    } catch (error) {
+      console.warn(`⚠️ Live script stream unavailable for job ${jobId}, polling instead:`, error);
+    }
+  }, []);
+
+  const generateScript = useCallback(async (prompt, durationMinutes = 3, { onPartial } = {}) => {
     setIsGenerating(true);
     setGenerationError(null);
 
@@ -137,7 +154,10 @@ export const useScriptGeneration = () => {
         throw new Error('No job ID received from server');
       }
 
-      // Poll for completion
+      // Stream partial text while generating, then poll for the saved script
+      if (onPartial) {
+        await followPartialScript(jobId, onPartial);
+      }
       const pollResult = await pollForCompletion(jobId);
       
       if (pollResult.success) {
@@ -161,7 +181,7 @@ export const useScriptGeneration = () => {
     } finally {
       setIsGenerating(false);
     }
-  }, [pollForCompletion]);
+  }, [pollForCompletion, followPartialScript]);
 
   const clearError = useCallback(() => {
     setGenerationError(null);
@@ -16,11 +16,18 @@ const AnalyticsPage = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedTimeRange, setSelectedTimeRange] = useState('all');
+  const [performancePage, setPerformancePage] = useState(1);
+  const [performanceData, setPerformanceData] = useState(null);
 
   useEffect(() => {
     fetchAnalyticsData();
+    setPerformancePage(1);
   }, [selectedTimeRange]);
 
+  useEffect(() => {
+    fetchPerformanceTable();
+  }, [selectedTimeRange, performancePage]);
+
   const fetchAnalyticsData = async () => {
     try {
       setLoading(true);
@@ -35,29 +42,29 @@ const AnalyticsPage = () => {
     }
   };
 
+  const fetchPerformanceTable = async () => {
+    try {
+      const response = await api.get(
+        `/api/analytics/jobs?time_range=${selectedTimeRange}&page=${performancePage}&per_page=25`
+      );
+      setPerformanceData(response.data);
+    } catch (err) {
+      console.error('Error fetching job performance table:', err);
+    }
+  };
+
   const exportAnalytics = async (format = 'csv') => {
     try {
-      if (format === 'csv' && analyticsData?.job_performance_table) {
-        // Create CSV from job performance table
-        const headers = ['Job ID', 'Status', 'Duration (seconds)', 'LLM Model', 'TTS Model', 'Video Model', 'Created At'];
-        const csvContent = [
-          headers.join(','),
-          ...analyticsData.job_performance_table.map(job => [
-            job.id,
-            job.status,
-            job.duration || 0,
-            job.llm_model || 'N/A',
-            job.tts_model || 'N/A', 
-            job.video_model || 'N/A',
-            job.created_at || 'N/A'
-          ].map(field => `"${field}"`).join(','))
-        ].join('\n');
-        
-        const blob = new Blob([csvContent], { type: 'text/csv' });
-        const url = window.URL.createObjectURL(blob);
+      if (format === 'csv' || format === 'ndjson') {
+        // Full per-job export is streamed by the backend
+        const response = await api.get(
+          `/api/analytics/jobs/export?format=${format}&time_range=${selectedTimeRange}`,
+          { responseType: 'blob', timeout: 0 }
+        );
+        const url = window.URL.createObjectURL(response.data);
         const a = document.createElement('a');
         a.href = url;
-        a.download = `job_performance_${selectedTimeRange}_${new Date().toISOString().split('T')[0]}.csv`;
+        a.download = `job_performance_${selectedTimeRange}_${new Date().toISOString().split('T')[0]}.${format}`;
         document.body.appendChild(a);
         a.click();
         window.URL.revokeObjectURL(url);
@@ -125,7 +132,9 @@ const AnalyticsPage = () => {
     );
   }
 
-  const { summary, job_breakdown, model_usage, daily_performance, recent_jobs, benchmark_comparison, job_performance_table } = analyticsData;
+  const { summary, job_breakdown, model_usage, daily_performance, recent_jobs, benchmark_comparison, stage_latency } = analyticsData;
+  const job_performance_table = performanceData?.jobs;
+  const performancePagination = performanceData?.pagination;
 
   return (
     <div className="p-6 space-y-6">
@@ -260,7 +269,7 @@ const AnalyticsPage = () => {
             <h3 className="text-lg leading-6 font-medium text-gray-900 mb-4">
               Job Performance Analysis
               <span className="text-sm text-gray-500 ml-2">
-                ({job_performance_table.length} jobs analyzed)
+                ({performancePagination?.total ?? job_performance_table.length} jobs analyzed)
               </span>
             </h3>
             <div className="overflow-x-auto">
@@ -332,6 +341,29 @@ const AnalyticsPage = () => {
                 </tbody>
               </table>
             </div>
+            {performancePagination && performancePagination.pages > 1 && (
+              <div className="flex items-center justify-between mt-4">
+                <p className="text-sm text-gray-500">
+                  Page {performancePagination.page} of {performancePagination.pages}
+                </p>
+                <div className="flex space-x-2">
+                  <button
+                    onClick={() => setPerformancePage(performancePage - 1)}
+                    disabled={!performancePagination.has_prev}
+                    className="px-3 py-1 text-sm border border-gray-300 rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                  >
+                    Previous
+                  </button>
+                  <button
+                    onClick={() => setPerformancePage(performancePage + 1)}
+                    disabled={!performancePagination.has_next}
+                    className="px-3 py-1 text-sm border border-gray-300 rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                  >
+                    Next
+                  </button>
+                </div>
+              </div>
+            )}
           </div>
         </div>
       )}
@@ -400,6 +432,45 @@ const AnalyticsPage = () => {
         </div>
       )}
 
+      {/* Stage Latency */}
+      {stage_latency && Object.keys(stage_latency).length > 0 && (
+        <div className="bg-white shadow rounded-lg">
+          <div className="px-4 py-5 sm:p-6">
+            <h3 className="text-lg leading-6 font-medium text-gray-900 mb-4">Pipeline Stage Latency</h3>
+            <div className="overflow-x-auto">
+              <table className="min-w-full divide-y divide-gray-200">
+                <thead className="bg-gray-50">
+                  <tr>
+                    {['Stage', 'Hardware', 'Samples', 'p50', 'p90', 'p99'].map((label) => (
+                      <th key={label} className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                        {label}
+                      </th>
+                    ))}
+                  </tr>
+                </thead>
+                <tbody className="bg-white divide-y divide-gray-200">
+                  {Object.entries(stage_latency).flatMap(([stage, stats]) => [
+                    ['all', stats],
+                    ...Object.entries(stats.by_hardware || {}).filter(([tier]) => tier !== 'n/a')
+                  ].map(([tier, row]) => (
+                    <tr key={`${stage}-${tier}`}>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
+                        {tier === 'all' ? stage.replace(/_/g, ' ') : ''}
+                      </td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{tier}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{row.count}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{formatDuration(row.p50)}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{formatDuration(row.p90)}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{formatDuration(row.p99)}</td>
+                    </tr>
+                  )))}
+                </tbody>
+              </table>
+            </div>
+          </div>
+        </div>
+      )}
+
       {/* Daily Performance */}
       {daily_performance && daily_performance.length > 0 && (
         <div className="bg-white shadow rounded-lg">
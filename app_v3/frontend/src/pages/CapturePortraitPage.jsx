@@ -137,14 +137,11 @@ const CapturePortraitPage = () => {
       const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
       const filename = `portrait-${timestamp}.jpg`;
 
-      // Create FormData
-      const formData = new FormData();
-      formData.append('file', capturedImage.blob, filename);
-      formData.append('asset_type', 'portrait');
-      formData.append('description', 'Captured portrait photo');
-
       // Upload to asset service
-      const result = await assetService.uploadAsset(formData);
+      const file = new File([capturedImage.blob], filename, { type: capturedImage.blob.type || 'image/jpeg' });
+      const result = await assetService.uploadFile(file, 'portrait', {
+        description: 'Captured portrait photo',
+      });
       console.log('✅ Portrait uploaded successfully:', result);
 
       // Clean up and navigate
@@ -130,7 +130,9 @@ const CreateAudioPage = () => {
       console.log('🎬 Generating script via LLM...');
       
       // Use shared script generation hook
-      const result = await generateScript(textInput, 3); // 3 minutes duration
+      const result = await generateScript(textInput, 3, { // 3 minutes duration
+        onPartial: (partialScript) => setTextInput(partialScript),
+      });
       
       if (result.success) {
         setTextInput(result.script);
@@ -174,19 +176,17 @@ const CreateAudioPage = () => {
       
       if (voiceSelectionMode === 'upload') {
         // Upload new audio file as an asset
-        const formData = new FormData();
-        formData.append('file', audioFile);
-        formData.append('asset_type', 'voice_sample');
-        formData.append('title', `Voice Sample - ${audioFile.name}`);
-        formData.append('description', 'Voice sample for TTS generation');
-
         console.log('📤 Uploading voice sample asset...');
-        const assetResponse = await assetService.uploadAsset(formData);
+        const assetResponse = await assetService.uploadFile(audioFile, 'voice_sample', {
+          description: 'Voice sample for TTS generation',
+        });
         
         if (!assetResponse.asset) {
           throw new Error('Failed to upload voice sample');
         }
 
+        // The sample is verified and normalized before it can be used
+        await assetService.waitUntilReady(assetResponse.asset.id);
         voiceAssetId = assetResponse.asset.id;
         console.log('✅ Voice sample uploaded:', voiceAssetId);
       } else {
@@ -234,7 +234,12 @@ const ScriptInput = ({ script, onScriptChange, selectedVoice }) => {
       console.log('🎬 Generating script via LLM...');
       
       // Use shared script generation hook
-      const result = await generateScript(llmPrompt, 3); // 3 minutes duration
+      const result = await generateScript(llmPrompt, 3, { // 3 minutes duration
+        onPartial: (partialScript) => {
+          onScriptChange(partialScript);
+          setInputMode('write'); // Show the script as it is written
+        },
+      });
       
       if (result.success) {
         onScriptChange(result.script);
@@ -177,16 +177,12 @@ const RecordAudioPage = () => {
       console.log(`📁 File created: ${fileName} (${file.size} bytes)`);
       setUploadStatus('Uploading to server...');
 
-      // Create FormData for upload
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('asset_type', 'voice_sample');
-      formData.append('description', `Recorded audio: ${recordingName.trim()}`);
-
-      console.log('📤 Uploading FormData with file and metadata...');
+      console.log('📤 Uploading recording directly to storage...');
 
       // Upload using asset service
-      const result = await assetService.uploadAsset(formData);
+      const result = await assetService.uploadFile(file, 'voice_sample', {
+        description: `Recorded audio: ${recordingName.trim()}`,
+      });
       
       console.log('✅ Upload successful:', result);
       setUploadStatus('Upload completed successfully!');
@@ -1,5 +1,35 @@
 import api from './api';
 
+// SHA-256 of a file as hex, verified by the server after upload
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
+// PUT a blob to a presigned URL, reporting bytes sent; resolves with the ETag
+const putToStorage = (url, body, contentType, onBytes) =>
+  new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+
+    xhr.upload.addEventListener('progress', (event) => {
+      if (onBytes) onBytes(event.loaded);
+    });
+    xhr.addEventListener('load', () => {
+      if (xhr.status >= 200 && xhr.status < 300) {
+        resolve(xhr.getResponseHeader('ETag'));
+      } else {
+        reject(new Error(`Upload failed with status ${xhr.status}`));
+      }
+    });
+    xhr.addEventListener('error', () => reject(new Error('Upload failed')));
+
+    xhr.open('PUT', url);
+    if (contentType) xhr.setRequestHeader('Content-Type', contentType);
+    xhr.send(body);
+  });
+
 export const assetService = {
   // Get all user assets with optional filtering
   getAssets: async (filters = {}) => {
@@ -24,22 +54,64 @@ export const assetService = {
   },
 
   // Get presigned URL for upload
-  getPresignedUrl: async (filename, fileType, assetType, fileSize) => {
+  getPresignedUrl: async (filename, fileType, assetType, fileSize, options = {}) => {
     const response = await api.post('/api/assets/presigned-upload', {
       filename,
       content_type: fileType,
       asset_type: assetType,
       file_size: fileSize,
+      ...options,
     });
     return response.data;
   },
 
   // Confirm uploaded asset
-  confirmUpload: async (assetId) => {
-    const response = await api.post(`/api/assets/${assetId}/confirm-upload`);
+  confirmUpload: async (assetId, parts = null) => {
+    const response = await api.post(`/api/assets/${assetId}/confirm-upload`, parts ? { parts } : {});
     return response.data;
   },
 
+  // Upload a file straight to storage: presign, PUT (in parts for large
+  // files), then confirm. The server verifies the checksum and finishes
+  // processing in the background, so the asset starts out as 'processing'.
+  // Content this user has already uploaded is not sent again: the server
+  // returns a ready asset sharing the stored copy.
+  uploadFile: async (file, assetType, { filename, description, onProgress } = {}) => {
+    const contentType = file.type || 'application/octet-stream';
+    const presigned = await assetService.getPresignedUrl(
+      filename || file.name,
+      contentType,
+      assetType,
+      file.size,
+      { description: description || null, sha256: await sha256Hex(file) }
+    );
+
+    if (presigned.duplicate) {
+      if (onProgress) onProgress(100);
+      return { asset: presigned.asset };
+    }
+
+    const report = (sent) => {
+      if (onProgress && file.size) onProgress(Math.round((sent / file.size) * 100));
+    };
+
+    if (!presigned.multipart) {
+      await putToStorage(presigned.upload_url, file, contentType, report);
+      return assetService.confirmUpload(presigned.asset_id);
+    }
+
+    const parts = [];
+    let uploaded = 0;
+    for (const part of presigned.parts) {
+      const start = (part.part_number - 1) * presigned.part_size;
+      const blob = file.slice(start, start + presigned.part_size);
+      const etag = await putToStorage(part.url, blob, null, (sent) => report(uploaded + sent));
+      uploaded += blob.size;
+      parts.push({ part_number: part.part_number, etag });
+    }
+    return assetService.confirmUpload(presigned.asset_id, parts);
+  },
+
   // Get specific asset details
   getAsset: async (assetId) => {
     const response = await api.get(`/api/assets/${assetId}`);
@@ -47,6 +119,23 @@ export const assetService = {
     return response.data.asset;
   },
 
+  // Streaming package of a generated video; hls_url/dash_url (when packaged)
+  // are absolute and carry their own token, so they can be a player source
+  getStream: async (assetId) => {
+    const response = await api.get(`/api/assets/${assetId}/stream`);
+    const data = response.data;
+    ['hls_url', 'dash_url'].forEach((key) => {
+      if (data[key]) data[key] = `${api.defaults.baseURL}${data[key]}`;
+    });
+    return data;
+  },
+
+  // Package (or repackage) a generated video for streaming
+  packageStream: async (assetId, { force = false } = {}) => {
+    const response = await api.post(`/api/assets/${assetId}/stream`, null, { params: { force } });
+    return response.data;
+  },
+
   // Update asset metadata
   updateAsset: async (assetId, updateData) => {
     const response = await api.put(`/api/assets/${assetId}`, updateData);
@@ -76,7 +165,21 @@ export const assetService = {
     return response;
   },
 
-  // Upload asset file directly (simpler than presigned URL flow)
+  // Poll until post-upload processing finishes; resolves with the ready asset
+  waitUntilReady: async (assetId, { interval = 1000, timeout = 120000 } = {}) => {
+    const deadline = Date.now() + timeout;
+    for (;;) {
+      const asset = await assetService.getAsset(assetId);
+      if (asset.status === 'ready') return asset;
+      if (asset.status === 'error') {
+        throw new Error(asset.processing_info?.error || 'Asset processing failed');
+      }
+      if (Date.now() > deadline) throw new Error('Timed out waiting for asset processing');
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+  },
+
+  // Upload asset file through the API (only when the server enables proxy uploads)
   uploadAsset: async (formData) => {
     const response = await api.post('/api/assets/upload', formData, {
       headers: {
@@ -25,6 +25,13 @@ export const generationService = {
     return response.data;
   },
 
+  // Generate a script and speak it while it is being written (video too when
+  // portrait_asset_id is given); follow with jobService.streamJobProgress
+  generateScriptToSpeech: async (pipelineData) => {
+    const response = await api.post('/api/generate/full-pipeline', pipelineData);
+    return response.data;
+  },
+
   // Check TTS service status
   getTTSStatus: async () => {
     const response = await api.get('/api/generate/tts/status');
@@ -1,5 +1,48 @@
 import api from './api';
 
+// One connection to a job's progress stream; resolves with its last event
+const readProgressStream = async (jobId, { onText, onEvent, signal }) => {
+  const token = localStorage.getItem('access_token');
+  const response = await fetch(`${api.defaults.baseURL}/api/jobs/${jobId}/stream`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Progress stream unavailable (${response.status})`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return { type: 'status' };
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const data = block
+        .split('\n')
+        .filter((line) => line.startsWith('data: '))
+        .map((line) => line.slice(6))
+        .join('\n');
+      if (!data) continue; // keep-alive comment
+
+      const event = JSON.parse(data);
+      if (event.type === 'text') {
+        onText(event);
+      } else if (['done', 'error', 'status'].includes(event.type)) {
+        reader.cancel();
+        return event;
+      } else if (onEvent) {
+        onEvent(event);
+      }
+    }
+  }
+};
+
 export const jobService = {
   // Get all user jobs with optional filtering
   getJobs: async (filters = {}) => {
@@ -100,4 +143,29 @@ export const jobService = {
     const response = await api.get(`/api/jobs/${jobId}`);
     return response.data;
   },
+
+  // Follow a job's live output (server-sent events). Calls onText with each
+  // piece of partial output, onEvent with other progress events (e.g.
+  // 'segment' when pipelined speech for a paragraph is ready) and resolves
+  // with the final event: 'done', 'error', or 'status' when the server has
+  // nothing more to stream.
+  // The server ends each stream after a short while (it holds an API worker)
+  // with a 'status' event marked reconnect; the stream is then reopened and
+  // text already received is skipped. Events other than text published in
+  // the moment between two connections are not replayed.
+  // Uses fetch rather than EventSource so the auth header can be sent.
+  streamJobProgress: async (jobId, { onText, onEvent, signal } = {}) => {
+    let received = 0;
+    const handleText = (event) => {
+      const overlap = received - (event.offset || 0);
+      if (overlap >= event.text.length) return;
+      received = (event.offset || 0) + event.text.length;
+      if (onText) onText(overlap > 0 ? event.text.slice(overlap) : event.text);
+    };
+
+    for (;;) {
+      const event = await readProgressStream(jobId, { onText: handleText, onEvent, signal });
+      if (!(event.type === 'status' && event.reconnect) || signal?.aborted) return event;
+    }
+  },
 };
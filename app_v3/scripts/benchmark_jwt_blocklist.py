@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-memory JWT blocklist fallback (used when Redis is down).
+
+Pre-fills the blocklist with revoked tokens, then runs a mix of revocation
+checks and new revocations from several threads and reports throughput and
+per-operation latency. Use --compare to also run the previous linear-scan
+store on the same workload.
+
+    python scripts/benchmark_jwt_blocklist.py --tokens 100000 --threads 8
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app import extensions
+from app.auth.jwt_manager import JWTBlocklist
+
+
+class LinearScanBlocklist:
+    """The previous fallback: full scan for expired entries on every operation"""
+
+    _memory_store = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _clean_expired_tokens(cls):
+        current_time = datetime.now(timezone.utc)
+        expired_keys = [key for key, data in cls._memory_store.items() if current_time > data['expires_at']]
+        for key in expired_keys:
+            del cls._memory_store[key]
+
+    @classmethod
+    def prefill(cls, items):
+        # Bulk load without the per-insert scan, which would be quadratic
+        for jti, expires_at in items:
+            cls._memory_store[f"blocked_token:{jti}"] = {'value': "1", 'expires_at': expires_at}
+
+    @classmethod
+    def add_token_to_blocklist(cls, jti, expires_at):
+        with cls._lock:
+            cls._clean_expired_tokens()
+            cls._memory_store[f"blocked_token:{jti}"] = {'value': "1", 'expires_at': expires_at}
+
+    @classmethod
+    def is_token_revoked(cls, jti):
+        with cls._lock:
+            cls._clean_expired_tokens()
+            data = cls._memory_store.get(f"blocked_token:{jti}")
+            return data is not None and datetime.now(timezone.utc) <= data['expires_at']
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run(store, tokens, threads, ops_per_thread, write_ratio):
+    """Pre-fill ``store`` and hammer it from ``threads`` threads"""
+    now = datetime.now(timezone.utc)
+    # Spread expiries so some entries expire while the benchmark runs
+    items = [(f"prefill-{i}", now + timedelta(seconds=random.uniform(1, 3600))) for i in range(tokens)]
+    if hasattr(store, 'prefill'):
+        store.prefill(items)
+    else:
+        for jti, expires_at in items:
+            store.add_token_to_blocklist(jti, expires_at)
+
+    results = []
+    results_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(worker_id):
+        rng = random.Random(worker_id)
+        check_times, add_times = [], []
+        start_barrier.wait()
+        for n in range(ops_per_thread):
+            if rng.random() < write_ratio:
+                expires_at = datetime.now(timezone.utc) + timedelta(seconds=rng.uniform(0.5, 3600))
+                t = time.perf_counter()
+                store.add_token_to_blocklist(f"w{worker_id}-{n}", expires_at)
+                add_times.append(time.perf_counter() - t)
+            else:
+                jti = f"prefill-{rng.randrange(tokens * 2)}"  # ~50% hits
+                t = time.perf_counter()
+                store.is_token_revoked(jti)
+                check_times.append(time.perf_counter() - t)
+        with results_lock:
+            results.append((check_times, add_times))
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    checks = [x for c, _ in results for x in c]
+    adds = [x for _, a in results for x in a]
+    total_ops = len(checks) + len(adds)
+    print(f"  {total_ops} ops in {elapsed:.2f}s -> {total_ops / elapsed:,.0f} ops/s")
+    for name, samples in (('check', checks), ('add', adds)):
+        if samples:
+            print(f"  {name:5s} p50 {percentile(samples, 50) * 1e6:9.1f}us  "
+                  f"p99 {percentile(samples, 99) * 1e6:9.1f}us  n={len(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=100000, help='revoked tokens to pre-fill')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=20000, help='operations per thread')
+    parser.add_argument('--write-ratio', type=float, default=0.1, help='fraction of operations that revoke')
+    parser.add_argument('--compare', action='store_true', help='also run the previous linear-scan store')
+    parser.add_argument('--compare-ops', type=int, default=100,
+                        help='operations per thread for the linear-scan store (it is slow)')
+    args = parser.parse_args()
+
+    # Force the in-memory fallback
+    extensions.redis_client = None
+
+    print(f"Heap-indexed blocklist: {args.tokens} tokens, {args.threads} threads x {args.ops} ops")
+    run(JWTBlocklist, args.tokens, args.threads, args.ops, args.write_ratio)
+
+    if args.compare:
+        print(f"Linear-scan blocklist: {args.tokens} tokens, {args.threads} threads x {args.compare_ops} ops")
+        run(LinearScanBlocklist, args.tokens, args.threads, args.compare_ops, args.write_ratio)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Profile what the API and worker entry points import at startup.
+
+Runs ``app.py`` or ``celery_worker.py`` under ``python -X importtime`` in a
+fresh interpreter and prints the slowest imports by cumulative time, the peak
+RSS, and whether any of the heavy ML client stacks were pulled in. With
+--repeat the timings are the median of several runs; --eager also resolves
+the TTS, video and LLM clients, which shows what eager service imports cost.
+
+    python scripts/profile_imports.py api --top 25
+    python scripts/profile_imports.py worker --repeat 5
+    python scripts/profile_imports.py api --eager
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent / "backend"
+
+ENTRY_POINTS = {
+    'api': 'app.py',
+    'worker': 'celery_worker.py',
+}
+
+# Modules that should only load when a task actually needs them
+HEAVY_MODULES = ('gradio_client', 'huggingface_hub', 'httpx', 'torch', 'numpy')
+
+
+# Runs inside the child interpreter; prints one JSON line to stdout
+PROBE = '''
+import json, resource, runpy, sys
+sys.path.insert(0, '.')
+runpy.run_path({entry_point!r}, run_name='profile_imports')
+if {eager!r}:
+    from app.services import tts, video, llm
+    for package, name in ((tts, 'IndexTTSClient'), (video, 'KDTalkerClient'), (llm, 'LlamaClient')):
+        try:
+            getattr(package, name)
+        except Exception:
+            pass  # client stack not installed here
+print(json.dumps({{'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+'''
+
+
+def profile(entry_point, eager=False):
+    """Import ``entry_point`` in a subprocess and return (records, wall seconds, peak RSS MB)"""
+    code = PROBE.format(entry_point=entry_point, eager=eager)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=backend_dir, capture_output=True, text=True, env=os.environ.copy()
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        tail = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        print('\n'.join(tail[-20:]), file=sys.stderr)
+        sys.exit(f"{entry_point} failed to import (exit {result.returncode})")
+
+    records = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    rss_mb = json.loads(result.stdout.strip().splitlines()[-1])['rss_mb']
+    return records, elapsed, rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', choices=sorted(ENTRY_POINTS), help='entry point to profile')
+    parser.add_argument('--top', type=int, default=20, help='number of modules to list')
+    parser.add_argument('--repeat', type=int, default=1, help='runs to take the median timings of')
+    parser.add_argument('--eager', action='store_true', help='also import the ML client stacks')
+    args = parser.parse_args()
+
+    entry_point = ENTRY_POINTS[args.target]
+    runs = [profile(entry_point, args.eager) for _ in range(max(1, args.repeat))]
+    records = runs[-1][0]
+
+    # Top-level imports add up to the total import time
+    import_seconds = statistics.median(
+        sum(cumulative for _, _, cumulative, depth in run_records if depth == 0) / 1e6
+        for run_records, _, _ in runs
+    )
+    print(f"{entry_point}: {len(records)} modules, imports {import_seconds:.3f}s, "
+          f"interpreter wall time {statistics.median(run[1] for run in runs):.3f}s, "
+          f"peak RSS {statistics.median(run[2] for run in runs):.1f}MB"
+          + (f" (median of {len(runs)} runs)" if len(runs) > 1 else ''))
+
+    print(f"\nTop {args.top} by cumulative time:")
+    for name, self_us, cumulative_us, _ in sorted(records, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f}ms  (self {self_us / 1000:7.1f}ms)  {name}")
+
+    loaded = {name.split('.')[0] for name, _, _, _ in records}
+    heavy = [module for module in HEAVY_MODULES if module in loaded]
+    print(f"\nHeavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == '__main__':
+    main()